@@ -1,7 +1,19 @@
-import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from transformers import pipeline
+"""
+Facade cho AI phân tích cảm xúc
+torch / transformers chỉ được import khi thật sự cần model (load_model),
+nên import module này (views, migrate, scripts...) không tốn thời gian tải torch
+"""
 import logging
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from django.conf import settings
+from .services import sentiment_cache
+from .services import sentiment_chunking as chunking
+from .services import sentiment_lexicon as lexicon
+from .services import sentiment_metrics as metrics
+from .services.sentiment_backends import inference_context
+from .services.sentiment_batcher import MicroBatcher
 
 logger = logging.getLogger(__name__)
 
@@ -10,74 +22,444 @@ MODEL_NAME = "5CD-AI/Vietnamese-Sentiment-visobert"
 # Biến toàn cục để lưu model (tránh load lại nhiều lần)
 sentiment_pipeline = None
 
+# Bộ gom batch dùng chung cho các request đồng thời (tạo khi cần)
+_batcher = None
+
+# Client tới sentiment server (khi cấu hình SENTIMENT_SERVER_SOCKET)
+_client = None
+_serving_locally = False
+
+# Encoder (tokenizer, model) để tạo vector ngữ nghĩa cho tìm kiếm (tạo khi cần)
+_encoder = None
+
+# Tránh nhiều thread cùng tải model một lúc
+_load_lock = threading.Lock()
+_encoder_lock = threading.Lock()
+
+# Câu mẫu để chạy thử model khi warm-up
+WARMUP_TEXTS = [
+    "Sản phẩm dùng rất thích, giao hàng nhanh",
+    "Hàng kém chất lượng, không giống mô tả",
+]
+
 def load_model():
     """Hàm này tải model từ cache hoặc download"""
     global sentiment_pipeline
-    if sentiment_pipeline is None:
+    if sentiment_pipeline is not None:
+        return sentiment_pipeline
+
+    with _load_lock:
+        if sentiment_pipeline is not None:
+            return sentiment_pipeline
         try:
-            logger.info(f"Loading AI model: {MODEL_NAME}")
-            #  Tải Tokenizer 
-            tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-            #  Tải Model 
-            model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
-            #  Tạo Pipeline 
-            sentiment_pipeline = pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+            backend = getattr(settings, 'SENTIMENT_BACKEND', 'torch')
+            logger.info(f"Loading AI model: {MODEL_NAME} (backend={backend})")
+            started = time.perf_counter()
+            # Import nặng (torch / transformers / onnxruntime) chỉ chạy ở lần tải model đầu tiên
+            from .services.sentiment_backends import build_pipeline
+            #  Tạo Pipeline theo backend (fp32 / int8 / ONNX)
+            sentiment_pipeline = build_pipeline(
+                backend, MODEL_NAME, onnx_dir=str(getattr(settings, 'SENTIMENT_ONNX_DIR', '')),
+                threads=getattr(settings, 'SENTIMENT_TORCH_THREADS', None),
+                interop_threads=getattr(settings, 'SENTIMENT_TORCH_INTEROP_THREADS', None),
+            )
+            metrics.set_gauge('sentiment_model_load_seconds', time.perf_counter() - started)
+            metrics.inc('sentiment_model_loads_total', backend)
             logger.info("✓ Model loaded successfully")
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
+            metrics.inc('sentiment_errors_total', 'model_load')
             sentiment_pipeline = None
     return sentiment_pipeline
-            
-            
-def analyze_sentiment(text):
+
+
+def warmup():
     """
-    Hàm nhận nội dung bình luận -> Trả về (Label, Score)
-    Label: 'POS', 'NEG', 'NEU'
+    Tải model + chạy thử 1 lần inference trước khi nhận traffic
+    Return: dict thời gian (giây) của từng bước
     """
-    global sentiment_pipeline
-    
-    # Kiểm tra text không rỗng
-    if not text or not isinstance(text, str) or len(text.strip()) < 3:
-        logger.warning(f"Text too short or invalid")
-        return 'NEU', 50.0
-    
-    # Nếu chưa có model thì tải ngay
+    timings = {}
+
+    started = time.perf_counter()
+    if load_model() is None:
+        raise RuntimeError(f"Sentiment model {MODEL_NAME} could not be loaded")
+    timings['load_model'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    _score_texts(WARMUP_TEXTS[:1])
+    timings['first_inference'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    _score_texts(WARMUP_TEXTS)
+    timings['batch_inference'] = time.perf_counter() - started
+
+    logger.info(f"✓ Model warmed up: {timings}")
+    return timings
+
+
+def _to_label(result):
+    """Chuyển kết quả thô của pipeline -> (Label, Score)"""
+    # Kết quả thô từ model thường là: LABEL_0 (NEG), LABEL_1 (POS), LABEL_2 (NEU)
+    raw_label = result['label']
+    score = round(result['score'] * 100, 2) # Đổi sang phần trăm (98.5%)
+
+    logger.debug(f"AI result - raw_label: {raw_label}, score: {score}")
+
+    # Chuyển đổi sang mã của chúng ta
+    if raw_label in ['LABEL_1', 'POS']:
+        return 'POS', score  # Tích cực
+    elif raw_label in ['LABEL_0', 'NEG']:
+        return 'NEG', score  # Tiêu cực
+    elif raw_label in ['LABEL_2', 'NEU']:
+        return 'NEU', score  # Trung tính
+    else:
+        return 'NEU', score  # Mặc định
+
+
+def _is_valid_text(text):
+    return bool(text) and isinstance(text, str) and len(text.strip()) >= 3
+
+
+def _ensure_model():
+    """Tải model nếu chưa có -> True nếu pipeline sẵn sàng"""
     if sentiment_pipeline is None:
         try:
             load_model()
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
-            return 'NEU', 50.0
-    
-    # Nếu load thất bại
+            return False
+
     if sentiment_pipeline is None:
         logger.error("Model pipeline is still None after loading attempt")
-        return 'NEU', 50.0
-    
-    # Cắt ngắn text nếu quá dài (AI chỉ đọc được tối đa 512 token)
-    if len(text) > 512:
-        text = text[:512]
+        return False
+    return True
+
+
+def _score_texts(texts):
+    """
+    Chạy model cho list text hợp lệ -> list {'label', 'score'} cùng thứ tự
+    - Cắt theo token thật (SENTIMENT_MAX_TOKENS), không theo số ký tự
+    - SENTIMENT_LONG_TEXT_MODE = 'chunk': review dài được chia cửa sổ trượt rồi gộp điểm
+    - Sắp text theo độ dài token để mỗi batch ít padding
+    """
+    tokenizer = sentiment_pipeline.tokenizer
+    max_tokens = chunking.max_input_tokens(tokenizer, getattr(settings, 'SENTIMENT_MAX_TOKENS', 512))
+
+    if getattr(settings, 'SENTIMENT_LONG_TEXT_MODE', 'truncate') == 'chunk':
+        pieces, owners, lengths = [], [], []
+        for i, text in enumerate(texts):
+            for chunk, n_tokens in chunking.split_windows(
+                tokenizer, text, max_tokens,
+                stride=getattr(settings, 'SENTIMENT_CHUNK_STRIDE', 128),
+                max_chunks=getattr(settings, 'SENTIMENT_MAX_CHUNKS', 8),
+            ):
+                pieces.append(chunk)
+                owners.append(i)
+                lengths.append(n_tokens)
+    else:
+        pieces, owners = list(texts), list(range(len(texts)))
+        lengths = chunking.token_lengths(tokenizer, pieces)
+
+    order = chunking.length_sorted_order(lengths)
+    started = time.perf_counter()
+    with inference_context(
+        getattr(settings, 'SENTIMENT_BACKEND', 'torch'), getattr(settings, 'SENTIMENT_INFERENCE_MODE', True),
+    ):
+        outputs = sentiment_pipeline(
+            [pieces[i] for i in order],
+            batch_size=getattr(settings, 'SENTIMENT_BATCH_SIZE', 16),
+            top_k=None, truncation=True, max_length=max_tokens,
+        )
+    metrics.observe('sentiment_inference_seconds', time.perf_counter() - started)
+    metrics.observe('sentiment_batch_size', len(pieces))
+    metrics.observe_many('sentiment_input_tokens', lengths)
+
+    # Gom phân phối xác suất của các đoạn về đúng review gốc
+    per_text = [([], []) for _ in texts]
+    for i, output in zip(order, outputs):
+        scores, weights = per_text[owners[i]]
+        scores.append({item['label']: item['score'] for item in output})
+        weights.append(lengths[i])
+
+    return [chunking.combine_chunk_scores(scores, weights) for scores, weights in per_text]
 
+
+def _get_batcher():
+    global _batcher
+    if _batcher is None:
+        _batcher = MicroBatcher(
+            _score_texts,
+            max_batch_size=getattr(settings, 'SENTIMENT_BATCH_SIZE', 16),
+            max_wait_ms=getattr(settings, 'SENTIMENT_BATCH_MAX_WAIT_MS', 10),
+            name='sentiment-batcher',
+        )
+    return _batcher
+
+
+def _server_socket():
+    """Đường dẫn Unix socket của sentiment server (None = chạy model ngay trong process)"""
+    if _serving_locally:
+        return None
+    return getattr(settings, 'SENTIMENT_SERVER_SOCKET', None)
+
+
+def uses_sentiment_server():
+    """Model chạy ở sentiment server (process này không tải torch / encoder)"""
+    return bool(_server_socket())
+
+
+def _get_client():
+    global _client
+    if _client is None:
+        from .services.sentiment_server import SentimentClient
+        _client = SentimentClient(
+            _server_socket(), timeout=getattr(settings, 'SENTIMENT_SERVER_TIMEOUT', 5),
+        )
+    return _client
+
+
+def serve_locally():
+    """Gọi trong process sentiment server: luôn chạy model tại chỗ, không gọi lại chính server"""
+    global _serving_locally
+    _serving_locally = True
+
+
+def _analyze_via_server(texts, raise_errors=False):
+    """
+    Gửi text sang sentiment server -> dict {text: (Label, Score)}
+    Server lỗi / quá thời gian: SENTIMENT_SERVER_FALLBACK = 'local' thì chạy model tại chỗ,
+    ngược lại bỏ trống (caller trả 'NEU', 50.0)
+    """
     try:
-        # Gọi AI phân tích
-        result = sentiment_pipeline(text)[0]
-        
-        # Kết quả thô từ model thường là: LABEL_0 (NEG), LABEL_1 (POS), LABEL_2 (NEU)
-        raw_label = result['label']
-        score = round(result['score'] * 100, 2) # Đổi sang phần trăm (98.5%)
-
-        logger.debug(f"AI result - raw_label: {raw_label}, score: {score}")
-
-        # Chuyển đổi sang mã của chúng ta
-        if raw_label in ['LABEL_1', 'POS']:
-            return 'POS', score  # Tích cực
-        elif raw_label in ['LABEL_0', 'NEG']:
-            return 'NEG', score  # Tiêu cực
-        elif raw_label in ['LABEL_2', 'NEU']:
-            return 'NEU', score  # Trung tính
+        results = _get_client().analyze(texts)
+    except Exception as e:
+        logger.warning(f"Sentiment server unavailable: {e}")
+        metrics.inc('sentiment_errors_total', 'server')
+        if raise_errors:
+            raise
+        if getattr(settings, 'SENTIMENT_SERVER_FALLBACK', 'neutral') == 'local':
+            return _analyze_local(texts)
+        return {}
+
+    # Không cache kết quả mặc định khi server tự báo lỗi
+    scored = {t: r for t, r in zip(texts, results) if r != ('NEU', 50.0)}
+    sentiment_cache.set_many(scored)
+    return scored
+
+
+def _analyze_local(texts, raise_errors=False):
+    """Chạy model trong process hiện tại -> dict {text: (Label, Score)}"""
+    if not _ensure_model():
+        metrics.inc('sentiment_errors_total', 'model_unavailable')
+        if raise_errors:
+            raise RuntimeError(f"Sentiment model {MODEL_NAME} is not available")
+        return {}
+
+    try:
+        # 1 text: đi qua micro-batcher để gom chung với các request đồng thời
+        if len(texts) == 1 and getattr(settings, 'SENTIMENT_BATCHING', True):
+            future = _get_batcher().submit(texts[0])
+            try:
+                outputs = [future.result(timeout=getattr(settings, 'SENTIMENT_BATCH_TIMEOUT', 30))]
+            except FutureTimeoutError:
+                future.cancel()
+                raise TimeoutError("Sentiment batch timed out")
         else:
-            return 'NEU', score  # Mặc định
-            
+            outputs = _score_texts(texts)
     except Exception as e:
+        metrics.inc('sentiment_errors_total', 'timeout' if isinstance(e, TimeoutError) else 'inference')
+        if raise_errors:
+            raise
         logger.error(f"Error analyzing sentiment: {e}", exc_info=True)
-        return 'NEU', 50.0
\ No newline at end of file
+        return {}
+
+    scored = {t: _to_label(result) for t, result in zip(texts, outputs)}
+    sentiment_cache.set_many(scored)
+    return scored
+
+
+def _fast_path(text, rating=None):
+    """
+    Phân loại nhanh bằng từ điển -> (Label, Score) nếu đủ tin cậy, ngược lại None (cần model)
+    Text quá ngắn cho model (VD: chỉ 1 emoji) thì dùng kết quả từ điển dù độ tin cậy thấp
+    """
+    if not getattr(settings, 'SENTIMENT_FAST_PATH_ENABLED', True):
+        return None
+    result = lexicon.classify(text, rating, max_words=getattr(settings, 'SENTIMENT_FAST_PATH_MAX_WORDS', 20))
+    if result is None:
+        return None
+    if result[1] >= getattr(settings, 'SENTIMENT_FAST_PATH_THRESHOLD', 90) or not _is_valid_text(text):
+        return result
+    return None
+
+
+def analyze_sentiment(text, rating=None):
+    """
+    Hàm nhận nội dung bình luận -> Trả về (Label, Score)
+    Label: 'POS', 'NEG', 'NEU'
+    Review ngắn, rõ ràng được phân loại bằng từ điển (rating: số sao, nếu có), không chạy model
+    Nếu bật SENTIMENT_BATCHING, các lời gọi đồng thời được gom chung 1 batch
+    Nếu cấu hình SENTIMENT_SERVER_SOCKET, model chạy ở sentiment server dùng chung
+    """
+    # Review ngắn, rõ ràng (kể cả chỉ có emoji) -> từ điển là đủ
+    fast = _fast_path(text, rating)
+    if fast is not None:
+        metrics.inc('sentiment_path_total', 'fast')
+        logger.debug(f"Sentiment fast path: {fast}")
+        return fast
+
+    # Kiểm tra text không rỗng
+    if not _is_valid_text(text):
+        logger.warning(f"Text too short or invalid")
+        metrics.inc('sentiment_fallbacks_total', 'invalid_text')
+        return 'NEU', 50.0
+    
+    started = time.perf_counter()
+    # Bình luận đã từng phân tích -> lấy kết quả từ cache, không chạy model
+    cached = sentiment_cache.get_many([text]).get(text)
+    if cached is not None:
+        metrics.inc('sentiment_path_total', 'cache')
+        metrics.observe('sentiment_call_seconds', time.perf_counter() - started)
+        return cached
+
+    # Gọi AI phân tích
+    metrics.inc('sentiment_path_total', 'model')
+    if _server_socket():
+        scored = _analyze_via_server([text])
+    else:
+        scored = _analyze_local([text])
+    metrics.observe('sentiment_call_seconds', time.perf_counter() - started)
+
+    if text not in scored:
+        metrics.inc('sentiment_fallbacks_total', 'no_result')
+        return 'NEU', 50.0
+    return scored[text]
+
+
+def analyze_sentiment_batch(texts, raise_errors=False, ratings=None, fast_path=True):
+    """
+    Phân tích nhiều bình luận trong 1 lần gọi model
+    Trả về list (Label, Score) cùng thứ tự với input
+    Text trùng nhau / đã có trong cache chỉ được phân tích 1 lần
+    raise_errors=True: báo lỗi ra ngoài thay vì trả 'NEU', 50.0 (dùng cho worker để retry)
+    ratings: list số sao cùng thứ tự với texts (dùng cho phân loại nhanh bằng từ điển)
+    fast_path=False: luôn chạy model (VD: so sánh độ chính xác của từ điển)
+    """
+    started = time.perf_counter()
+    results = [None] * len(texts)
+    rest = []
+    for i, text in enumerate(texts):
+        fast = _fast_path(text, ratings[i] if ratings is not None else None) if fast_path else None
+        if fast is not None:
+            results[i] = fast
+        else:
+            rest.append(i)
+
+    valid = {texts[i] for i in rest if _is_valid_text(texts[i])}
+    known = sentiment_cache.get_many(valid)
+    cached = len(known)
+    todo = [t for t in valid if t not in known]
+
+    if todo:
+        if _server_socket():
+            known.update(_analyze_via_server(todo, raise_errors=raise_errors))
+        else:
+            known.update(_analyze_local(todo, raise_errors=raise_errors))
+    metrics.observe('sentiment_batch_call_seconds', time.perf_counter() - started)
+
+    n_fast = len(texts) - len(rest)
+    metrics.inc('sentiment_path_total', 'fast', n_fast)
+    metrics.inc('sentiment_path_total', 'cache', cached)
+    metrics.inc('sentiment_path_total', 'model', len(todo))
+    logger.info(f"Sentiment batch of {len(texts)}: {n_fast} fast path, {cached} cached, {len(todo)} model")
+
+    missing = [texts[i] for i in rest if texts[i] not in known]
+    if missing:
+        invalid = sum(1 for t in missing if t not in valid)
+        metrics.inc('sentiment_fallbacks_total', 'invalid_text', invalid)
+        metrics.inc('sentiment_fallbacks_total', 'no_result', len(missing) - invalid)
+    for i in rest:
+        results[i] = known.get(texts[i], ('NEU', 50.0))
+    return results
+
+
+def encoder_id():
+    """Định danh encoder: vector của encoder khác nhau không so sánh được với nhau"""
+    backend = getattr(settings, 'SENTIMENT_BACKEND', 'torch')
+    # Backend ONNX chỉ xuất logits -> encoder chạy bằng torch fp32
+    return f"{MODEL_NAME}|{'torch' if backend == 'onnx' else backend}|mean"
+
+
+def load_encoder():
+    """
+    Encoder XLM-RoBERTa của model cảm xúc (không gồm lớp phân loại) -> (tokenizer, model)
+    Backend torch dùng lại đúng model đã tải, không tốn thêm RAM
+    """
+    global _encoder
+    if _encoder is not None:
+        return _encoder
+
+    with _encoder_lock:
+        if _encoder is not None:
+            return _encoder
+        backend = getattr(settings, 'SENTIMENT_BACKEND', 'torch')
+        if backend != 'onnx':
+            pipeline = load_model()
+            if pipeline is None:
+                raise RuntimeError(f"Sentiment model {MODEL_NAME} is not available")
+            _encoder = (pipeline.tokenizer, pipeline.model.base_model)
+        else:
+            logger.info(f"Loading encoder: {MODEL_NAME}")
+            from transformers import AutoModel, AutoTokenizer
+            from .services.sentiment_backends import configure_torch_threads
+            configure_torch_threads(
+                getattr(settings, 'SENTIMENT_TORCH_THREADS', None),
+                getattr(settings, 'SENTIMENT_TORCH_INTEROP_THREADS', None),
+            )
+            model = AutoModel.from_pretrained(MODEL_NAME)
+            model.eval()
+            _encoder = (AutoTokenizer.from_pretrained(MODEL_NAME), model)
+    return _encoder
+
+
+def _embed_local(texts):
+    import numpy as np
+    import torch
+
+    tokenizer, model = load_encoder()
+    max_tokens = chunking.max_input_tokens(tokenizer, getattr(settings, 'SENTIMENT_MAX_TOKENS', 512))
+    batch_size = getattr(settings, 'SENTIMENT_BATCH_SIZE', 16)
+
+    order = chunking.length_sorted_order(chunking.token_lengths(tokenizer, texts))
+    vectors = np.zeros((len(texts), model.config.hidden_size), dtype=np.float32)
+    with torch.inference_mode():
+        for start in range(0, len(order), batch_size):
+            rows = order[start:start + batch_size]
+            encoded = tokenizer(
+                [texts[i] for i in rows], padding=True, truncation=True, max_length=max_tokens,
+                return_tensors='pt',
+            )
+            hidden = model(**encoded).last_hidden_state
+            # Mean pooling trên các token thật (bỏ padding)
+            mask = encoded['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+            vectors[rows] = pooled.float().numpy()
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def embed_texts(texts):
+    """
+    Vector ngữ nghĩa (float32, đã chuẩn hoá L2) cho list text -> ndarray (len(texts), hidden_size)
+    Cấu hình SENTIMENT_SERVER_SOCKET -> chạy ở sentiment server, worker không cần tải model
+    Lỗi (model / server không sẵn sàng) -> exception
+    """
+    import numpy as np
+
+    texts = [t or '' for t in texts]
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    if _server_socket():
+        return np.asarray(_get_client().embed(texts), dtype=np.float32)
+    return _embed_local(texts)
@@ -11,4 +11,7 @@ class AppConfig(AppConfig):
         # Disable HF model online lookup to avoid network issues
         os.environ['HF_DATASETS_OFFLINE'] = '1'
         # Use local cache only
-        os.environ['TRANSFORMERS_OFFLINE'] = '1'
\ No newline at end of file
+        os.environ['TRANSFORMERS_OFFLINE'] = '1'
+
+        # Cập nhật index tìm kiếm ngữ nghĩa khi sửa sản phẩm
+        from . import signals  # noqa: F401
\ No newline at end of file
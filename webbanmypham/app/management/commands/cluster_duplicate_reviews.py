@@ -0,0 +1,72 @@
+"""
+Tính chữ ký MinHash cho review cũ và gom cụm review gần trùng nội dung (spam copy-paste)
+Chạy: python manage.py cluster_duplicate_reviews [--rebuild] [--mark-spam]
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from app.models import Review
+from app.services import near_duplicate
+
+
+class Command(BaseCommand):
+    help = 'Tính chữ ký MinHash / bảng LSH cho review cũ rồi gom cụm review gần trùng'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Tính lại chữ ký mọi review (mặc định chỉ review chưa có chữ ký)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Số review mỗi lần ghi bảng LSH')
+        parser.add_argument('--min-size', type=int,
+                            default=getattr(settings, 'SPAM_DUPLICATE_MIN_COPIES', 2) + 1,
+                            help='Chỉ báo cáo / đánh dấu cụm có từ chừng này review')
+        parser.add_argument('--show', type=int, default=10, help='Số cụm lớn nhất in ra')
+        parser.add_argument('--mark-spam', action='store_true',
+                            help='Đánh dấu spam mọi review trong cụm >= --min-size')
+
+    def handle(self, *args, **options):
+        queryset = Review.objects.exclude(comment='')
+        if not options['rebuild']:
+            # Bình luận quá ngắn cũng đã được đánh dấu (near_duplicate.NO_SIGNATURE) -> không tính lại mỗi lần chạy
+            queryset = queryset.filter(minhash__isnull=True)
+        queryset = queryset.only('id', 'comment').order_by('id')
+
+        started = time.monotonic()
+        last_id, indexed = 0, 0
+        while True:
+            batch = list(queryset.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            near_duplicate.index_reviews(batch)
+            last_id = batch[-1].id
+            indexed += len(batch)
+            self.stdout.write(f"  ✓ indexed up to id {last_id}: {indexed} reviews")
+        self.stdout.write(f"🚀 Indexed {indexed} reviews in {time.monotonic() - started:.1f}s, clustering...")
+
+        clusters = [c for c in near_duplicate.cluster_reviews() if len(c) >= options['min_size']]
+        total = sum(len(c) for c in clusters)
+        self.stdout.write(f"{len(clusters)} cụm / {total} review gần trùng (cụm >= {options['min_size']} review)")
+
+        for cluster in clusters[:options['show']]:
+            first = Review.objects.filter(id=cluster[0]).only('comment').first()
+            stats = Review.objects.filter(id__in=cluster).aggregate(
+                users=Count('user', distinct=True), products=Count('product', distinct=True),
+            )
+            preview = first.comment[:80] if first else ''
+            self.stdout.write(
+                f"  - {len(cluster)} review, {stats['users']} tài khoản, {stats['products']} sản phẩm: {preview}"
+            )
+
+        if options['mark_spam'] and clusters:
+            marked = 0
+            for cluster in clusters:
+                marked += Review.objects.filter(id__in=cluster, is_spam=False).update(
+                    is_spam=True,
+                    spam_reason=f"Trùng nội dung với {len(cluster) - 1} review khác",
+                    sentiment='SPAM',
+                )
+            self.stdout.write(f"Đã đánh dấu spam {marked} review")
+
+        self.stdout.write(self.style.SUCCESS("✅ Done"))
@@ -0,0 +1,72 @@
+"""
+Export model cảm xúc sang ONNX để chạy bằng onnxruntime
+Chạy: python manage.py export_sentiment_onnx [--quantize]
+Sau đó đặt SENTIMENT_BACKEND = 'onnx' trong settings
+"""
+import inspect
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app import ai_utils
+from app.services.sentiment_backends import ONNX_FILE_NAME
+
+
+class Command(BaseCommand):
+    help = 'Export model phân tích cảm xúc sang ONNX (chạy offline, 1 lần)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=str(getattr(settings, 'SENTIMENT_ONNX_DIR', 'ai_models/visobert-onnx')),
+                            help='Thư mục lưu model.onnx + tokenizer + config')
+        parser.add_argument('--opset', type=int, default=14)
+        parser.add_argument('--quantize', action='store_true',
+                            help='Lượng tử hoá int8 graph ONNX (onnxruntime dynamic quantization)')
+
+    def handle(self, *args, **options):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+        output = options['output']
+        os.makedirs(output, exist_ok=True)
+        onnx_path = os.path.join(output, ONNX_FILE_NAME)
+        export_path = onnx_path + '.fp32' if options['quantize'] else onnx_path
+
+        self.stdout.write(f"🚀 Exporting {ai_utils.MODEL_NAME} -> {onnx_path}")
+        tokenizer = AutoTokenizer.from_pretrained(ai_utils.MODEL_NAME)
+        model = AutoModelForSequenceClassification.from_pretrained(ai_utils.MODEL_NAME)
+        model.eval()
+
+        sample = tokenizer(ai_utils.WARMUP_TEXTS, padding=True, return_tensors='pt')
+        export_kwargs = {}
+        if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+            # torch mới mặc định dùng dynamo exporter, giữ exporter TorchScript cho dynamic_axes
+            export_kwargs['dynamo'] = False
+
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                (sample['input_ids'], sample['attention_mask']),
+                export_path,
+                input_names=['input_ids', 'attention_mask'],
+                output_names=['logits'],
+                dynamic_axes={
+                    'input_ids': {0: 'batch', 1: 'sequence'},
+                    'attention_mask': {0: 'batch', 1: 'sequence'},
+                    'logits': {0: 'batch'},
+                },
+                opset_version=options['opset'],
+                do_constant_folding=True,
+                **export_kwargs,
+            )
+
+        if options['quantize']:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(export_path, onnx_path, weight_type=QuantType.QInt8)
+            os.remove(export_path)
+
+        tokenizer.save_pretrained(output)
+        model.config.save_pretrained(output)
+
+        size_mb = os.path.getsize(onnx_path) / 1024 / 1024
+        self.stdout.write(self.style.SUCCESS(f"✅ Exported ({size_mb:.1f} MB). Set SENTIMENT_BACKEND = 'onnx' to use it."))
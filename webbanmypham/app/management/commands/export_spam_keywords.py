@@ -0,0 +1,31 @@
+"""
+Export danh sách spam keyword ra CSV / JSON (cùng định dạng với import_spam_keywords)
+Chạy: python manage.py export_spam_keywords blocklist.csv [--active-only]
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from app.services import spam_keyword_io
+
+
+class Command(BaseCommand):
+    help = 'Export spam keyword ra file CSV / JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="File đầu ra ('-' = in ra stdout)")
+        parser.add_argument('--format', choices=['csv', 'json'], help='Mặc định đoán theo đuôi file (stdout: csv)')
+        parser.add_argument('--active-only', action='store_true', help='Chỉ keyword đang bật')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = spam_keyword_io.detect_format(path, options['format'])
+        rows = spam_keyword_io.export_rows(active_only=options['active_only'])
+
+        if path == '-':
+            spam_keyword_io.write(rows, self.stdout, fmt)
+            return
+        try:
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                spam_keyword_io.write(rows, f, fmt)
+        except OSError as e:
+            raise CommandError(f"Không ghi được {path}: {e}")
+        self.stdout.write(self.style.SUCCESS(f"✅ Exported keywords to {path} ({fmt})"))
@@ -0,0 +1,54 @@
+"""
+Import danh sách spam keyword từ CSV / JSON (thêm mới + cập nhật, 1 transaction)
+CSV: dòng tiêu đề keyword,category,severity,is_active,description (chỉ keyword là bắt buộc)
+JSON: [{"keyword": "...", "category": "...", ...}, ...] hoặc ["keyword", ...]
+Chạy: python manage.py import_spam_keywords blocklist.csv [--dry-run]
+"""
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.services import spam_keyword_io
+
+
+class Command(BaseCommand):
+    help = 'Import spam keyword từ file CSV / JSON bằng bulk upsert'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File CSV / JSON ('-' = đọc từ stdin)")
+        parser.add_argument('--format', choices=['csv', 'json'], help='Mặc định đoán theo đuôi file')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Số keyword mỗi câu lệnh INSERT')
+        parser.add_argument('--dry-run', action='store_true', help='Chỉ đếm số keyword thêm / sửa, không ghi')
+        parser.add_argument('--strict', action='store_true', help='Có dòng lỗi -> dừng, không import gì')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = spam_keyword_io.detect_format(path, options['format'])
+        try:
+            if path == '-':
+                raw = spam_keyword_io.parse(sys.stdin, fmt)
+            else:
+                with open(path, encoding='utf-8-sig', newline='') as f:
+                    raw = spam_keyword_io.parse(f, fmt)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Không đọc được {path}: {e}")
+
+        rows, errors = spam_keyword_io.clean_rows(raw)
+        for error in errors[:20]:
+            self.stderr.write(f"  ✗ {error}")
+        if len(errors) > 20:
+            self.stderr.write(f"  ... và {len(errors) - 20} lỗi khác")
+        if errors and options['strict']:
+            raise CommandError(f"{len(errors)} dòng lỗi, không import")
+
+        self.stdout.write(f"🚀 Importing {len(rows)} keywords ({fmt}, {len(raw) - len(rows) - len(errors)} trùng lặp trong file)")
+        started = time.monotonic()
+        counts = spam_keyword_io.upsert_keywords(rows, chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        elapsed = time.monotonic() - started
+
+        prefix = '(dry run) ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {prefix}Created: {counts['created']}, updated: {counts['updated']}, "
+            f"unchanged: {counts['unchanged']}, skipped: {len(errors)} ({elapsed:.2f}s)"
+        ))
@@ -0,0 +1,110 @@
+"""
+Worker phân tích review chạy nền
+Chạy: python manage.py process_review_queue
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app import ai_utils
+from app.services import product_search, spam_recheck
+from app.services.review_analysis import claim_pending_reviews, pending_count, process_reviews
+
+
+class Command(BaseCommand):
+    help = 'Lấy review đang chờ trong DB, chấm cảm xúc + spam theo batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=getattr(settings, 'REVIEW_ANALYSIS_BATCH_SIZE', 32),
+                            help='Số review tối đa mỗi batch')
+        parser.add_argument('--poll-interval', type=float,
+                            default=getattr(settings, 'REVIEW_ANALYSIS_POLL_INTERVAL', 2),
+                            help='Số giây chờ khi hàng đợi trống')
+        parser.add_argument('--target-batch-seconds', type=float,
+                            default=getattr(settings, 'REVIEW_ANALYSIS_TARGET_BATCH_SECONDS', 5),
+                            help='Batch chạy lâu hơn mức này thì giảm batch size')
+        parser.add_argument('--once', action='store_true',
+                            help='Xử lý hết hàng đợi rồi thoát (dùng cho cron)')
+        parser.add_argument('--no-warmup', action='store_true',
+                            help='Không tải model trước khi nhận review')
+        parser.add_argument('--no-spam-recheck', action='store_true',
+                            help='Lúc hàng đợi trống không kiểm tra lại spam review cũ (xem manage.py recheck_spam)')
+
+    def handle(self, *args, **options):
+        max_batch = max(1, options['batch_size'])
+        poll_interval = options['poll_interval']
+        target = options['target_batch_seconds']
+        max_backoff = getattr(settings, 'REVIEW_ANALYSIS_MAX_BACKOFF', 60)
+
+        batch_size = max_batch
+        consecutive_failures = 0
+        total_done = total_failed = 0
+
+        if not options['no_warmup']:
+            # Tải model trước để batch đầu tiên không phải chờ import torch
+            try:
+                ai_utils.warmup()
+            except RuntimeError as e:
+                self.stderr.write(f"✗ Warm-up failed: {e}")
+
+        self.stdout.write(f"🚀 Review worker started (batch={max_batch}, pending={pending_count()})")
+        try:
+            while True:
+                reviews = claim_pending_reviews(batch_size)
+                if not reviews:
+                    # Rảnh -> chấm lại 1 batch review kiểm tra theo bộ keyword cũ
+                    if not options['no_spam_recheck'] and self._recheck_spam():
+                        continue
+                    self._reindex_search()
+                    if options['once']:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                started = time.monotonic()
+                done, failed = process_reviews(reviews)
+                elapsed = time.monotonic() - started
+                total_done += done
+                total_failed += failed
+                self.stdout.write(f"  • batch={len(reviews)} done={done} failed={failed} ({elapsed:.2f}s)")
+
+                # Back-pressure: batch chậm -> giảm batch size, nhanh -> tăng lại
+                if elapsed > target and batch_size > 1:
+                    batch_size = max(1, batch_size // 2)
+                elif elapsed < target / 2 and batch_size < max_batch:
+                    batch_size = min(max_batch, batch_size * 2)
+
+                # Lỗi liên tiếp (VD: model không tải được) -> chờ lâu dần trước khi thử lại
+                if failed and not done:
+                    consecutive_failures += 1
+                    delay = min(max_backoff, poll_interval * 2 ** consecutive_failures)
+                    self.stderr.write(f"  ✗ Batch failed, retrying in {delay:.0f}s")
+                    time.sleep(delay)
+                else:
+                    consecutive_failures = 0
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping worker...")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Done: {total_done} analyzed, {total_failed} failed"))
+
+    def _recheck_spam(self):
+        try:
+            checked, flagged = spam_recheck.recheck_batch()
+        except Exception as e:
+            self.stderr.write(f"  ✗ Spam recheck failed: {e}")
+            return False
+        if checked:
+            self.stdout.write(f"  • spam recheck: {checked} checked, {flagged} flagged")
+        return checked > 0
+
+    def _reindex_search(self):
+        # Sản phẩm sửa trên web chờ embed lại (xem product_search.mark_dirty)
+        try:
+            embedded = product_search.reindex_dirty()
+        except Exception as e:
+            self.stderr.write(f"  ✗ Search index update failed: {e}")
+            return
+        if embedded:
+            self.stdout.write(f"  • search index: {embedded} product(s) embedded")
@@ -0,0 +1,34 @@
+"""
+Tính lại thống kê đánh giá của sản phẩm (ProductReviewStats) từ bảng Review
+Dùng khi thống kê bị lệch (sửa database bằng tay, import dữ liệu...) hoặc để kiểm tra định kỳ
+Chạy: python manage.py rebuild_review_stats [--product 12 --product 15] [--check]
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.services import review_stats
+
+
+class Command(BaseCommand):
+    help = 'Tính lại rating trung bình, số đánh giá, tỉ lệ cảm xúc của sản phẩm từ bảng Review'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--product', type=int, action='append', dest='products', help='Chỉ tính lại sản phẩm này (lặp lại được)')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Số sản phẩm mỗi lần tính')
+        parser.add_argument('--check', action='store_true', help='Chỉ báo số sản phẩm bị lệch, không ghi')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        products, drifted = review_stats.rebuild(
+            options['products'], chunk_size=options['chunk_size'], dry_run=options['check'],
+        )
+        elapsed = time.monotonic() - started
+        if options['check']:
+            if drifted:
+                raise CommandError(f"✗ {drifted}/{products} products have drifted stats (run without --check to fix)")
+            self.stdout.write(self.style.SUCCESS(f"✅ {products} products checked, stats match ({elapsed:.1f}s)"))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Rebuilt stats for {products} products in {elapsed:.1f}s ({drifted} had drifted)"
+        ))
@@ -0,0 +1,43 @@
+"""
+Kiểm tra lại spam cho review đã kiểm tra theo bộ keyword / bộ phân loại cũ (từng batch, có thể giới hạn số batch)
+Chạy: python manage.py recheck_spam [--batch-size 500] [--max-batches 10] [--sleep 0.5]
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app.services import spam_recheck
+
+
+class Command(BaseCommand):
+    help = 'Chấm lại spam cho review có spam_checked_version cũ hơn bộ keyword / bộ phân loại hiện tại'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'SPAM_RECHECK_BATCH_SIZE', 500),
+                            help='Số review mỗi batch')
+        parser.add_argument('--max-batches', type=int, default=0, help='Dừng sau chừng này batch (0 = chạy hết)')
+        parser.add_argument('--sleep', type=float, default=0, help='Số giây nghỉ giữa 2 batch (giảm tải database)')
+
+    def handle(self, *args, **options):
+        batches = checked_total = flagged_total = 0
+        while True:
+            checked, flagged = spam_recheck.recheck_batch(options['batch_size'])
+            checked_total += checked
+            flagged_total += flagged
+            if not checked:
+                break
+            batches += 1
+            progress = spam_recheck.progress_summary()
+            self.stdout.write(
+                f"  ✓ batch {batches}: {checked} checked, {flagged} flagged "
+                f"({progress['percent']}%, {progress['remaining']} remaining)"
+            )
+            if options['max_batches'] and batches >= options['max_batches']:
+                break
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Done: {checked_total} reviews rechecked, {flagged_total} flagged as spam"
+        ))
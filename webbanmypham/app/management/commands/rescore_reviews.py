@@ -0,0 +1,129 @@
+"""
+Chấm lại cảm xúc cho review cũ (VD: review trước migration 0002 vẫn là NEU / 0.0)
+Chạy: python manage.py rescore_reviews
+Chạy song song nhiều process: python manage.py rescore_reviews --shard 0 --shards 4  (shard 1, 2, 3 ở process khác)
+"""
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from app.ai_utils import analyze_sentiment_batch
+from app.models import Review
+
+
+class Command(BaseCommand):
+    help = 'Chấm lại cảm xúc review cũ theo batch, ghi bằng bulk_update, có checkpoint để chạy tiếp'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Chấm lại mọi review (mặc định chỉ review chưa có điểm: confidence_score = 0)')
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'SENTIMENT_BATCH_SIZE', 16) * 4,
+                            help='Số review mỗi lần gọi model + bulk_update')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='chunk_size cho .iterator()')
+        parser.add_argument('--page-size', type=int, default=20000,
+                            help='Số review mỗi lần query (keyset theo id, giới hạn RAM kể cả trên MySQL)')
+        parser.add_argument('--min-id', type=int, help='Chỉ xử lý review có id >= min-id')
+        parser.add_argument('--max-id', type=int, help='Chỉ xử lý review có id <= max-id')
+        parser.add_argument('--shard', type=int, default=0, help='Chỉ số shard của process này (0..shards-1)')
+        parser.add_argument('--shards', type=int, default=1, help='Tổng số process chạy song song')
+        parser.add_argument('--checkpoint-dir', default=str(settings.BASE_DIR / 'var'),
+                            help='Thư mục lưu checkpoint (id cuối cùng đã xử lý)')
+        parser.add_argument('--reset', action='store_true', help='Bỏ checkpoint cũ, chạy lại từ đầu')
+
+    def handle(self, *args, **options):
+        if not 0 <= options['shard'] < options['shards']:
+            raise CommandError('--shard phải nằm trong khoảng 0..shards-1')
+
+        queryset = Review.objects.filter(is_spam=False)
+        if not options['all']:
+            queryset = queryset.filter(confidence_score=0)
+
+        checkpoint_path = os.path.join(
+            options['checkpoint_dir'],
+            f"rescore_reviews_shard{options['shard']}of{options['shards']}.json",
+        )
+        if os.path.exists(checkpoint_path) and not options['reset']:
+            # Giữ nguyên khoảng id của lần chạy trước để chạy tiếp đúng chỗ
+            with open(checkpoint_path, encoding='utf-8') as f:
+                state = json.load(f)
+            min_id, max_id = state['min_id'], state['max_id']
+            self.stdout.write(f"↻ Resuming after id {state['last_id']} ({state['processed']} done)")
+        else:
+            min_id, max_id = self._id_range(options)
+            if min_id is None:
+                self.stdout.write("Không có review nào cần chấm lại")
+                return
+            state = {'min_id': min_id, 'max_id': max_id, 'last_id': min_id - 1, 'processed': 0}
+
+        self.stdout.write(f"🚀 Rescoring reviews id {min_id}..{max_id} (shard {options['shard']}/{options['shards']})")
+        queryset = queryset.filter(id__lte=max_id).only('id', 'comment', 'rating').order_by('id')
+        started = time.monotonic()
+
+        while True:
+            page = queryset.filter(id__gt=state['last_id'])[:options['page_size']]
+            batch = []
+            seen = 0
+            for review in page.iterator(chunk_size=options['chunk_size']):
+                seen += 1
+                batch.append(review)
+                if len(batch) >= options['batch_size']:
+                    self._flush(batch, state, checkpoint_path, started)
+                    batch = []
+            if batch:
+                self._flush(batch, state, checkpoint_path, started)
+            if seen < options['page_size']:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Done: {state['processed']} reviews rescored"))
+
+    def _id_range(self, options):
+        """Khoảng id của shard này (chia đều [min, max] cho các shard)"""
+        bounds = Review.objects.aggregate(lo=Min('id'), hi=Max('id'))
+        lo, hi = bounds['lo'], bounds['hi']
+        if lo is None:
+            return None, None
+        if options['min_id'] is not None:
+            lo = max(lo, options['min_id'])
+        if options['max_id'] is not None:
+            hi = min(hi, options['max_id'])
+        if lo > hi:
+            return None, None
+
+        span = (hi - lo + options['shards']) // options['shards']
+        shard_lo = lo + options['shard'] * span
+        shard_hi = min(hi, shard_lo + span - 1)
+        if shard_lo > shard_hi:
+            return None, None
+        return shard_lo, shard_hi
+
+    def _flush(self, batch, state, checkpoint_path, started):
+        try:
+            sentiments = analyze_sentiment_batch(
+                [r.comment for r in batch], raise_errors=True, ratings=[r.rating for r in batch],
+            )
+        except Exception as e:
+            raise CommandError(f"Scoring failed after id {state['last_id']}, rerun to resume: {e}")
+
+        for review, (label, score) in zip(batch, sentiments):
+            review.sentiment = label
+            review.confidence_score = score
+        Review.objects.bulk_update(batch, ['sentiment', 'confidence_score'], batch_size=len(batch))
+
+        state['last_id'] = batch[-1].id
+        state['processed'] += len(batch)
+        self._save_checkpoint(checkpoint_path, state)
+
+        rate = state['processed'] / max(time.monotonic() - started, 1e-6)
+        self.stdout.write(f"  ✓ up to id {state['last_id']}: {state['processed']} done ({rate:.0f} reviews/s)")
+
+    def _save_checkpoint(self, path, state):
+        # Ghi file tạm rồi đổi tên -> checkpoint không bị hỏng nếu process bị kill giữa chừng
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
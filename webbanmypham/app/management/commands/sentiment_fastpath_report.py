@@ -0,0 +1,73 @@
+"""
+So sánh phân loại nhanh bằng từ điển với model đầy đủ
+-> tỉ lệ review đi đường nhanh, tỉ lệ trùng nhãn với model, độ chính xác mất đi theo từng ngưỡng
+Chạy: python manage.py sentiment_fastpath_report [--limit 2000] [--thresholds 70,80,90,95]
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app import ai_utils
+from app.models import Review
+from app.services import sentiment_lexicon as lexicon
+from app.services.sentiment_corpus import SAMPLE_REVIEWS
+
+
+class Command(BaseCommand):
+    help = 'Báo cáo độ trùng khớp giữa phân loại nhanh (từ điển) và model cảm xúc'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', choices=['db', 'sample'], default='db',
+                            help='db: review mới nhất trong database | sample: bộ bình luận mẫu')
+        parser.add_argument('--limit', type=int, default=2000, help='Số review tối đa lấy từ database')
+        parser.add_argument('--thresholds', default='70,80,90,95',
+                            help='Các ngưỡng độ tin cậy cần so sánh (phân cách bằng dấu phẩy)')
+        parser.add_argument('--examples', type=int, default=5, help='Số ví dụ lệch nhãn in ra ở ngưỡng hiện tại')
+
+    def handle(self, *args, **options):
+        if options['source'] == 'db':
+            rows = list(
+                Review.objects.filter(is_spam=False).exclude(comment='')
+                .order_by('-id').values_list('comment', 'rating')[:options['limit']]
+            )
+        else:
+            rows = [(text, None) for text in SAMPLE_REVIEWS]
+        if not rows:
+            raise CommandError('Không có review nào để so sánh (thử --source sample)')
+
+        texts = [text for text, _ in rows]
+        max_words = getattr(settings, 'SENTIMENT_FAST_PATH_MAX_WORDS', 20)
+        fast = [lexicon.classify(text, rating, max_words=max_words) for text, rating in rows]
+
+        self.stdout.write(f"🚀 Scoring {len(texts)} reviews with {ai_utils.MODEL_NAME}...")
+        try:
+            full = ai_utils.analyze_sentiment_batch(
+                texts, raise_errors=True, ratings=[rating for _, rating in rows], fast_path=False,
+            )
+        except Exception as e:
+            raise CommandError(f"Model scoring failed: {e}")
+
+        current = getattr(settings, 'SENTIMENT_FAST_PATH_THRESHOLD', 90)
+        thresholds = sorted({float(t) for t in options['thresholds'].split(',') if t} | {float(current)})
+
+        self.stdout.write(f"\n{'ngưỡng':>7} {'đường nhanh':>12} {'trùng nhãn':>11} {'lệch / tổng':>12}")
+        for threshold in thresholds:
+            taken = [i for i, result in enumerate(fast) if result is not None and result[1] >= threshold]
+            agree = sum(1 for i in taken if fast[i][0] == full[i][0])
+            coverage = 100 * len(taken) / len(texts)
+            agreement = 100 * agree / len(taken) if taken else 100.0
+            cost = 100 * (len(taken) - agree) / len(texts)
+            marker = '  <- SENTIMENT_FAST_PATH_THRESHOLD' if threshold == current else ''
+            self.stdout.write(f"{threshold:>7g} {coverage:>11.1f}% {agreement:>10.1f}% {cost:>11.2f}%{marker}")
+
+        mismatches = [
+            i for i, result in enumerate(fast)
+            if result is not None and result[1] >= current and result[0] != full[i][0]
+        ]
+        if mismatches and options['examples']:
+            self.stdout.write(f"\nVí dụ lệch nhãn (ngưỡng {current:g}):")
+            for i in mismatches[:options['examples']]:
+                self.stdout.write(f"  - từ điển {fast[i]} / model {full[i]}: {texts[i][:80]}")
+
+        self.stdout.write(self.style.SUCCESS(
+            "\n✅ 'lệch / tổng' = phần trăm review bị gán nhãn khác model nếu dùng ngưỡng đó"
+        ))
@@ -0,0 +1,44 @@
+"""
+Sentiment server dùng chung cho mọi web worker (1 bản model duy nhất)
+Chạy: python manage.py sentiment_server
+Web worker dùng server khi đặt SENTIMENT_SERVER_SOCKET trong settings
+"""
+import signal
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app import ai_utils
+from app.services.sentiment_server import SentimentServer
+
+
+class Command(BaseCommand):
+    help = 'Chạy sentiment server trên Unix socket, giữ 1 bản model và gom batch cho mọi worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default=getattr(settings, 'SENTIMENT_SERVER_SOCKET', None),
+                            help='Đường dẫn Unix socket (mặc định SENTIMENT_SERVER_SOCKET)')
+
+    def handle(self, *args, **options):
+        socket_path = options['socket']
+        if not socket_path:
+            raise CommandError('Cần --socket hoặc SENTIMENT_SERVER_SOCKET trong settings')
+
+        # Process này chạy model tại chỗ, không gửi ngược lại chính nó
+        ai_utils.serve_locally()
+        try:
+            ai_utils.warmup()
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        server = SentimentServer(socket_path)
+        # systemd / supervisor dừng bằng SIGTERM -> vẫn dọn file socket
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        self.stdout.write(self.style.SUCCESS(f"✅ Sentiment server listening on {socket_path}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping sentiment server...")
+        finally:
+            server.server_close()
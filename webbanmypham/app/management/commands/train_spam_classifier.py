@@ -0,0 +1,109 @@
+"""
+Train bộ phân loại spam tuyến tính từ review đã gán nhãn
+- Spam: is_spam=True hoặc bị ẩn (is_approved=False)
+  (bỏ review chỉ do chính bộ phân loại đánh dấu -> không tự học lại quyết định cũ của mình)
+- Bình thường: review đã phân tích xong, không spam, đang hiện
+Chạy: python manage.py train_spam_classifier [--holdout 0.2] [--target-precision 0.95]
+"""
+import random
+import time
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from app.models import Review
+from app.services import review_service, spam_classifier
+
+
+class Command(BaseCommand):
+    help = 'Train logistic regression (n-gram băm, NumPy) phát hiện spam, lưu ra SPAM_CLASSIFIER_PATH'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=spam_classifier.model_path(), help='File .npz đầu ra')
+        parser.add_argument('--holdout', type=float, default=0.2, help='Tỉ lệ dữ liệu giữ lại để đánh giá / chọn ngưỡng')
+        parser.add_argument('--target-precision', type=float,
+                            default=getattr(settings, 'SPAM_CLASSIFIER_TARGET_PRECISION', 0.95),
+                            help='Chọn ngưỡng thấp nhất đạt precision này trên tập holdout')
+        parser.add_argument('--epochs', type=int, default=200)
+        parser.add_argument('--min-examples', type=int, default=20, help='Số review spam tối thiểu để train')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        spam = Q(is_spam=True) | Q(is_approved=False)
+        rows = list(
+            Review.objects.filter(spam | Q(analysis_status=Review.ANALYSIS_DONE))
+            .exclude(comment='')
+            .exclude(is_spam=True, is_approved=True, spam_reason__startswith=review_service.MODEL_SPAM_REASON)
+            .values_list('comment', 'is_spam', 'is_approved', 'spam_reason')
+        )
+        texts = [comment for comment, _, _, _ in rows]
+        labels = [int(is_spam or not is_approved) for _, is_spam, is_approved, _ in rows]
+        positives = sum(labels)
+        if positives < options['min_examples'] or len(labels) - positives < options['min_examples']:
+            raise CommandError(
+                f"Chưa đủ dữ liệu: {positives} spam / {len(labels) - positives} bình thường "
+                f"(cần >= {options['min_examples']} mỗi loại)"
+            )
+
+        reasons = Counter(reason.split(':')[0] for _, is_spam, _, reason in rows if is_spam and reason)
+        self.stdout.write(f"🚀 {len(labels)} reviews: {positives} spam, {len(labels) - positives} normal")
+        for reason, count in reasons.most_common(5):
+            self.stdout.write(f"    {count:>6}  {reason}")
+
+        order = list(range(len(texts)))
+        random.Random(options['seed']).shuffle(order)
+        cut = int(len(order) * (1 - options['holdout']))
+        train, test = order[:cut], order[cut:]
+
+        started = time.monotonic()
+        model = spam_classifier.SpamClassifier.train(
+            [texts[i] for i in train], [labels[i] for i in train], epochs=options['epochs'],
+        )
+        self.stdout.write(f"  ✓ trained on {len(train)} reviews in {time.monotonic() - started:.1f}s")
+
+        metrics = {}
+        if test:
+            y = np.array([labels[i] for i in test])
+            probabilities = model.predict_proba([texts[i] for i in test])
+            model.threshold = self._pick_threshold(probabilities, y, options['target_precision'])
+            metrics = self._metrics(probabilities >= model.threshold, y)
+            self.stdout.write(
+                f"  holdout {len(test)}: precision {metrics['precision']:.3f}, recall {metrics['recall']:.3f}, "
+                f"f1 {metrics['f1']:.3f} @ threshold {model.threshold:.2f}"
+            )
+
+        model.meta = {
+            'trained_at': timezone.now().isoformat(),
+            'examples': len(train),
+            'positives': positives,
+            'holdout': metrics,
+        }
+        model.save(options['output'])
+        started = time.perf_counter()
+        model.predict_proba(texts[:1000])
+        per_comment = (time.perf_counter() - started) / min(len(texts), 1000) * 1e6
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Saved {options['output']} (threshold {model.threshold:.2f}, ~{per_comment:.0f} µs/comment)"
+        ))
+        self.stdout.write("  Review cũ sẽ được chấm lại bằng model mới (manage.py recheck_spam / process_review_queue)")
+
+    def _pick_threshold(self, probabilities, y, target_precision):
+        """Ngưỡng thấp nhất (recall cao nhất) mà precision trên holdout >= target; không đạt -> 0.9"""
+        for threshold in np.arange(0.5, 0.99, 0.01):
+            predicted = probabilities >= threshold
+            if predicted.sum() and self._metrics(predicted, y)['precision'] >= target_precision:
+                return round(float(threshold), 2)
+        return 0.9
+
+    def _metrics(self, predicted, y):
+        tp = int((predicted & (y == 1)).sum())
+        fp = int((predicted & (y == 0)).sum())
+        fn = int((~predicted & (y == 1)).sum())
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        return {'precision': precision, 'recall': recall, 'f1': f1}
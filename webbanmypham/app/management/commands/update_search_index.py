@@ -0,0 +1,64 @@
+"""
+Tạo / cập nhật index tìm kiếm ngữ nghĩa cho sản phẩm
+Chạy: python manage.py update_search_index                  (chỉ embed sản phẩm mới / đã sửa)
+      python manage.py update_search_index --ivf-lists 256  (chia cụm cho catalog lớn)
+      python manage.py update_search_index --rebuild        (đổi model -> embed lại toàn bộ)
+"""
+import shutil
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app import ai_utils
+from app.models import Product
+from app.services import product_search
+
+
+class Command(BaseCommand):
+    help = 'Embed sản phẩm mới / đã sửa vào index tìm kiếm ngữ nghĩa (memmap trên đĩa)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Xoá index cũ, embed lại toàn bộ catalog')
+        parser.add_argument('--batch-size', type=int, default=64, help='Số sản phẩm mỗi lần embed')
+        parser.add_argument('--ivf-lists', type=int,
+                            help='Số cụm IVF (k-means) cho catalog lớn; 0 = bỏ chia cụm')
+
+    def handle(self, *args, **options):
+        index = product_search.get_index()
+        meta = index.meta()
+        if options['rebuild']:
+            shutil.rmtree(index.path, ignore_errors=True)
+        elif meta and meta.get('model') != ai_utils.encoder_id():
+            raise CommandError(
+                f"Index was built with {meta.get('model')}, current encoder is {ai_utils.encoder_id()}; "
+                "run with --rebuild"
+            )
+
+        started = time.monotonic()
+        products = Product.objects.only('id', 'name', 'description', 'main_ingredients').order_by('id')
+        try:
+            embedded = product_search.index_products(products.iterator(chunk_size=500),
+                                                     batch_size=options['batch_size'])
+            # Hàng đợi từ web: sản phẩm sửa trong lúc đang chạy (đã embed ở trên -> hash trùng, bỏ qua)
+            embedded += product_search.reindex_dirty(batch_size=options['batch_size'])
+        except Exception as e:
+            raise CommandError(f"Embedding failed: {e}")
+
+        # Sản phẩm đã bị xoá khỏi database
+        stale = set(index.stored_hashes()) - set(Product.objects.values_list('id', flat=True))
+        index.remove(stale)
+
+        if options['ivf_lists'] is not None and index.exists():
+            if options['ivf_lists'] > 0:
+                try:
+                    index.build_ivf(options['ivf_lists'])
+                except ValueError as e:
+                    raise CommandError(str(e))
+            else:
+                index.drop_ivf()
+
+        meta = index.meta() or {'count': 0, 'ivf_lists': 0}
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Embedded {embedded} product(s), removed {len(stale)} "
+            f"({meta['count']} rows, {meta['ivf_lists']} IVF lists) in {time.monotonic() - started:.1f}s"
+        ))
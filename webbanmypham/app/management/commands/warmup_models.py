@@ -0,0 +1,22 @@
+"""
+Tải + chạy thử model AI trước khi worker nhận traffic
+Chạy: python manage.py warmup_models
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from app import ai_utils
+
+
+class Command(BaseCommand):
+    help = 'Tải model phân tích cảm xúc và chạy thử 1 lần inference'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"🚀 Warming up {ai_utils.MODEL_NAME}...")
+        try:
+            timings = ai_utils.warmup()
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        for step, seconds in timings.items():
+            self.stdout.write(f"   - {step}: {seconds * 1000:.0f} ms")
+        self.stdout.write(self.style.SUCCESS("✅ Model ready"))
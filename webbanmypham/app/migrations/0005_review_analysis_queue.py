@@ -0,0 +1,38 @@
+# Generated by Django 4.2.27 on 2026-10-18 08:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_spamkeyword'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='analysis_attempts',
+            field=models.IntegerField(default=0, verbose_name='Số lần phân tích'),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='analysis_claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Thời điểm worker nhận xử lý'),
+        ),
+        # Review cũ đã được phân tích đồng bộ lúc gửi -> đánh dấu DONE
+        migrations.AddField(
+            model_name='review',
+            name='analysis_status',
+            field=models.CharField(choices=[('PENDING', 'Chờ phân tích'), ('PROCESSING', 'Đang phân tích'), ('DONE', 'Đã phân tích'), ('FAILED', 'Phân tích lỗi')], default='DONE', max_length=10, verbose_name='Trạng thái phân tích'),
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='analysis_status',
+            field=models.CharField(choices=[('PENDING', 'Chờ phân tích'), ('PROCESSING', 'Đang phân tích'), ('DONE', 'Đã phân tích'), ('FAILED', 'Phân tích lỗi')], default='PENDING', max_length=10, verbose_name='Trạng thái phân tích'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['analysis_status', 'id'], name='review_analysis_queue_idx'),
+        ),
+    ]
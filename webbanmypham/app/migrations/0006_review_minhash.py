@@ -0,0 +1,31 @@
+# Generated by Django 4.2.27 on 2026-10-18 08:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_review_analysis_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='minhash',
+            field=models.BinaryField(blank=True, null=True, verbose_name='Chữ ký MinHash'),
+        ),
+        migrations.CreateModel(
+            name='ReviewMinHashBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField(db_index=True, verbose_name='Bucket LSH')),
+                ('review', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='minhash_buckets', to='app.review')),
+            ],
+            options={
+                'verbose_name': 'Bucket LSH của review',
+                'verbose_name_plural': 'Bucket LSH của review',
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.27 on 2026-10-18 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_review_minhash'),
+    ]
+
+    operations = [
+        # Review cũ = '' -> được kiểm tra lại 1 lần theo bộ keyword hiện tại (manage.py recheck_spam)
+        migrations.AddField(
+            model_name='review',
+            name='spam_checked_version',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=40, verbose_name='Version bộ keyword đã kiểm tra'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.27 on 2026-10-18 08:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Q, Sum
+
+
+def fill_stats(apps, schema_editor):
+    """Tính thống kê cho sản phẩm đã có (sau này: manage.py rebuild_review_stats)"""
+    Product = apps.get_model('app', 'Product')
+    Review = apps.get_model('app', 'Review')
+    ProductReviewStats = apps.get_model('app', 'ProductReviewStats')
+
+    totals = {
+        row.pop('product_id'): row
+        for row in Review.objects.filter(is_approved=True, is_spam=False).order_by().values('product_id').annotate(
+            review_count=Count('id'),
+            rating_sum=Sum('rating'),
+            pos_count=Count('id', filter=Q(sentiment='POS', analysis_status='DONE')),
+            neg_count=Count('id', filter=Q(sentiment='NEG', analysis_status='DONE')),
+            neu_count=Count('id', filter=Q(sentiment='NEU', analysis_status='DONE')),
+        )
+    }
+    ProductReviewStats.objects.bulk_create(
+        [ProductReviewStats(product_id=pid, **totals.get(pid, {})) for pid in Product.objects.values_list('id', flat=True)],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_review_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductReviewStats',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='review_stats', serialize=False, to='app.product')),
+                ('review_count', models.IntegerField(default=0, verbose_name='Số đánh giá')),
+                ('rating_sum', models.IntegerField(default=0, verbose_name='Tổng số sao')),
+                ('pos_count', models.IntegerField(default=0, verbose_name='Số đánh giá tích cực')),
+                ('neg_count', models.IntegerField(default=0, verbose_name='Số đánh giá tiêu cực')),
+                ('neu_count', models.IntegerField(default=0, verbose_name='Số đánh giá trung tính')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Thống kê đánh giá sản phẩm',
+                'verbose_name_plural': 'Thống kê đánh giá sản phẩm',
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
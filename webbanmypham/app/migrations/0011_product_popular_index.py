@@ -0,0 +1,17 @@
+# Generated by Django 4.2.27 on 2026-10-18 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_review_product_page_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['views', 'id'], name='product_popular_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.27 on 2026-10-18 09:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_product_popular_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpamRecheckProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=40, verbose_name='Version bộ luật spam')),
+                ('total', models.IntegerField(default=0, verbose_name='Số review cần kiểm tra')),
+                ('remaining', models.IntegerField(default=0, verbose_name='Số review còn lại')),
+                ('flagged', models.IntegerField(default=0, verbose_name='Số review mới bị đánh dấu spam')),
+                ('last_id', models.BigIntegerField(default=0, verbose_name='Id review kiểm tra gần nhất')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Cập nhật lần cuối')),
+            ],
+            options={
+                'verbose_name': 'Tiến độ kiểm tra lại spam',
+                'verbose_name_plural': 'Tiến độ kiểm tra lại spam',
+            },
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 
@@ -98,6 +98,12 @@ class Product(models.Model):
     status = models.BooleanField(default=True, verbose_name="Đang kinh doanh")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Sắp xếp theo lượt xem (shop ?sort=popular, "Xu hướng" ở trang chủ)
+            models.Index(fields=['views', 'id'], name='product_popular_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -166,6 +172,38 @@ class OrderItem(models.Model):
 # ĐÁNH GIÁ (REVIEWS)
 
 
+class ReviewQuerySet(models.QuerySet):
+    """
+    update / bulk_create không gửi signal save
+    -> tự cập nhật ProductReviewStats (trong cùng transaction) khi đổi field ảnh hưởng thống kê
+    (bulk_update của Django gọi update() theo từng batch nên cũng đi qua đây)
+    """
+
+    def update(self, **kwargs):
+        from app.services import review_stats
+
+        if not review_stats.STAT_FIELDS.intersection(kwargs):
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            before = review_stats.snapshot(self)
+            rows = super().update(**kwargs)
+            after = review_stats.snapshot(self.model._base_manager.using(self.db).filter(id__in=before))
+            review_stats.apply_changes((before[pk], after.get(pk)) for pk in before)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from app.services import review_stats
+
+        with transaction.atomic(using=self.db):
+            created = super().bulk_create(objs, *args, **kwargs)
+            if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+                # Không biết dòng nào thật sự được thêm -> tính lại các sản phẩm liên quan
+                review_stats.rebuild({obj.product_id for obj in created})
+            else:
+                review_stats.apply_changes((None, review_stats.row_of(obj)) for obj in created)
+        return created
+
+
 class Review(models.Model):
     # --- CÁC LỰA CHỌN CHO AI ---
     SENTIMENT_CHOICES = [
@@ -175,6 +213,18 @@ class Review(models.Model):
         ('SPAM', 'Spam'),
     ]
 
+    # --- TRẠNG THÁI PHÂN TÍCH (hàng đợi xử lý nền) ---
+    ANALYSIS_PENDING = 'PENDING'
+    ANALYSIS_PROCESSING = 'PROCESSING'
+    ANALYSIS_DONE = 'DONE'
+    ANALYSIS_FAILED = 'FAILED'
+    ANALYSIS_STATUS_CHOICES = [
+        (ANALYSIS_PENDING, 'Chờ phân tích'),
+        (ANALYSIS_PROCESSING, 'Đang phân tích'),
+        (ANALYSIS_DONE, 'Đã phân tích'),
+        (ANALYSIS_FAILED, 'Phân tích lỗi'),
+    ]
+
     # ---  LIÊN KẾT DỮ LIỆU ---
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
@@ -192,17 +242,151 @@ class Review(models.Model):
     # ---  SPAM DETECTION ---
     is_spam = models.BooleanField(default=False, verbose_name="Là spam")
     spam_reason = models.CharField(max_length=255, blank=True, verbose_name="Lý do spam")
+    # Version bộ spam keyword + bộ phân loại lúc kiểm tra (review_service.spam_check_version), khác version hiện tại
+    # -> manage.py recheck_spam / worker hàng đợi kiểm tra lại
+    spam_checked_version = models.CharField(max_length=40, blank=True, default='', db_index=True, verbose_name="Version bộ keyword đã kiểm tra")
+    # Chữ ký MinHash của bình luận (xem app/services/near_duplicate.py), None = chưa tính / quá ngắn
+    minhash = models.BinaryField(null=True, blank=True, editable=False, verbose_name="Chữ ký MinHash")
+
+    # ---  HÀNG ĐỢI PHÂN TÍCH AI (xem manage.py process_review_queue) ---
+    analysis_status = models.CharField(max_length=10, choices=ANALYSIS_STATUS_CHOICES, default=ANALYSIS_PENDING, verbose_name="Trạng thái phân tích")
+    analysis_attempts = models.IntegerField(default=0, verbose_name="Số lần phân tích")
+    analysis_claimed_at = models.DateTimeField(null=True, blank=True, verbose_name="Thời điểm worker nhận xử lý")
 
     # ---  TRẠNG THÁI ---
     # Dùng 'is_approved' của bạn (Thay vì is_hidden của tôi). True = Hiện, False = Ẩn.
     is_approved = models.BooleanField(default=True, verbose_name="Đã duyệt")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ReviewQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['analysis_status', 'id'], name='review_analysis_queue_idx'),
+            # Trang admin đánh giá: danh sách mới nhất, lọc theo spam / cảm xúc / sản phẩm
+            models.Index(fields=['created_at'], name='review_created_idx'),
+            models.Index(fields=['is_spam', 'sentiment', 'created_at'], name='review_admin_filter_idx'),
+            models.Index(fields=['product', 'is_spam', 'created_at'], name='review_admin_product_idx'),
+            # Trang chi tiết sản phẩm: phân trang keyset theo (created_at, id)
+            models.Index(fields=['product', 'is_approved', 'created_at'], name='review_product_page_idx'),
+            # Thống kê (đếm theo spam + cảm xúc, rating trung bình) chỉ đọc index, không đọc bảng
+            models.Index(fields=['is_spam', 'sentiment', 'rating'], name='review_stats_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        from app.services import review_stats
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not review_stats.STAT_FIELDS.intersection(update_fields):
+            return super().save(*args, **kwargs)
+        # Ghi review + cập nhật ProductReviewStats trong cùng 1 transaction
+        with transaction.atomic():
+            before = None
+            if not self._state.adding and self.pk is not None:
+                before = review_stats.snapshot(Review._base_manager.filter(pk=self.pk)).get(self.pk)
+            super().save(*args, **kwargs)
+            review_stats.apply_changes([(before, review_stats.row_of(self))])
+
     def __str__(self):
         return f"{self.user.username} - {self.product.name}"
 
 
+class ProductReviewStats(models.Model):
+    """
+    Thống kê đánh giá của sản phẩm (chỉ review đang hiện: đã duyệt, không spam), cập nhật dần
+    trong cùng transaction với thay đổi của Review (app/services/review_stats.py)
+    -> trang danh sách / chi tiết đọc rating không cần aggregate; sửa lệch: manage.py rebuild_review_stats
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='review_stats')
+    review_count = models.IntegerField(default=0, verbose_name="Số đánh giá")
+    rating_sum = models.IntegerField(default=0, verbose_name="Tổng số sao")
+    pos_count = models.IntegerField(default=0, verbose_name="Số đánh giá tích cực")
+    neg_count = models.IntegerField(default=0, verbose_name="Số đánh giá tiêu cực")
+    neu_count = models.IntegerField(default=0, verbose_name="Số đánh giá trung tính")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Thống kê đánh giá sản phẩm"
+        verbose_name_plural = "Thống kê đánh giá sản phẩm"
+
+    @property
+    def avg_rating(self):
+        return round(self.rating_sum / self.review_count, 1) if self.review_count else 0.0
+
+    @property
+    def stars(self):
+        """5 icon sao (Font Awesome): 'full' / 'half' / 'empty' theo rating trung bình"""
+        avg = self.avg_rating
+        return ['full' if avg >= i else 'half' if avg >= i - 0.5 else 'empty' for i in range(1, 6)]
+
+    @property
+    def analyzed_count(self):
+        """Số review đã phân tích cảm xúc xong (review chờ phân tích không nằm trong pos / neg / neu)"""
+        return self.pos_count + self.neg_count + self.neu_count
+
+    def _percent(self, count):
+        analyzed = self.analyzed_count
+        return round(100 * count / analyzed) if analyzed else 0
+
+    @property
+    def pos_percent(self):
+        return self._percent(self.pos_count)
+
+    @property
+    def neg_percent(self):
+        return self._percent(self.neg_count)
+
+    @property
+    def neu_percent(self):
+        return self._percent(self.neu_count)
+
+    def __str__(self):
+        return f"{self.product_id}: {self.avg_rating} ({self.review_count})"
+
+
 # ==================== SPAM KEYWORD MODEL ====================
+class ReviewMinHashBucket(models.Model):
+    """Bảng băm LSH: mỗi band của chữ ký MinHash -> 1 bucket; review chung bucket là ứng viên trùng lặp"""
+    review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='minhash_buckets')
+    bucket = models.BigIntegerField(db_index=True, verbose_name="Bucket LSH")
+
+    class Meta:
+        verbose_name = "Bucket LSH của review"
+        verbose_name_plural = "Bucket LSH của review"
+
+    def __str__(self):
+        return f"{self.review_id}: {self.bucket}"
+
+
+class SpamKeywordQuerySet(models.QuerySet):
+    """
+    update / bulk_create / bulk_update không gửi signal save
+    -> tự báo bộ keyword đã đổi (admin list_editable, action bật / tắt, script seed)
+    """
+
+    def _changed(self):
+        from app.services.review_service import spam_keywords_changed
+        spam_keywords_changed()
+
+    def update(self, **kwargs):
+        rows = super().update(**kwargs)
+        if rows:
+            self._changed()
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(objs, *args, **kwargs)
+        if created:
+            self._changed()
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        if rows:
+            self._changed()
+        return rows
+
+
 class SpamKeyword(models.Model):
     """Model quản lý danh sách spam keywords"""
     
@@ -224,10 +408,30 @@ class SpamKeyword(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Ngày tạo")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Cập nhật lần cuối")
     
+    objects = SpamKeywordQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Từ khóa spam"
         verbose_name_plural = "Danh sách từ khóa spam"
         ordering = ['-severity', 'keyword']
     
     def __str__(self):
-        return f"{self.keyword} ({self.get_category_display()}) - {self.severity}%"
\ No newline at end of file
+        return f"{self.keyword} ({self.get_category_display()}) - {self.severity}%"
+
+class SpamRecheckProgress(models.Model):
+    """
+    Tiến độ kiểm tra lại spam khi bộ luật đổi version (app/services/spam_recheck.py), chỉ 1 dòng
+    Lưu trong database: manage.py recheck_spam / process_review_queue ghi, trang admin (process web khác) đọc
+    """
+    SINGLETON_ID = 1
+
+    version = models.CharField(max_length=40, verbose_name="Version bộ luật spam")
+    total = models.IntegerField(default=0, verbose_name="Số review cần kiểm tra")
+    remaining = models.IntegerField(default=0, verbose_name="Số review còn lại")
+    flagged = models.IntegerField(default=0, verbose_name="Số review mới bị đánh dấu spam")
+    last_id = models.BigIntegerField(default=0, verbose_name="Id review kiểm tra gần nhất")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Cập nhật lần cuối")
+
+    class Meta:
+        verbose_name = "Tiến độ kiểm tra lại spam"
+        verbose_name_plural = "Tiến độ kiểm tra lại spam"
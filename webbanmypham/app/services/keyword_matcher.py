@@ -0,0 +1,113 @@
+"""
+So khớp nhiều từ khoá cùng lúc bằng automaton Aho–Corasick
+Chi phí mỗi lần quét ~ O(độ dài text), không phụ thuộc số từ khoá
+"""
+from bisect import bisect_right
+from collections import deque
+
+# Ít pattern: `pattern in text` (chạy bằng C) vẫn nhanh hơn duyệt automaton bằng Python
+# (xem scripts/bench_spam_keywords.py)
+SMALL_SET = 64
+
+
+class AhoCorasick:
+    """
+    Automaton cho list pattern (thứ tự trong list = độ ưu tiên, index nhỏ ưu tiên hơn)
+    first_match(text) -> index pattern ưu tiên nhất xuất hiện trong text, hoặc None
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        none = len(self.patterns)
+
+        goto = [{}]
+        best = [none]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    best.append(none)
+                state = nxt
+            best[state] = min(best[state], index)
+
+        # Liên kết fail theo BFS; best[s] = pattern ưu tiên nhất kết thúc tại s hoặc các hậu tố của s
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                # Con trực tiếp của gốc: fail về gốc
+                fail[nxt] = target if target != nxt else 0
+                best[nxt] = min(best[nxt], best[fail[nxt]])
+                queue.append(nxt)
+
+        self._goto = goto
+        self._fail = fail
+        self._best = best
+        self._none = none
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def first_match(self, text):
+        """Index của pattern ưu tiên nhất có trong text (None nếu không có)"""
+        if len(self.patterns) <= SMALL_SET:
+            for index, pattern in enumerate(self.patterns):
+                if pattern in text:
+                    return index
+            return None
+        return self.scan(text)
+
+    def first_matches(self, texts):
+        """
+        first_match cho cả list text
+        Ít pattern: nối batch bằng \\x00 rồi tìm từng pattern trên cả chuỗi (str.find chạy bằng C),
+        mỗi vị trí tìm được -> text chứa nó; chi phí ~ số pattern x độ dài batch + số lần xuất hiện
+        """
+        if len(self.patterns) > SMALL_SET:
+            return [self.scan(text) for text in texts]
+
+        starts = []
+        offset = 0
+        for text in texts:
+            starts.append(offset)
+            offset += len(text) + 1
+        joined = '\x00'.join(texts)
+
+        results = [None] * len(texts)
+        # Duyệt pattern theo độ ưu tiên -> text đã có kết quả thì giữ nguyên
+        for index, pattern in enumerate(self.patterns):
+            at = joined.find(pattern)
+            while at != -1:
+                i = bisect_right(starts, at) - 1
+                if results[i] is None:
+                    results[i] = index
+                # Text này đã xong với pattern hiện tại -> tìm tiếp từ text sau
+                at = joined.find(pattern, starts[i] + len(texts[i]) + 1)
+        return results
+
+    def scan(self, text):
+        """first_match luôn bằng automaton (1 lần duyệt text)"""
+        goto, fail, best = self._goto, self._fail, self._best
+        found = best[0]
+        if found == 0:
+            return 0
+
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if best[state] < found:
+                found = best[state]
+                if found == 0:
+                    break
+        return None if found == self._none else found
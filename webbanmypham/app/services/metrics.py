@@ -0,0 +1,247 @@
+"""
+Bộ đếm số liệu vận hành dùng chung (histogram, counter có 1 nhãn, gauge)
+- Ghi vào state trong process (1 lock + vài phép cộng -> để bật được trên production)
+- Mỗi process định kỳ đẩy snapshot lên Django cache -> trang admin gộp được số liệu
+  của mọi worker nếu dùng Redis/Memcached
+- render_prometheus(): xuất định dạng text của Prometheus
+Mỗi nhóm số liệu là 1 MetricsRegistry riêng: sentiment_metrics (model cảm xúc), site_metrics (web bán hàng)
+"""
+import bisect
+import os
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class MetricsRegistry:
+    """
+    name: tiền tố key cache + tên gauge số process trong Prometheus
+    histograms: {tên: (mô tả, các mốc bucket)}, counters: {tên: (mô tả, tên nhãn)}, gauges: {tên: mô tả}
+    settings_prefix: đọc {prefix}_ENABLED, {prefix}_PUBLISH_INTERVAL
+    extra_snapshot: hàm(data) bổ sung số liệu lấy từ nơi khác vào snapshot (VD: bộ đếm của cache)
+    """
+
+    def __init__(self, name, settings_prefix, histograms=None, counters=None, gauges=None, extra_snapshot=None):
+        self.name = name
+        self.settings_prefix = settings_prefix
+        self.histograms = histograms or {}
+        self.counters = counters or {}
+        self.gauges = gauges or {}
+        self.extra_snapshot = extra_snapshot
+        self._index_key = f"{name}:processes"
+        self._lock = threading.Lock()
+        self._state = None
+        self._pid = None
+        self._last_publish = 0.0
+
+    def _empty_state(self):
+        return {
+            'histograms': {
+                name: {'buckets': [0] * (len(bounds) + 1), 'sum': 0.0, 'count': 0}
+                for name, (_, bounds) in self.histograms.items()
+            },
+            'counters': {name: {} for name in self.counters},
+            'gauges': {},
+        }
+
+    def enabled(self):
+        return getattr(settings, f'{self.settings_prefix}_ENABLED', True)
+
+    def _current(self):
+        """State của process hiện tại (process con sau fork bắt đầu lại từ 0, tránh đếm trùng process cha)"""
+        pid = os.getpid()
+        if self._pid != pid:
+            self._state = self._empty_state()
+            self._pid = pid
+            self._last_publish = 0.0
+        return self._state
+
+    def observe(self, name, value):
+        """Ghi 1 giá trị vào histogram `name`"""
+        self.observe_many(name, (value,))
+
+    def observe_many(self, name, values):
+        if not self.enabled():
+            return
+        bounds = self.histograms[name][1]
+        with self._lock:
+            hist = self._current()['histograms'][name]
+            for value in values:
+                hist['buckets'][bisect.bisect_left(bounds, value)] += 1
+                hist['sum'] += value
+                hist['count'] += 1
+        self._maybe_publish()
+
+    def inc(self, name, reason='', amount=1):
+        """Tăng counter `name` (theo giá trị nhãn reason)"""
+        if not self.enabled() or amount <= 0:
+            return
+        with self._lock:
+            counter = self._current()['counters'][name]
+            counter[reason] = counter.get(reason, 0) + amount
+        self._maybe_publish()
+
+    def set_gauge(self, name, value):
+        if not self.enabled():
+            return
+        with self._lock:
+            self._current()['gauges'][name] = value
+        self._maybe_publish()
+
+    def snapshot(self):
+        """Bản sao số liệu của process hiện tại (dict thuần, lưu được vào cache)"""
+        with self._lock:
+            state = self._current()
+            data = {
+                'histograms': {
+                    name: {'buckets': list(h['buckets']), 'sum': h['sum'], 'count': h['count']}
+                    for name, h in state['histograms'].items()
+                },
+                'counters': {name: dict(c) for name, c in state['counters'].items()},
+                'gauges': dict(state['gauges']),
+            }
+        if self.extra_snapshot is not None:
+            self.extra_snapshot(data)
+        return data
+
+    def _process_key(self):
+        return f"{self.name}:{socket.gethostname()}:{os.getpid()}"
+
+    def _publish_interval(self):
+        return getattr(settings, f'{self.settings_prefix}_PUBLISH_INTERVAL', 15)
+
+    def _maybe_publish(self):
+        """Đẩy snapshot lên Django cache, tối đa 1 lần mỗi {prefix}_PUBLISH_INTERVAL giây"""
+        now = time.monotonic()
+        if now - self._last_publish < self._publish_interval():
+            return
+        self._last_publish = now
+        self.publish()
+
+    def publish(self):
+        interval = self._publish_interval()
+        key = self._process_key()
+        try:
+            cache.set(key, self.snapshot(), timeout=interval * 4)
+            index = cache.get(self._index_key) or {}
+            if key not in index:
+                index[key] = time.time()
+                cache.set(self._index_key, index, timeout=None)
+        except Exception:
+            # Số liệu không được làm hỏng luồng xử lý chính
+            pass
+
+    def collect(self):
+        """
+        Gộp số liệu của mọi process còn sống (đã đẩy lên cache) + process hiện tại
+        Return: (snapshot đã gộp, số process)
+        """
+        own_key = self._process_key()
+        snapshots = [self.snapshot()]
+        try:
+            index = cache.get(self._index_key) or {}
+            others = [key for key in index if key != own_key]
+            published = cache.get_many(others) if others else {}
+            # Process đã dừng (snapshot hết hạn) -> xoá khỏi danh sách
+            stale = [key for key in others if key not in published]
+            if stale:
+                for key in stale:
+                    index.pop(key, None)
+                cache.set(self._index_key, index, timeout=None)
+            snapshots.extend(published.values())
+        except Exception:
+            pass
+        return self._merge(snapshots), len(snapshots)
+
+    def _merge(self, snapshots):
+        merged = self._empty_state()
+        for snap in snapshots:
+            for name, hist in snap.get('histograms', {}).items():
+                target = merged['histograms'].get(name)
+                if target is None or len(target['buckets']) != len(hist['buckets']):
+                    continue
+                target['buckets'] = [a + b for a, b in zip(target['buckets'], hist['buckets'])]
+                target['sum'] += hist['sum']
+                target['count'] += hist['count']
+            for name, values in snap.get('counters', {}).items():
+                target = merged['counters'].setdefault(name, {})
+                for reason, value in values.items():
+                    target[reason] = target.get(reason, 0) + value
+            for name, value in snap.get('gauges', {}).items():
+                # Gauge (VD: thời gian tải model): lấy giá trị lớn nhất
+                merged['gauges'][name] = max(merged['gauges'].get(name, 0), value)
+        return merged
+
+    def quantile(self, hist, name, q):
+        """Ước lượng phân vị q (0-1) từ histogram (nội suy tuyến tính trong bucket)"""
+        bounds = self.histograms[name][1]
+        total = hist['count']
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(hist['buckets']):
+            if count and seen + count >= rank:
+                if i >= len(bounds):
+                    return bounds[-1]
+                lower = bounds[i - 1] if i else 0
+                return lower + (bounds[i] - lower) * (rank - seen) / count
+            seen += count
+        return bounds[-1]
+
+    def render_prometheus(self, extra_counters=None):
+        """
+        Số liệu đã gộp theo định dạng text của Prometheus (text/plain; version=0.0.4)
+        extra_counters: counter không đăng ký trước (do extra_snapshot thêm vào), cùng dạng counters
+        """
+        data, processes = self.collect()
+        lines = []
+
+        for name, (help_text, bounds) in self.histograms.items():
+            hist = data['histograms'][name]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in zip(bounds, hist['buckets']):
+                cumulative += count
+                lines.append(f'{name}_bucket{{le="{_format_bound(bound)}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{le="+Inf"}} {hist["count"]}')
+            lines.append(f"{name}_sum {_format_value(hist['sum'])}")
+            lines.append(f"{name}_count {hist['count']}")
+
+        for name, (help_text, label) in dict(self.counters, **(extra_counters or {})).items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for reason, value in sorted(data['counters'].get(name, {}).items()):
+                lines.append(f'{name}{{{label}="{_escape_label(reason)}"}} {value}')
+
+        for name, help_text in self.gauges.items():
+            if name in data['gauges']:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_format_value(data['gauges'][name])}")
+
+        lines.append(f"# HELP {self.name}_processes Số process đã gộp số liệu")
+        lines.append(f"# TYPE {self.name}_processes gauge")
+        lines.append(f"{self.name}_processes {processes}")
+        return '\n'.join(lines) + '\n'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_bound(bound):
+    return repr(float(bound))
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def ratio(part, total):
+    """Tỉ lệ % làm tròn 1 chữ số, None nếu chưa có dữ liệu"""
+    return round(100 * part / total, 1) if total else None
@@ -0,0 +1,193 @@
+"""
+Phát hiện review gần trùng nhau (spam copy-paste trên nhiều sản phẩm / nhiều tài khoản)
+- Chữ ký MinHash (NUM_PERM giá trị uint32) trên shingle 5 ký tự của bình luận đã chuẩn hoá
+- LSH: chia chữ ký thành BANDS band, mỗi band băm thành 1 bucket lưu ở ReviewMinHashBucket
+  -> tìm ứng viên bằng index trên cột bucket (không so với mọi review), rồi mới so chữ ký
+"""
+import hashlib
+import logging
+import re
+import unicodedata
+import zlib
+from itertools import groupby
+from operator import itemgetter
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS     # 4 hàng / band -> 2 review có Jaccard ~0.5 trở lên thường chung ít nhất 1 bucket
+SHINGLE = 5
+
+# Review.minhash của bình luận quá ngắn để tính chữ ký: đã xử lý (khác NULL = chưa tính), không có bucket
+NO_SIGNATURE = b''
+
+# Hoán vị ngẫu nhiên cố định: h(x) = (a*x + b) mod p, p nguyên tố > 2^32
+_PRIME = np.uint64(4294967311)
+_rng = np.random.RandomState(20240601)
+_A = _rng.randint(1, 2 ** 32, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.randint(0, 2 ** 32, size=NUM_PERM, dtype=np.uint64)
+
+_NON_WORD_RE = re.compile(r'[^\w]+', re.UNICODE)
+
+
+def normalize(text):
+    """NFC, chữ thường, bỏ dấu câu / emoji, gộp khoảng trắng"""
+    text = unicodedata.normalize('NFC', text or '').lower()
+    return ' '.join(_NON_WORD_RE.sub(' ', text).split())
+
+
+def signature(text):
+    """
+    Chữ ký MinHash (np.uint32[NUM_PERM]) của bình luận
+    None nếu bình luận quá ngắn (SPAM_DUPLICATE_MIN_CHARS) -> "ok", "sản phẩm tốt" trùng nhau là bình thường
+    """
+    text = normalize(text)
+    if len(text) < getattr(settings, 'SPAM_DUPLICATE_MIN_CHARS', 40):
+        return None
+    shingles = {text[i:i + SHINGLE] for i in range(len(text) - SHINGLE + 1)}
+    x = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # a, x < 2^32 -> a*x + b không tràn uint64
+    hashed = (_A[:, None] * x[None, :] + _B[:, None]) % _PRIME
+    return hashed.min(axis=1).astype(np.uint32)
+
+
+def to_bytes(sig):
+    return sig.astype('<u4').tobytes()
+
+
+def from_bytes(data):
+    return np.frombuffer(bytes(data), dtype='<u4')
+
+
+def buckets(sig):
+    """Bucket LSH của từng band (số nguyên 64 bit có dấu, băm cả chỉ số band -> không trùng giữa các band)"""
+    raw = sig.astype('<u4')
+    result = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(raw[band * ROWS:(band + 1) * ROWS].tobytes(),
+                                 digest_size=8, person=b'band%02d' % band).digest()
+        result.append(int.from_bytes(digest, 'big', signed=True))
+    return result
+
+
+def similarity(a, b):
+    """Ước lượng độ tương đồng Jaccard giữa 2 chữ ký"""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def index_reviews(reviews):
+    """
+    Tính chữ ký + ghi bucket LSH cho list review (ghi đè bucket cũ)
+    Return: {review.id: chữ ký hoặc None}
+    """
+    from app.models import Review, ReviewMinHashBucket
+
+    signatures = {}
+    rows = []
+    for review in reviews:
+        sig = signature(review.comment)
+        signatures[review.id] = sig
+        review.minhash = to_bytes(sig) if sig is not None else NO_SIGNATURE
+        if sig is not None:
+            rows.extend(ReviewMinHashBucket(review_id=review.id, bucket=b) for b in buckets(sig))
+
+    with transaction.atomic():
+        Review.objects.bulk_update(reviews, ['minhash'])
+        ReviewMinHashBucket.objects.filter(review_id__in=list(signatures)).delete()
+        ReviewMinHashBucket.objects.bulk_create(rows, batch_size=1000)
+    return signatures
+
+
+def find_near_duplicates(sig, exclude_id=None):
+    """
+    Id các review khác có độ tương đồng >= SPAM_DUPLICATE_THRESHOLD với chữ ký sig
+    Chỉ đọc review chung ít nhất 1 bucket (tối đa SPAM_DUPLICATE_MAX_CANDIDATES review mới nhất)
+    """
+    from app.models import Review, ReviewMinHashBucket
+
+    if sig is None:
+        return []
+    threshold = getattr(settings, 'SPAM_DUPLICATE_THRESHOLD', 0.8)
+    limit = getattr(settings, 'SPAM_DUPLICATE_MAX_CANDIDATES', 500)
+
+    candidates = ReviewMinHashBucket.objects.filter(bucket__in=buckets(sig))
+    if exclude_id is not None:
+        candidates = candidates.exclude(review_id=exclude_id)
+    candidates = candidates.values_list('review_id', flat=True).distinct().order_by('-review_id')[:limit]
+    rows = Review.objects.filter(id__in=list(candidates), minhash__isnull=False).values_list('id', 'minhash')
+    return [review_id for review_id, data in rows if data and similarity(sig, from_bytes(data)) >= threshold]
+
+
+def duplicate_counts(reviews):
+    """
+    Index batch review rồi đếm số review khác gần trùng với từng review (tính cả review trong cùng batch)
+    Return: list số lượng, cùng thứ tự với reviews
+    """
+    if not getattr(settings, 'SPAM_DUPLICATE_ENABLED', True) or not reviews:
+        return [0] * len(reviews)
+    try:
+        signatures = index_reviews(reviews)
+        return [len(find_near_duplicates(signatures[r.id], exclude_id=r.id)) for r in reviews]
+    except Exception as e:
+        # Không chặn phân tích review chỉ vì bảng LSH lỗi
+        logger.warning(f"Near-duplicate lookup failed for {len(reviews)} review(s): {e}")
+        return [0] * len(reviews)
+
+
+def cluster_reviews(review_ids=None):
+    """
+    Gom cụm review gần trùng (mọi review đã có chữ ký, hoặc trong review_ids)
+    Bucket có >= 2 review -> so từng review với review đầu bucket, hợp nhất bằng union-find
+    Return: list cụm (list id, sắp tăng dần), cụm lớn trước
+    """
+    from app.models import Review, ReviewMinHashBucket
+
+    threshold = getattr(settings, 'SPAM_DUPLICATE_THRESHOLD', 0.8)
+    bucket_rows = ReviewMinHashBucket.objects.all()
+    if review_ids is not None:
+        bucket_rows = bucket_rows.filter(review_id__in=review_ids)
+
+    # Đọc bảng LSH theo thứ tự bucket (stream, không giữ cả bảng trong RAM), chỉ giữ bucket có >= 2 review
+    members = []
+    rows = bucket_rows.order_by('bucket', 'review_id').values_list('bucket', 'review_id').iterator(chunk_size=5000)
+    for _, group in groupby(rows, key=itemgetter(0)):
+        group = [review_id for _, review_id in group]
+        if len(group) > 1:
+            members.append(group)
+    if not members:
+        return []
+
+    ids = sorted({review_id for group in members for review_id in group})
+    signatures = {}
+    for start in range(0, len(ids), 1000):
+        chunk = ids[start:start + 1000]
+        for review_id, data in Review.objects.filter(id__in=chunk).values_list('id', 'minhash'):
+            if data:
+                signatures[review_id] = from_bytes(data)
+
+    parent = {review_id: review_id for review_id in signatures}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for group in members:
+        group = [review_id for review_id in group if review_id in signatures]
+        if len(group) < 2:
+            continue
+        head = group[0]
+        for other in group[1:]:
+            if similarity(signatures[head], signatures[other]) >= threshold:
+                parent[find(other)] = find(head)
+
+    clusters = {}
+    for review_id in signatures:
+        clusters.setdefault(find(review_id), []).append(review_id)
+    return sorted((sorted(c) for c in clusters.values() if len(c) > 1), key=lambda c: (-len(c), c[0]))
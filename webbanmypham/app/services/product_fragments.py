@@ -0,0 +1,134 @@
+"""
+Cache HTML từng phần của trang chi tiết sản phẩm: thông tin sản phẩm, tóm tắt đánh giá, sản phẩm liên quan
+- Key có version của sản phẩm: Product / ProductBatch / Review đổi -> tăng version (app/signals.py, review_stats),
+  key cũ không còn được đọc và tự hết hạn, không cần xoá từng key
+- Sản phẩm liên quan còn phụ thuộc các sản phẩm khác -> key có thêm version catalog (tăng khi có Product bất kỳ
+  thay đổi) và timeout ngắn hơn (điểm đánh giá của sản phẩm liên quan cũ tối đa PRODUCT_RELATED_CACHE_TIMEOUT giây)
+- Trúng cache: không query Product, không render lại; tỉ lệ trúng ở counter product_fragment_cache_total
+Nhiều worker web -> cần cache dùng chung (Redis/Memcached), LocMemCache chỉ thấy version tăng trong cùng process
+-> mặc định (PRODUCT_FRAGMENT_CACHE_ENABLED=None) chỉ bật khi cache default không phải LocMem / Dummy
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.template.loader import render_to_string
+
+from . import site_metrics as metrics
+
+VERSION_KEY = 'product_fragments:version:{}'
+CATALOG_VERSION_KEY = 'product_fragments:version:catalog'
+FRAGMENT_KEY = 'product_fragments:{}:{}:{}'  # product id, tên fragment, version
+# Backend cache riêng của từng process: bump version không tới process khác
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+# Fragment theo version sản phẩm (title = tên sản phẩm cho <title> và breadcrumb)
+PRODUCT_FRAGMENTS = ('title', 'info', 'summary')
+
+
+def _enabled():
+    enabled = getattr(settings, 'PRODUCT_FRAGMENT_CACHE_ENABLED', None)
+    if enabled is None:
+        return not isinstance(caches['default'], PROCESS_LOCAL_CACHES)
+    return enabled
+
+
+def _new_version():
+    # Key version bị cache xoá -> bắt đầu lại từ thời điểm hiện tại (micro giây), lớn hơn mọi version cũ còn fragment
+    return time.time_ns() // 1000
+
+
+def _timeout():
+    return getattr(settings, 'PRODUCT_FRAGMENT_CACHE_TIMEOUT', 3600)
+
+
+def _versions(keys):
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            initial = _new_version()
+            # Hết hạn cùng fragment: id sản phẩm không tồn tại không để lại key mãi trong cache
+            cache.add(key, initial, _timeout())
+            versions[key] = cache.get(key, initial)
+    return versions
+
+
+def bump_versions(product_ids, catalog=False):
+    """Tăng version của sản phẩm (catalog=True: cả version catalog) -> fragment cũ không còn được dùng"""
+    keys = [VERSION_KEY.format(pid) for pid in set(product_ids)]
+    if catalog:
+        keys.append(CATALOG_VERSION_KEY)
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Chưa có version (chưa ai xem / cache bị xoá) -> lần đọc tới tự tạo version mới
+            pass
+
+
+def products_changed(product_ids, catalog=False):
+    """Sản phẩm vừa bị ghi -> tăng version sau khi transaction commit (rollback thì bỏ qua)"""
+    product_ids = set(product_ids)
+    if product_ids or catalog:
+        transaction.on_commit(lambda: bump_versions(product_ids, catalog))
+
+
+def _render(product_id, names):
+    """Render các fragment trong names từ database. Return None nếu sản phẩm không tồn tại"""
+    from app.models import Product
+
+    product = Product.objects.select_related('review_stats').filter(id=product_id).first()
+    if product is None:
+        return None
+    fragments = {}
+    if 'title' in names:
+        fragments['title'] = product.name
+    if 'info' in names:
+        fragments['info'] = render_to_string('app/includes/product_info.html', {'product': product})
+    if 'summary' in names:
+        fragments['summary'] = render_to_string('app/includes/review_summary.html', {'product': product})
+    if 'related' in names:
+        related_products = (
+            Product.objects.select_related('review_stats')
+            .filter(category_id=product.category_id).exclude(id=product_id)[:4]
+        )
+        fragments['related'] = render_to_string(
+            'app/includes/related_products.html', {'related_products': related_products}
+        )
+    return fragments
+
+
+def detail_fragments(product_id):
+    """
+    HTML các phần của trang chi tiết sản phẩm: {'title', 'info', 'summary', 'related'}
+    Return None nếu sản phẩm không tồn tại
+    """
+    names = PRODUCT_FRAGMENTS + ('related',)
+    if not _enabled():
+        return _render(product_id, names)
+
+    version_key = VERSION_KEY.format(product_id)
+    versions = _versions([version_key, CATALOG_VERSION_KEY])
+    version = versions[version_key]
+    keys = {name: FRAGMENT_KEY.format(product_id, name, version) for name in PRODUCT_FRAGMENTS}
+    keys['related'] = FRAGMENT_KEY.format(product_id, 'related', f"{version}.{versions[CATALOG_VERSION_KEY]}")
+    cached = cache.get_many(keys.values())
+    fragments = {name: cached[key] for name, key in keys.items() if key in cached}
+
+    missing = [name for name in names if name not in fragments]
+    metrics.inc('product_fragment_cache_total', 'hit', len(names) - len(missing))
+    metrics.inc('product_fragment_cache_total', 'miss', len(missing))
+    if not missing:
+        return fragments
+
+    rendered = _render(product_id, missing)
+    if rendered is None:
+        return None
+    fragments.update(rendered)
+    cache.set_many({keys[name]: html for name, html in rendered.items() if name != 'related'}, _timeout())
+    if 'related' in rendered:
+        cache.set(keys['related'], rendered['related'], getattr(settings, 'PRODUCT_RELATED_CACHE_TIMEOUT', 300))
+    return fragments
@@ -0,0 +1,417 @@
+"""
+Tìm kiếm sản phẩm theo ngữ nghĩa (vector từ encoder của model cảm xúc)
+- Vector lưu trong ma trận float32 trên đĩa, mở bằng memory map -> mọi worker dùng chung
+  page cache của hệ điều hành, không process nào copy cả ma trận vào RAM riêng
+- Truy vấn: nhân ma trận NumPy + top-k (argpartition)
+- Catalog lớn: chia cụm kiểu IVF (k-means) -> chỉ chấm điểm các cụm gần truy vấn nhất
+- Cập nhật từng sản phẩm (thêm / sửa / xoá) tại chỗ, không embed lại cả catalog
+- Sản phẩm sửa trên web: ghi id vào hàng đợi (file dirty.ids cạnh index), worker nền embed lại
+  (process_review_queue lúc rảnh, update_search_index) -> request web không tải model
+- Truy vấn trên web cũng phải embed -> chỉ mở khi có sentiment server (semantic_search_available),
+  không có thì trang tìm kiếm chỉ tìm theo từ khoá
+Tạo index: python manage.py update_search_index
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+META_FILE = 'meta.json'
+VECTORS_FILE = 'vectors.f32'      # (capacity, dim) float32
+IDS_FILE = 'ids.i64'              # product id của từng dòng, -1 = đã xoá
+HASHES_FILE = 'hashes.u64'        # hash nội dung đã embed -> biết sản phẩm nào cần embed lại
+LISTS_FILE = 'lists.i32'          # cụm IVF của từng dòng
+CENTROIDS_FILE = 'centroids.f32'  # (ivf_lists, dim) float32
+LOCK_FILE = '.lock'
+DIRTY_FILE = 'dirty.ids'          # id sản phẩm chờ embed lại, mỗi dòng 1 id (chỉ ghi thêm)
+
+_INITIAL_CAPACITY = 1024
+
+
+def product_text(product):
+    """Nội dung dùng để embed: tên + mô tả + thành phần chính"""
+    parts = [product.name, product.description, product.main_ingredients]
+    return '\n'.join(p.strip() for p in parts if p and p.strip())
+
+
+def text_hash(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class VectorIndex:
+    """
+    Index vector trên đĩa (1 thư mục)
+    Đọc: không khoá, tự mở lại memmap khi meta.json đổi version
+    Ghi: khoá file (fcntl) -> web worker và lệnh quản lý ghi cùng lúc vẫn an toàn
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._np = None
+        self._stamp = None
+        self._meta = None
+        self._arrays = None
+
+    # --- Đọc ---
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def exists(self):
+        return os.path.exists(self._file(META_FILE))
+
+    def meta(self):
+        self._refresh()
+        return dict(self._meta) if self._meta else None
+
+    def _refresh(self):
+        """Mở lại memmap nếu index vừa được ghi (so sánh mtime của meta.json)"""
+        try:
+            stat = os.stat(self._file(META_FILE))
+        except FileNotFoundError:
+            self._stamp, self._meta, self._arrays = None, None, None
+            return
+        stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if stamp == self._stamp:
+            return
+        with open(self._file(META_FILE), encoding='utf-8') as f:
+            meta = json.load(f)
+        self._meta = meta
+        self._arrays = self._map(meta, mode='r')
+        self._stamp = stamp
+
+    def _numpy(self):
+        if self._np is None:
+            import numpy
+            self._np = numpy
+        return self._np
+
+    def _map(self, meta, mode):
+        np = self._numpy()
+        capacity, dim = meta['capacity'], meta['dim']
+        arrays = {
+            'vectors': np.memmap(self._file(VECTORS_FILE), dtype=np.float32, mode=mode, shape=(capacity, dim)),
+            'ids': np.memmap(self._file(IDS_FILE), dtype=np.int64, mode=mode, shape=(capacity,)),
+            'hashes': np.memmap(self._file(HASHES_FILE), dtype=np.uint64, mode=mode, shape=(capacity,)),
+            'lists': np.memmap(self._file(LISTS_FILE), dtype=np.int32, mode=mode, shape=(capacity,)),
+        }
+        if meta.get('ivf_lists'):
+            arrays['centroids'] = np.memmap(
+                self._file(CENTROIDS_FILE), dtype=np.float32, mode=mode, shape=(meta['ivf_lists'], dim),
+            )
+        return arrays
+
+    def search(self, query_vector, k=10, nprobe=None):
+        """
+        Top-k theo cosine (vector đã chuẩn hoá L2)
+        Return: list (product_id, score) giảm dần
+        """
+        np = self._numpy()
+        self._refresh()
+        if not self._meta or not self._meta['count']:
+            return []
+
+        count = self._meta['count']
+        a = self._arrays
+        query = np.asarray(query_vector, dtype=np.float32).reshape(-1)
+
+        use_ivf = (
+            'centroids' in a
+            and count >= getattr(settings, 'SEARCH_IVF_MIN_ROWS', 20000)
+        )
+        if use_ivf:
+            nprobe = nprobe or getattr(settings, 'SEARCH_IVF_NPROBE', 8)
+            centroid_scores = a['centroids'] @ query
+            probes = np.argpartition(-centroid_scores, min(nprobe, len(centroid_scores)) - 1)[:nprobe]
+            rows = np.flatnonzero(np.isin(a['lists'][:count], probes))
+            scores = a['vectors'][rows] @ query
+        else:
+            rows = None
+            scores = a['vectors'][:count] @ query
+
+        ids = a['ids'][:count] if rows is None else a['ids'][rows]
+        scores = np.where(ids >= 0, scores, -np.inf)
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    def stored_hashes(self):
+        """{product_id: hash nội dung đã embed}"""
+        self._refresh()
+        if not self._meta:
+            return {}
+        count = self._meta['count']
+        ids = self._arrays['ids'][:count]
+        hashes = self._arrays['hashes'][:count]
+        live = ids >= 0
+        return dict(zip(ids[live].tolist(), hashes[live].tolist()))
+
+    # --- Ghi ---
+
+    @contextmanager
+    def _writing(self, dim=None, model=None):
+        """Khoá ghi + memmap chế độ r+; tạo index mới nếu chưa có"""
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._file(LOCK_FILE), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if os.path.exists(self._file(META_FILE)):
+                    with open(self._file(META_FILE), encoding='utf-8') as f:
+                        meta = json.load(f)
+                elif dim is not None:
+                    meta = {'dim': int(dim), 'count': 0, 'capacity': 0, 'model': model,
+                            'version': 0, 'ivf_lists': 0}
+                    self._resize(meta, _INITIAL_CAPACITY)
+                else:
+                    raise FileNotFoundError(f"Search index not found in {self.path}")
+                state = {'meta': meta, 'arrays': self._map(meta, mode='r+')}
+                yield state
+                for array in state['arrays'].values():
+                    array.flush()
+                self._write_meta(state['meta'])
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        self._stamp = None
+
+    def _resize(self, meta, capacity):
+        """Mở rộng file (giữ nguyên dữ liệu cũ); reader đang map file cũ vẫn đọc được phần cũ"""
+        dim = meta['dim']
+        sizes = {VECTORS_FILE: 4 * dim, IDS_FILE: 8, HASHES_FILE: 8, LISTS_FILE: 4}
+        for name, row_bytes in sizes.items():
+            with open(self._file(name), 'ab') as f:
+                f.truncate(capacity * row_bytes)
+        meta['capacity'] = capacity
+
+    def _write_meta(self, meta):
+        meta['version'] += 1
+        tmp_path = self._file(META_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._file(META_FILE))
+
+    def upsert(self, ids, vectors, hashes, model=None):
+        """Thêm / ghi đè vector của các product id (ghi đè đúng dòng cũ, không embed lại sản phẩm khác)"""
+        np = self._numpy()
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(ids):
+            return
+        with self._writing(dim=vectors.shape[1], model=model) as state:
+            meta = state['meta']
+            if vectors.shape[1] != meta['dim']:
+                raise ValueError(f"Vector dim {vectors.shape[1]} does not match index dim {meta['dim']}")
+
+            count = meta['count']
+            existing = state['arrays']['ids'][:count]
+            row_of = {int(pid): row for row, pid in enumerate(existing.tolist()) if pid >= 0}
+
+            rows = []
+            for pid in ids:
+                row = row_of.get(int(pid))
+                if row is None:
+                    row = count
+                    count += 1
+                    row_of[int(pid)] = row
+                rows.append(row)
+
+            if count > meta['capacity']:
+                capacity = meta['capacity']
+                while capacity < count:
+                    capacity *= 2
+                self._resize(meta, capacity)
+                state['arrays'] = self._map(meta, mode='r+')
+
+            a = state['arrays']
+            rows = np.asarray(rows)
+            a['vectors'][rows] = vectors
+            a['ids'][rows] = np.asarray(ids, dtype=np.int64)
+            a['hashes'][rows] = np.asarray(hashes, dtype=np.uint64)
+            if 'centroids' in a:
+                # Sản phẩm mới vào cụm gần nhất (không cần chạy lại k-means)
+                a['lists'][rows] = np.argmax(vectors @ np.asarray(a['centroids']).T, axis=1)
+            meta['count'] = count
+
+    def remove(self, ids):
+        """Đánh dấu xoá (dòng được dùng lại khi rebuild)"""
+        np = self._numpy()
+        if not ids or not self.exists():
+            return
+        with self._writing() as state:
+            count = state['meta']['count']
+            a = state['arrays']
+            rows = np.flatnonzero(np.isin(a['ids'][:count], np.asarray(list(ids), dtype=np.int64)))
+            a['ids'][rows] = -1
+            a['vectors'][rows] = 0
+
+    def build_ivf(self, n_lists, iterations=10, seed=0):
+        """Chia các vector thành n_lists cụm (k-means cosine) -> truy vấn chỉ quét vài cụm"""
+        np = self._numpy()
+        with self._writing() as state:
+            meta, a = state['meta'], state['arrays']
+            count = meta['count']
+            live = np.flatnonzero(a['ids'][:count] >= 0)
+            if len(live) < n_lists:
+                raise ValueError(f"Need at least {n_lists} products to build {n_lists} lists")
+
+            data = np.asarray(a['vectors'][live])
+            rng = np.random.default_rng(seed)
+            centroids = data[rng.choice(len(data), n_lists, replace=False)].copy()
+            for _ in range(iterations):
+                assign = _nearest(data, centroids)
+                for j in range(n_lists):
+                    members = data[assign == j]
+                    if len(members):
+                        centroids[j] = members.mean(axis=0)
+                    else:
+                        # Cụm rỗng -> lấy 1 điểm ngẫu nhiên làm tâm mới
+                        centroids[j] = data[rng.integers(len(data))]
+                centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+            centroid_map = np.memmap(self._file(CENTROIDS_FILE), dtype=np.float32, mode='w+',
+                                     shape=(n_lists, meta['dim']))
+            centroid_map[:] = centroids
+            centroid_map.flush()
+            a['lists'][:count] = -1
+            a['lists'][live] = _nearest(data, centroids)
+            meta['ivf_lists'] = n_lists
+
+    def drop_ivf(self):
+        with self._writing() as state:
+            state['meta']['ivf_lists'] = 0
+
+
+def _nearest(data, centroids, chunk=8192):
+    """Cụm gần nhất của từng vector (theo từng đoạn để giới hạn RAM)"""
+    import numpy as np
+
+    out = np.empty(len(data), dtype=np.int32)
+    for start in range(0, len(data), chunk):
+        out[start:start + chunk] = np.argmax(data[start:start + chunk] @ centroids.T, axis=1)
+    return out
+
+
+_index = None
+
+
+def get_index():
+    global _index
+    path = str(getattr(settings, 'SEARCH_INDEX_DIR', settings.BASE_DIR / 'var' / 'search_index'))
+    if _index is None or _index.path != path:
+        _index = VectorIndex(path)
+    return _index
+
+
+def index_is_usable():
+    """Index đã tạo và cùng encoder với model hiện tại"""
+    from app import ai_utils
+
+    meta = get_index().meta()
+    return bool(meta) and meta.get('model') == ai_utils.encoder_id()
+
+
+def index_products(products, batch_size=64, force=False):
+    """
+    Embed + ghi vào index các sản phẩm có nội dung thay đổi (so sánh hash)
+    Return: số sản phẩm đã embed
+    """
+    from app import ai_utils
+
+    index = get_index()
+    stored = {} if force else index.stored_hashes()
+    pending = []
+    for product in products:
+        text = product_text(product)
+        digest = text_hash(text)
+        if stored.get(product.id) != digest:
+            pending.append((product.id, text, digest))
+
+    for start in range(0, len(pending), batch_size):
+        chunk = pending[start:start + batch_size]
+        vectors = ai_utils.embed_texts([text for _, text, _ in chunk])
+        index.upsert(
+            [pid for pid, _, _ in chunk], vectors, [digest for _, _, digest in chunk],
+            model=ai_utils.encoder_id(),
+        )
+    return len(pending)
+
+
+def remove_products(product_ids):
+    get_index().remove(product_ids)
+
+
+def mark_dirty(product_ids):
+    """Đưa sản phẩm vào hàng đợi embed lại (không tải model, dùng được trong request web)"""
+    data = ''.join(f"{int(pid)}\n" for pid in product_ids).encode('ascii')
+    if not data:
+        return
+    index = get_index()
+    os.makedirs(index.path, exist_ok=True)
+    # O_APPEND: nhiều worker ghi cùng lúc không đè lên nhau (mỗi lần ghi vài byte)
+    fd = os.open(index._file(DIRTY_FILE), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o664)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def reindex_dirty(batch_size=64):
+    """
+    Embed lại các sản phẩm trong hàng đợi (sản phẩm đã bị xoá -> bỏ khỏi index)
+    Lỗi -> đưa id trở lại hàng đợi, lần sau làm tiếp
+    Return: số sản phẩm đã embed
+    """
+    from app.models import Product
+
+    index = get_index()
+    path = index._file(DIRTY_FILE)
+    working = f"{path}.{os.getpid()}"
+    try:
+        # Đổi tên (nguyên tử): id ghi thêm từ lúc này vào file mới, không bị mất
+        os.replace(path, working)
+    except FileNotFoundError:
+        return 0
+    with open(working, encoding='ascii') as f:
+        ids = {int(line) for line in f if line.strip()}
+    try:
+        products = list(Product.objects.filter(id__in=ids).only('id', 'name', 'description', 'main_ingredients'))
+        embedded = index_products(products, batch_size=batch_size)
+        index.remove(ids - {product.id for product in products})
+    except Exception:
+        mark_dirty(ids)
+        raise
+    finally:
+        os.unlink(working)
+    return embedded
+
+
+def semantic_search_available():
+    """Index dùng được và query embed ở sentiment server (không tải torch + encoder trong request web)"""
+    from app import ai_utils
+
+    return ai_utils.uses_sentiment_server() and index_is_usable()
+
+
+def search_products(query, k=None):
+    """
+    Tìm sản phẩm gần nghĩa với query
+    Return: list (product_id, score); index chưa có / không có sentiment server / lỗi encoder -> []
+    """
+    from app import ai_utils
+
+    if not query or not semantic_search_available():
+        return []
+    k = k or getattr(settings, 'SEARCH_SEMANTIC_TOP_K', 24)
+    try:
+        query_vector = ai_utils.embed_texts([query])[0]
+    except Exception as e:
+        logger.error(f"Semantic search embedding failed: {e}")
+        return []
+    return get_index().search(query_vector, k=k)
@@ -0,0 +1,135 @@
+"""
+Đếm lượt xem sản phẩm (Product.views) không ghi database mỗi lần xem
+- record_view(): cộng vào bộ đệm trong process (1 lock + 1 phép cộng)
+- Thread nền (daemon, 1 thread mỗi process) ghi xuống mỗi PRODUCT_VIEWS_FLUSH_INTERVAL giây, kể cả khi không còn
+  request nào; đệm đủ PRODUCT_VIEWS_FLUSH_THRESHOLD lượt -> request đó ghi ngay
+- Ghi: UPDATE views = views + n, sản phẩm có cùng n gộp chung 1 câu UPDATE (không đọc-sửa-ghi, không lock dòng lâu)
+- Process tắt bình thường (restart worker) -> flush lúc thoát (atexit); process chết đột ngột -> mất tối đa
+  số lượt xem trong PRODUCT_VIEWS_FLUSH_INTERVAL giây cuối của process đó
+- UPDATE không gửi signal save -> không làm mất cache trang chi tiết (product_fragments) mỗi lần flush
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pending = Counter()
+_pending_total = 0
+_pid = None
+_thread = None
+
+
+def _enabled():
+    return getattr(settings, 'PRODUCT_VIEWS_ENABLED', True)
+
+
+def _interval():
+    return getattr(settings, 'PRODUCT_VIEWS_FLUSH_INTERVAL', 10)
+
+
+def _current():
+    """
+    Bộ đệm của process hiện tại (process con sau fork bắt đầu lại từ 0, tránh ghi trùng lượt xem của process cha;
+    thread flush của process cha không còn -> tạo lại ở lần ghi nhận đầu tiên)
+    """
+    global _pending, _pending_total, _pid, _thread
+    pid = os.getpid()
+    if _pid != pid:
+        _pending = Counter()
+        _pending_total = 0
+        _pid = pid
+        _thread = None
+    return _pending
+
+
+def _ensure_flusher():
+    """Gọi khi đang giữ _lock"""
+    global _thread
+    if _thread is None or not _thread.is_alive():
+        _thread = threading.Thread(target=_run_flusher, name='product-views-flush', daemon=True)
+        _thread.start()
+
+
+def _run_flusher():
+    while True:
+        time.sleep(_interval())
+        try:
+            flush()
+        except Exception as e:
+            logger.warning(f"Could not flush product views: {e}")
+        finally:
+            # Thread không đi qua request -> tự đóng kết nối database của mình sau mỗi lần ghi
+            connections.close_all()
+
+
+def record_view(product_id):
+    """Ghi nhận 1 lượt xem (chưa ghi database)"""
+    global _pending_total
+    if not _enabled():
+        return
+    with _lock:
+        _current()[product_id] += 1
+        _pending_total += 1
+        _ensure_flusher()
+        due = _pending_total >= getattr(settings, 'PRODUCT_VIEWS_FLUSH_THRESHOLD', 1000)
+    if due:
+        flush()
+
+
+def pending_views():
+    """Số lượt xem đang chờ ghi theo sản phẩm (bản sao)"""
+    with _lock:
+        return dict(_current())
+
+
+def flush():
+    """
+    Ghi các lượt xem đang đệm xuống database
+    Lỗi -> trả lại vào bộ đệm, lần flush sau ghi tiếp
+    Return: số lượt xem đã ghi
+    """
+    global _pending, _pending_total
+    from app.models import Product
+
+    with _lock:
+        _current()
+        pending, total = _pending, _pending_total
+        _pending, _pending_total = Counter(), 0
+    if not pending:
+        return 0
+
+    # Sản phẩm có cùng số lượt xem -> 1 câu UPDATE; mỗi câu tự commit (không giữ lock dòng của cả lần flush)
+    groups = defaultdict(list)
+    for product_id, count in pending.items():
+        groups[count].append(product_id)
+    written = 0
+    try:
+        for count, product_ids in groups.items():
+            Product.objects.filter(id__in=product_ids).update(views=F('views') + count)
+            written += count * len(product_ids)
+            for product_id in product_ids:
+                del pending[product_id]
+    except Exception as e:
+        logger.warning(f"Could not flush {total - written} product view(s): {e}")
+        with _lock:
+            _current().update(pending)
+            _pending_total += total - written
+    return written
+
+
+@atexit.register
+def _flush_on_exit():
+    if _pid == os.getpid():
+        try:
+            flush()
+        except Exception as e:
+            logger.warning(f"Could not flush product views on exit: {e}")
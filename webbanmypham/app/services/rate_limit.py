@@ -0,0 +1,109 @@
+"""
+Giới hạn tần suất kiểu token bucket, trạng thái lưu trong Django cache (dùng chung giữa các worker
+nếu cấu hình Redis/Memcached)
+- Mỗi bucket = 1 key số nguyên (GCRA): thời điểm (ms) bucket hồi đầy lại nếu không dùng thêm
+  Lấy 1 token = cache.incr thêm refill_seconds (nguyên tử); vượt quá now + capacity * refill_seconds -> hết token
+- 1 key duy nhất -> không có trạng thái lệch nhau khi cache xoá bớt key: mất key = bucket đầy (không chặn nhầm)
+- Dùng cho submit_review: chặn trước khi tạo review (trước mọi việc của AI / spam)
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import site_metrics as metrics
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    capacity token, hồi 1 token mỗi refill_seconds giây
+    consume() -> True nếu còn token (và lấy 1 token), False nếu hết
+    """
+
+    def __init__(self, name, capacity, refill_seconds):
+        self.name = name
+        self.capacity = int(capacity)
+        self.refill_seconds = float(refill_seconds)
+        self._interval = max(1, round(self.refill_seconds * 1000))  # ms cho 1 token
+        # Bucket không dùng tới lâu hơn thời gian hồi đầy thì đã đầy -> để cache tự xoá
+        self.timeout = int(self.capacity * self.refill_seconds) + 60
+
+    def _key(self, key):
+        return f"ratelimit:{self.name}:{key}"
+
+    @staticmethod
+    def _ms(now):
+        return int((time.time() if now is None else now) * 1000)
+
+    def consume(self, key, now=None):
+        now = self._ms(now)
+        cache_key = self._key(key)
+        try:
+            full_at = cache.incr(cache_key, self._interval)
+        except ValueError:
+            # Bucket mới (hoặc đã hết hạn / bị cache xoá) -> đầy token; add: request song song đã tạo thì dùng của nó
+            if cache.add(cache_key, now + self._interval, self.timeout):
+                return True
+            full_at = cache.incr(cache_key, self._interval)
+
+        if full_at < now + self._interval:
+            # Để lâu không dùng: bucket chỉ đầy tới capacity, không tích luỹ token
+            # (2 request cắt cùng lúc -> bucket hụt vài token, chấp nhận)
+            full_at = cache.incr(cache_key, now + self._interval - full_at)
+        if full_at - now > self.capacity * self._interval:
+            # Bị từ chối không tính là đã dùng token -> bot gửi liên tục vẫn chỉ qua được đúng tốc độ hồi
+            cache.decr(cache_key, self._interval)
+            return False
+        cache.touch(cache_key, self.timeout)
+        return True
+
+    def refund(self, key):
+        """Trả lại 1 token đã lấy (VD: request bị bucket khác từ chối)"""
+        try:
+            cache.decr(self._key(key), self._interval)
+        except ValueError:
+            pass
+
+    def remaining(self, key, now=None):
+        """Số token còn lại (chỉ đọc, dùng để hiển thị / kiểm tra)"""
+        full_at = cache.get(self._key(key))
+        if full_at is None:
+            return self.capacity
+        spare = (self.capacity * self._interval - (full_at - self._ms(now))) // self._interval
+        return max(0, min(self.capacity, spare))
+
+    def reset(self, key):
+        cache.delete(self._key(key))
+
+
+def _bucket(scope):
+    capacity, refill_seconds = getattr(settings, f'REVIEW_RATE_LIMIT_{scope.upper()}', (5, 60))
+    return TokenBucket(f'review:{scope}', capacity, refill_seconds)
+
+
+def client_ip(request):
+    """IP của request (chỉ REMOTE_ADDR: X-Forwarded-For do client tự gửi được nên không tin)"""
+    return request.META.get('REMOTE_ADDR') or 'unknown'
+
+
+def check_review_submission(user_id, ip, now=None):
+    """
+    Kiểm tra giới hạn gửi đánh giá theo user và theo IP
+    Return: None nếu được gửi, 'user' / 'ip' nếu bị từ chối (bucket nào hết token)
+    """
+    if not getattr(settings, 'REVIEW_RATE_LIMIT_ENABLED', True):
+        return None
+    user_bucket = _bucket('user')
+    if not user_bucket.consume(user_id, now):
+        scope = 'user'
+    elif not _bucket('ip').consume(ip, now):
+        user_bucket.refund(user_id)
+        scope = 'ip'
+    else:
+        return None
+    metrics.inc('review_rate_limited_total', scope)
+    logger.debug(f"Review submission rate limited ({scope}): user={user_id}, ip={ip}")
+    return scope
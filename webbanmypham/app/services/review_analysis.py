@@ -0,0 +1,137 @@
+"""
+Hàng đợi phân tích review chạy nền (lưu trong DB, không cần broker ngoài)
+Review mới được lưu với analysis_status=PENDING, worker
+(python manage.py process_review_queue) lấy từng batch để chấm cảm xúc + spam
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import near_duplicate
+from .review_service import is_review_spam_batch, spam_check_version
+
+logger = logging.getLogger(__name__)
+
+# Các field worker ghi lại sau khi phân tích
+ANALYSIS_FIELDS = [
+    'sentiment', 'confidence_score', 'is_spam', 'spam_reason', 'spam_checked_version',
+    'analysis_status', 'analysis_claimed_at',
+]
+
+
+def claim_pending_reviews(limit):
+    """
+    Nhận tối đa `limit` review đang chờ để xử lý (đánh dấu PROCESSING)
+    Review PROCESSING quá hạn lease (worker chết giữa chừng) được nhận lại
+    """
+    from app.models import Review
+
+    lease = timedelta(seconds=getattr(settings, 'REVIEW_ANALYSIS_LEASE_SECONDS', 300))
+    now = timezone.now()
+    ready = Q(analysis_status=Review.ANALYSIS_PENDING) | Q(
+        analysis_status=Review.ANALYSIS_PROCESSING,
+        analysis_claimed_at__lt=now - lease,
+    )
+
+    with transaction.atomic():
+        qs = Review.objects.filter(ready).order_by('id')
+        features = connection.features
+        if features.has_select_for_update:
+            # Nhiều worker chạy song song không nhận trùng review
+            qs = qs.select_for_update(skip_locked=features.has_select_for_update_skip_locked)
+        ids = list(qs.values_list('id', flat=True)[:limit])
+        if not ids:
+            return []
+
+        Review.objects.filter(id__in=ids).update(
+            analysis_status=Review.ANALYSIS_PROCESSING,
+            analysis_claimed_at=now,
+            analysis_attempts=F('analysis_attempts') + 1,
+        )
+
+    return list(Review.objects.filter(id__in=ids).order_by('id'))
+
+
+def _apply_results(reviews, sentiments):
+    from app.models import Review
+
+    # Đọc version trước khi chấm: bộ keyword đổi giữa chừng -> review được kiểm tra lại sau
+    version = spam_check_version()
+    duplicates = near_duplicate.duplicate_counts(reviews)
+    spam_results = is_review_spam_batch(
+        [r.comment for r in reviews], [r.rating for r in reviews], duplicates=duplicates,
+    )
+    for review, (label, score), spam_result in zip(reviews, sentiments, spam_results):
+        review.is_spam = spam_result['is_spam']
+        review.spam_reason = spam_result['reason'] if spam_result['is_spam'] else ''
+        # Nếu spam thì đổi sentiment thành SPAM
+        review.sentiment = 'SPAM' if spam_result['is_spam'] else label
+        review.spam_checked_version = version
+        review.confidence_score = score
+        review.analysis_status = Review.ANALYSIS_DONE
+        review.analysis_claimed_at = None
+
+    Review.objects.bulk_update(reviews, ANALYSIS_FIELDS)
+
+
+def release_reviews(reviews):
+    """
+    Trả review lỗi về hàng đợi để thử lại
+    Quá REVIEW_ANALYSIS_MAX_ATTEMPTS lần -> FAILED
+    """
+    from app.models import Review
+
+    max_attempts = getattr(settings, 'REVIEW_ANALYSIS_MAX_ATTEMPTS', 3)
+    ids = [r.id for r in reviews]
+    failed = Review.objects.filter(id__in=ids, analysis_attempts__gte=max_attempts).update(
+        analysis_status=Review.ANALYSIS_FAILED, analysis_claimed_at=None,
+    )
+    Review.objects.filter(id__in=ids, analysis_attempts__lt=max_attempts).update(
+        analysis_status=Review.ANALYSIS_PENDING, analysis_claimed_at=None,
+    )
+    if failed:
+        logger.error(f"{failed} review(s) marked FAILED after {max_attempts} attempts")
+
+
+def process_reviews(reviews):
+    """
+    Phân tích 1 batch review đã nhận
+    Return: (số review xong, số review lỗi)
+    """
+    from app.ai_utils import analyze_sentiment_batch
+
+    if not reviews:
+        return 0, 0
+
+    try:
+        sentiments = analyze_sentiment_batch(
+            [r.comment for r in reviews], raise_errors=True, ratings=[r.rating for r in reviews],
+        )
+        _apply_results(reviews, sentiments)
+        return len(reviews), 0
+    except Exception as e:
+        logger.error(f"Review analysis batch of {len(reviews)} failed: {e}", exc_info=True)
+        if len(reviews) == 1:
+            release_reviews(reviews)
+            return 0, 1
+
+    # Batch lỗi -> chạy lại từng review để 1 bình luận lỗi không kéo cả batch
+    done, failed = 0, 0
+    for review in reviews:
+        d, f = process_reviews([review])
+        done += d
+        failed += f
+    return done, failed
+
+
+def pending_count():
+    """Số review đang chờ trong hàng đợi"""
+    from app.models import Review
+
+    return Review.objects.filter(
+        analysis_status__in=[Review.ANALYSIS_PENDING, Review.ANALYSIS_PROCESSING]
+    ).count()
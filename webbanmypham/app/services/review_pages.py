@@ -0,0 +1,76 @@
+"""
+Phân trang đánh giá trên trang chi tiết sản phẩm theo keyset (created_at, id) thay vì OFFSET
+- Trang sau = review cũ hơn review cuối của trang trước -> mỗi trang chỉ đọc page_size + 1 dòng
+  trên index review_product_page_idx (product, is_approved, created_at), trang thứ 1000 cũng nhanh như trang 1
+- Cursor: "<micro giây từ epoch>-<id>" của review cuối trang, gửi lại qua ?after=
+"""
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+_EPOCH_AWARE = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_EPOCH_NAIVE = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_CURSOR_RE = re.compile(r'([0-9]{1,20})-([0-9]{1,19})')
+# id lớn hơn BIGINT -> database báo lỗi tràn số thay vì không có kết quả
+_MAX_ID = 2 ** 63 - 1
+
+
+def page_size():
+    return getattr(settings, 'PRODUCT_REVIEWS_PAGE_SIZE', 10)
+
+
+def _epoch(value):
+    return _EPOCH_AWARE if timezone.is_aware(value) else _EPOCH_NAIVE
+
+
+def encode_cursor(review):
+    # Số nguyên micro giây (không qua float) -> so sánh đúng tuyệt đối với giá trị trong database
+    return f"{(review.created_at - _epoch(review.created_at)) // _MICROSECOND}-{review.id}"
+
+
+def decode_cursor(cursor):
+    """Cursor -> (created_at, id); sai định dạng / số âm / ngoài khoảng datetime hoặc id -> ValueError"""
+    match = _CURSOR_RE.fullmatch(str(cursor))
+    if match is None:
+        raise ValueError(f"Invalid review cursor: {cursor!r}")
+    micros, review_id = int(match.group(1)), int(match.group(2))
+    if review_id > _MAX_ID:
+        raise ValueError(f"Review cursor id out of range: {cursor!r}")
+    epoch = _EPOCH_AWARE if settings.USE_TZ else _EPOCH_NAIVE
+    try:
+        return epoch + timedelta(microseconds=micros), review_id
+    except OverflowError:
+        raise ValueError(f"Review cursor time out of range: {cursor!r}") from None
+
+
+def visible_reviews(product_id):
+    """Review hiện trên trang sản phẩm (đã duyệt, không spam), mới nhất trước"""
+    from app.models import Review
+
+    return (
+        Review.objects.filter(product_id=product_id, is_approved=True, is_spam=False)
+        .select_related('user__profile')
+        .order_by('-created_at', '-id')
+    )
+
+
+def reviews_page(product_id, cursor=None, limit=None):
+    """
+    1 trang review (cũ hơn cursor nếu có)
+    Return: (list review, cursor trang sau hoặc None nếu hết)
+    """
+    limit = limit or page_size()
+    queryset = visible_reviews(product_id)
+    if cursor:
+        created_at, review_id = decode_cursor(cursor)
+        # (created_at, id) < cursor; điều kiện created_at <= ... đứng riêng để database dùng được index theo khoảng
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(id__lt=review_id), created_at__lte=created_at)
+    reviews = list(queryset[:limit + 1])
+    if len(reviews) <= limit:
+        return reviews, None
+    reviews = reviews[:limit]
+    return reviews, encode_cursor(reviews[-1])
@@ -1,28 +1,134 @@
 """
 Service xử lý reviews: spam detection, sentiment analysis
 """
+import hashlib
+import json
 import re
+import threading
+import time
+from collections import Counter
+from django.conf import settings
 from django.core.cache import cache
+from django.db import transaction
+
+from . import spam_classifier
+from .keyword_matcher import AhoCorasick
+
+SPAM_KEYWORDS_VERSION_KEY = 'spam_keywords_version'
+
+# Đầu spam_reason của review do bộ phân loại đánh dấu (không dùng làm nhãn khi train lại)
+MODEL_SPAM_REASON = 'Bộ phân loại spam'
+
+# Ký tự đặc biệt của luật "quá nhiều ký tự đặc biệt"
+SPECIAL_CHARS_RE = re.compile(r'[!@#$%^&*()_+=\[\]{};:"\\|,.<>?/~`]')
+
+# Bản sao bộ keyword trong process: (version, automaton, keywords)
+# Chỉ đọc lại database khi version trên cache khác version đang giữ hoặc key version hết hạn
+# (SPAM_KEYWORDS_VERSION_TIMEOUT: cache riêng từng process / sửa bảng bằng SQL thô vẫn cập nhật trong chừng đó giây)
+_keyword_set = None
+_checked_at = 0.0
+_keyword_lock = threading.Lock()
+
+
+def _load_keyword_set():
+    """Đọc keyword đang bật từ database, build automaton -> (version, automaton, keywords)"""
+    from app.models import SpamKeyword
+    keywords = list(
+        SpamKeyword.objects.filter(is_active=True)
+        .values('keyword', 'severity', 'category')
+        .order_by('-severity', 'keyword')
+    )
+    # Thứ tự pattern = thứ tự severity giảm dần -> match đầu tiên là severity cao nhất
+    automaton = AhoCorasick(item['keyword'].lower() for item in keywords)
+    return _keywords_version(keywords), automaton, keywords
+
+
+def _keywords_version(keywords):
+    payload = json.dumps(keywords, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _version_timeout():
+    return getattr(settings, 'SPAM_KEYWORDS_VERSION_TIMEOUT', 300)
+
+
+def _current_keyword_set():
+    """
+    Bộ keyword hiện tại của process
+    Mỗi lần tra đọc 1 key version nhỏ từ cache (SPAM_KEYWORDS_VERSION_CHECK_INTERVAL > 0: chỉ đọc sau chừng đó giây,
+    process khác có thể dùng bộ keyword cũ trong khoảng này), chỉ query database khi version đổi / hết hạn
+    """
+    global _keyword_set, _checked_at
+    interval = getattr(settings, 'SPAM_KEYWORDS_VERSION_CHECK_INTERVAL', 0)
+    current = _keyword_set
+    if current is not None and time.monotonic() - _checked_at < interval:
+        return current
+
+    with _keyword_lock:
+        published = cache.get(SPAM_KEYWORDS_VERSION_KEY)
+        if _keyword_set is None or published != _keyword_set[0]:
+            _keyword_set = _load_keyword_set()
+            if published is None:
+                # Key hết hạn / cache bị xoá: process đầu tiên đọc database công bố version
+                # (chỉ add, không ghi đè: version do process vừa commit ghi luôn thắng bản đọc trước commit)
+                cache.add(SPAM_KEYWORDS_VERSION_KEY, _keyword_set[0], _version_timeout())
+        _checked_at = time.monotonic()
+        return _keyword_set
 
 
 def get_spam_keywords():
     """
-    Lấy danh sách spam keywords từ database với caching
-    Cache trong 5 phút để giảm query
+    Lấy danh sách spam keywords đang bật (severity giảm dần)
+    Dùng bản sao trong process, tự làm mới khi bộ keyword đổi version
     """
-    cache_key = 'spam_keywords_active'
-    keywords = cache.get(cache_key)
-    
-    if keywords is None:
-        from app.models import SpamKeyword
-        keywords = list(
-            SpamKeyword.objects.filter(is_active=True)
-            .values('keyword', 'severity', 'category')
-            .order_by('-severity')
-        )
-        cache.set(cache_key, keywords, 300)  # Cache 5 phút
-    
-    return keywords
+    return _current_keyword_set()[2]
+
+
+def spam_keywords_version():
+    """Version bộ keyword đang dùng"""
+    return _current_keyword_set()[0]
+
+
+def spam_check_version():
+    """
+    Version bộ luật spam: bộ keyword + bộ phân loại đã train (ghi vào Review.spam_checked_version sau khi kiểm tra)
+    Đổi keyword hoặc train lại bộ phân loại -> version đổi -> spam_recheck chấm lại review cũ
+    """
+    version = spam_keywords_version()
+    classifier = spam_classifier.model_version()
+    if classifier is None:
+        return version
+    return hashlib.sha1(f"{version}:{classifier}".encode('utf-8')).hexdigest()
+
+
+def invalidate_spam_keywords():
+    """
+    Đọc lại bộ keyword ngay và công bố version mới (ghi đè version trên cache)
+    Signal SpamKeyword và SpamKeywordQuerySet.update / bulk_create / bulk_update đã tự gọi sau commit
+    (spam_keywords_changed, xem app/signals.py); chỉ cần gọi tay khi sửa bảng bằng SQL thô
+    """
+    global _keyword_set, _checked_at
+    with _keyword_lock:
+        # Process vừa ghi thấy ngay dữ liệu mới; process khác thấy ở lần kiểm tra version kế tiếp
+        # (cache riêng từng process: khi key version của process đó hết hạn)
+        _keyword_set = _load_keyword_set()
+        _checked_at = time.monotonic()
+        cache.set(SPAM_KEYWORDS_VERSION_KEY, _keyword_set[0], _version_timeout())
+
+
+def spam_keywords_changed():
+    """Bộ keyword vừa bị ghi -> đọc lại + công bố version mới sau khi transaction commit (rollback thì bỏ qua)"""
+    transaction.on_commit(invalidate_spam_keywords)
+
+
+def get_spam_matcher():
+    """
+    Automaton Aho–Corasick của các keyword đang bật
+    Chỉ build lại khi version bộ keyword thay đổi
+    Return: (automaton, list keyword cùng thứ tự ưu tiên)
+    """
+    _, automaton, keywords = _current_keyword_set()
+    return automaton, keywords
 
 
 def detect_spam_keywords(comment):
@@ -31,46 +137,104 @@ def detect_spam_keywords(comment):
     Return: (is_spam: bool, spam_keyword: str, severity: int, category: str)
     """
     comment_lower = comment.lower().strip()
-    
-    # Lấy keywords từ database
-    spam_keywords = get_spam_keywords()
-    
-    # Kiểm tra từng keyword
-    for item in spam_keywords:
-        keyword = item['keyword'].lower()
-        if keyword in comment_lower:
-            return True, item['keyword'], item['severity'], item['category']
-    
-    # Kiểm tra lặp lại từ (VD: "tuyệt vời tuyệt vời tuyệt vời")
-    words = comment_lower.split()
-    if len(words) >= 2:  # Cần ít nhất 2 từ để check lặp
-        word_counts = {}
-        for word in words:
-            if len(word) > 2:  # Chỉ đếm từ dài hơn 2 ký tự
-                word_counts[word] = word_counts.get(word, 0) + 1
-        
-        # Nếu có từ lặp lại >= 3 lần
-        for word, count in word_counts.items():
-            if count >= 3:
-                return True, f"Lặp từ: {word}", 90, "REPEAT"
-    
-    # Kiểm tra ký tự đặc biệt quá nhiều (> 30%)
-    special_chars = re.findall(r'[!@#$%^&*()_+=\[\]{};:"\\|,.<>?/~`]', comment)
-    if len(comment) > 5 and len(special_chars) > len(comment) * 0.3:
-        return True, "Quá nhiều ký tự đặc biệt", 70, "OTHER"
-    
-    # Kiểm tra chữ IN HOA quá nhiều (> 80%)
-    if len(comment) > 5:
-        uppercase_count = sum(1 for c in comment if c.isupper())
-        if uppercase_count > len(comment) * 0.8:
-            return True, "Viết hoa quá nhiều", 60, "OTHER"
-    
+    # Quét 1 lần qua comment cho mọi keyword (Aho–Corasick), lấy keyword severity cao nhất
+    automaton, spam_keywords = get_spam_matcher()
+    index = automaton.first_match(comment_lower)
+    return _detect_with_match(comment, comment_lower, None if index is None else spam_keywords[index])
+
+
+def _repeated_word(words):
+    """Từ (> 2 ký tự) đầu tiên lặp >= 3 lần, theo thứ tự xuất hiện lần đầu"""
+    # Không có từ nào lặp 3 lần nếu tổng số lần lặp < 2
+    if len(words) < 3:
+        return None
+    counts = Counter(words)
+    if len(words) - len(counts) < 2:
+        return None
+    for word, count in counts.items():
+        if count >= 3 and len(word) > 2:
+            return word
+    return None
+
+
+def _detect_with_match(comment, comment_lower, item):
+    """
+    Luật spam của 1 comment khi đã biết keyword khớp (item hoặc None), dùng chung cho detect_spam_keywords
+    và detect_spam_keywords_batch: keyword, lặp từ (>= 3 lần), ký tự đặc biệt (> 30%), chữ in hoa (> 80%)
+    Mỗi đặc trưng tính bằng 1 thao tác chạy bằng C (split + Counter, regex, map(str.isupper))
+    """
+    if item is not None:
+        return True, item['keyword'], item['severity'], item['category']
+
+    word = _repeated_word(comment_lower.split())
+    if word is not None:
+        return True, f"Lặp từ: {word}", 90, "REPEAT"
+
+    length = len(comment)
+    if length > 5:
+        special_count = len(SPECIAL_CHARS_RE.findall(comment))
+        if special_count > length * 0.3:
+            return True, "Quá nhiều ký tự đặc biệt", 70, "OTHER"
+
+        # Khoảng trắng / ký tự đặc biệt không phải chữ hoa -> phần lớn review dừng ở đây, không đếm từng ký tự
+        if length - comment.count(' ') - special_count > length * 0.8:
+            uppercase_count = sum(map(str.isupper, comment))
+            if uppercase_count > length * 0.8:
+                return True, "Viết hoa quá nhiều", 60, "OTHER"
+
     return False, None, 0, None
 
 
-def is_review_spam(comment, rating=None):
-    
-    is_spam, keyword, severity, category = detect_spam_keywords(comment)
+def detect_spam_keywords_batch(comments):
+    """
+    detect_spam_keywords cho cả list comment (lấy bộ keyword 1 lần, quét keyword theo batch)
+    Return: list (is_spam, spam_keyword, severity, category), cùng thứ tự với comments
+    """
+    automaton, spam_keywords = get_spam_matcher()
+    lowered = [comment.lower().strip() for comment in comments]
+    matches = automaton.first_matches(lowered)
+    return [
+        _detect_with_match(comment, comment_lower, None if index is None else spam_keywords[index])
+        for comment, comment_lower, index in zip(comments, lowered, matches)
+    ]
+
+
+def _classifier_scores(comments):
+    """(xác suất spam của từng comment, ngưỡng) từ spam_classifier; chưa train model -> (None..., None)"""
+    model = spam_classifier.get_model()
+    if model is None:
+        return [None] * len(comments), None
+    return [float(p) for p in model.predict_proba(comments)], model.threshold
+
+
+def is_review_spam_batch(comments, ratings=None, duplicates=None):
+    """
+    is_review_spam cho hàng nghìn comment mỗi lần gọi (quét lại review trong admin, import, hàng đợi)
+    Kết quả giống hệt gọi is_review_spam từng comment (xem app/tests.py)
+    """
+    if ratings is None:
+        ratings = [None] * len(comments)
+    if duplicates is None:
+        duplicates = [0] * len(comments)
+    probabilities, threshold = _classifier_scores(comments)
+    return [
+        _spam_result(detection, rating, duplicate_count, probability, threshold)
+        for detection, rating, duplicate_count, probability in zip(
+            detect_spam_keywords_batch(comments), ratings, duplicates, probabilities,
+        )
+    ]
+
+
+def is_review_spam(comment, rating=None, duplicates=0):
+    """
+    duplicates: số review khác gần trùng nội dung (near_duplicate.duplicate_counts)
+    """
+    probabilities, threshold = _classifier_scores([comment])
+    return _spam_result(detect_spam_keywords(comment), rating, duplicates, probabilities[0], threshold)
+
+
+def _spam_result(detection, rating, duplicates=0, probability=None, threshold=None):
+    is_spam, keyword, severity, category = detection
     
     # Nếu tìm thấy spam keyword
     if is_spam:
@@ -83,6 +247,10 @@ def is_review_spam(comment, rating=None):
         else:
             reason = f"Chứa spam: '{keyword}'"
         
+        # Model cũng cho là spam -> tăng độ tin cậy (luật severity thấp như viết hoa, ký tự đặc biệt)
+        if probability is not None:
+            confidence = max(confidence, min(100, round(100 * probability)))
+        
         return {
             'is_spam': True,
             'reason': reason,
@@ -90,6 +258,24 @@ def is_review_spam(comment, rating=None):
             'category': category or 'OTHER'
         }
     
+    # Cùng 1 nội dung (hoặc sửa nhẹ) đăng ở nhiều review -> chiến dịch copy-paste
+    if duplicates >= getattr(settings, 'SPAM_DUPLICATE_MIN_COPIES', 2):
+        return {
+            'is_spam': True,
+            'reason': f"Trùng nội dung với {duplicates} review khác",
+            'confidence': min(100, 60 + 10 * duplicates),
+            'category': 'DUPLICATE'
+        }
+    
+    # Không chứa keyword nào nhưng model đã train cho xác suất spam cao
+    if probability is not None and probability >= threshold:
+        return {
+            'is_spam': True,
+            'reason': f"{MODEL_SPAM_REASON}: {probability:.0%}",
+            'confidence': round(100 * probability, 1),
+            'category': 'MODEL'
+        }
+    
     # Không phải spam
     return {
         'is_spam': False,
@@ -0,0 +1,149 @@
+"""
+Thống kê đánh giá theo sản phẩm (ProductReviewStats), cập nhật dần theo thay đổi của Review
+- Chỉ tính review đang hiện: đã duyệt (is_approved) và không spam
+- Số review theo cảm xúc (pos / neg / neu) chỉ tính review đã phân tích xong (analysis_status = DONE):
+  review đang chờ worker có sentiment mặc định NEU, chưa phải kết quả thật
+- Mỗi thay đổi = (giá trị cũ, giá trị mới) của vài field -> cộng / trừ bằng F() trong cùng transaction,
+  sản phẩm có cùng mức thay đổi gộp chung 1 câu UPDATE
+- Review.save, ReviewQuerySet (update, bulk_update, bulk_create) và signal post_delete gọi apply_changes
+- rebuild(): tính lại từ đầu (manage.py rebuild_review_stats)
+- Thống kê đổi -> tăng version cache trang chi tiết của sản phẩm đó (product_fragments)
+"""
+import logging
+from collections import Counter, defaultdict
+
+from django.db import connection, connections, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from . import product_fragments
+
+logger = logging.getLogger(__name__)
+
+# Field của Review ảnh hưởng tới thống kê (update / bulk_update không đụng tới -> bỏ qua)
+STAT_FIELDS = frozenset({'product', 'product_id', 'rating', 'sentiment', 'analysis_status', 'is_spam', 'is_approved'})
+ROW_FIELDS = ('product_id', 'rating', 'sentiment', 'analysis_status', 'is_spam', 'is_approved')
+COUNTERS = ['review_count', 'rating_sum', 'pos_count', 'neg_count', 'neu_count']
+SENTIMENT_COUNTERS = {'POS': 'pos_count', 'NEG': 'neg_count', 'NEU': 'neu_count'}
+ANALYSIS_DONE = 'DONE'  # Review.ANALYSIS_DONE
+
+
+def row_of(review):
+    """Giá trị field thống kê của 1 object Review"""
+    return {name: getattr(review, name) for name in ROW_FIELDS}
+
+
+def snapshot(queryset):
+    """{id: giá trị field thống kê} của các review trong queryset (khoá dòng nếu database hỗ trợ)"""
+    if connections[queryset.db].features.has_select_for_update:
+        queryset = queryset.select_for_update()
+    return {row.pop('id'): row for row in queryset.order_by().values('id', *ROW_FIELDS)}
+
+
+def contribution(row):
+    """Phần review này đóng góp vào thống kê sản phẩm (review ẩn / spam -> không có)"""
+    if row is None or not row['is_approved'] or row['is_spam']:
+        return {}
+    result = {'review_count': 1, 'rating_sum': int(row['rating'])}
+    counter = SENTIMENT_COUNTERS.get(row['sentiment']) if row['analysis_status'] == ANALYSIS_DONE else None
+    if counter:
+        result[counter] = 1
+    return result
+
+
+def apply_changes(changes, create_missing=True):
+    """
+    changes: list (giá trị cũ hoặc None nếu review mới, giá trị mới hoặc None nếu đã xoá)
+    Sản phẩm chưa có dòng thống kê -> tính lại từ đầu (create_missing=False: bỏ qua, VD khi xoá)
+    Return: số sản phẩm có thống kê thay đổi
+    """
+    from app.models import ProductReviewStats
+
+    deltas = defaultdict(Counter)
+    for before, after in changes:
+        for row, sign in ((before, -1), (after, 1)):
+            if row is not None:
+                for name, value in contribution(row).items():
+                    deltas[row['product_id']][name] += sign * value
+    deltas = {pid: {name: v for name, v in delta.items() if v} for pid, delta in deltas.items()}
+    deltas = {pid: delta for pid, delta in deltas.items() if delta}
+    if not deltas:
+        return 0
+
+    existing = set(ProductReviewStats.objects.filter(product_id__in=deltas).values_list('product_id', flat=True))
+    missing = [pid for pid in deltas if pid not in existing]
+    if missing and create_missing:
+        # Dữ liệu review đã được ghi trong transaction này -> tính lại đã gồm thay đổi
+        rebuild(missing)
+
+    groups = defaultdict(list)
+    for pid in existing:
+        groups[tuple(sorted(deltas[pid].items()))].append(pid)
+    now = timezone.now()
+    for delta, product_ids in groups.items():
+        ProductReviewStats.objects.filter(product_id__in=product_ids).update(
+            updated_at=now, **{name: F(name) + value for name, value in delta}
+        )
+    product_fragments.products_changed(existing)
+    return len(deltas)
+
+
+def aggregate(product_ids):
+    """Tính thống kê từ bảng Review cho các sản phẩm: {product_id: {counter: giá trị}}"""
+    from app.models import Review
+
+    rows = (
+        Review.objects.filter(product_id__in=product_ids, is_approved=True, is_spam=False)
+        .order_by().values('product_id')
+        .annotate(
+            review_count=Count('id'),
+            rating_sum=Sum('rating'),
+            **{
+                name: Count('id', filter=Q(sentiment=s, analysis_status=ANALYSIS_DONE))
+                for s, name in SENTIMENT_COUNTERS.items()
+            },
+        )
+    )
+    totals = {pid: dict.fromkeys(COUNTERS, 0) for pid in product_ids}
+    for row in rows:
+        totals[row['product_id']] = {name: row[name] or 0 for name in COUNTERS}
+    return totals
+
+
+def rebuild(product_ids=None, chunk_size=500, dry_run=False):
+    """
+    Tính lại thống kê từ đầu (mọi sản phẩm hoặc product_ids), ghi đè theo từng chunk sản phẩm
+    dry_run: chỉ đếm số sản phẩm bị lệch, không ghi
+    Return: (số sản phẩm, số sản phẩm có thống kê bị lệch trước khi tính lại)
+    """
+    from app.models import Product, ProductReviewStats
+
+    products = Product.objects.order_by('id')
+    if product_ids is not None:
+        products = products.filter(id__in=list(product_ids))
+    ids = list(products.values_list('id', flat=True))
+    # MySQL không hỗ trợ ON CONFLICT(cột) -> để database tự dùng khoá chính
+    conflict_target = ['product'] if connection.features.supports_update_conflicts_with_target else None
+
+    drifted = 0
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        with transaction.atomic():
+            # Khoá dòng thống kê trước khi đếm: review ghi song song phải chờ, rồi cộng vào số mới (không bị ghi đè mất)
+            current = ProductReviewStats.objects.filter(product_id__in=chunk)
+            if connection.features.has_select_for_update:
+                current = current.select_for_update()
+            current = {row.pop('product_id'): row for row in current.values('product_id', *COUNTERS)}
+            totals = aggregate(chunk)
+            changed = [pid for pid in chunk if current.get(pid, dict.fromkeys(COUNTERS, 0)) != totals[pid]]
+            drifted += len(changed)
+            if dry_run:
+                continue
+            product_fragments.products_changed(changed)
+            ProductReviewStats.objects.bulk_create(
+                [ProductReviewStats(product_id=pid, **totals[pid]) for pid in chunk],
+                update_conflicts=True, unique_fields=conflict_target, update_fields=COUNTERS + ['updated_at'],
+            )
+    if drifted and not dry_run:
+        logger.info(f"Review stats rebuilt for {len(ids)} product(s), {drifted} had drifted")
+    return len(ids), drifted
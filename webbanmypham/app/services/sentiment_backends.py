@@ -0,0 +1,164 @@
+"""
+Các backend chạy model cảm xúc trên CPU (chọn bằng SENTIMENT_BACKEND)
+- 'torch'      : PyTorch fp32 (mặc định, giống trước đây)
+- 'torch_int8' : PyTorch dynamic quantization int8 cho các lớp Linear
+- 'onnx'       : graph ONNX đã export (python manage.py export_sentiment_onnx)
+Backend nào cũng trả về callable có interface giống transformers.pipeline:
+    pipe(text) / pipe(list_text, batch_size=n) -> [{'label': ..., 'score': ...}]
+"""
+import contextlib
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('torch', 'torch_int8', 'onnx')
+
+ONNX_FILE_NAME = 'model.onnx'
+
+
+def build_pipeline(backend, model_name, onnx_dir=None, threads=None, interop_threads=None):
+    """
+    Tạo pipeline cảm xúc theo backend
+    threads / interop_threads: số thread intra-op / inter-op (None = mặc định của thư viện)
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown sentiment backend '{backend}', expected one of {BACKENDS}")
+
+    if backend == 'onnx':
+        return OnnxSentimentPipeline(onnx_dir, threads=threads, interop_threads=interop_threads)
+
+    configure_torch_threads(threads, interop_threads)
+
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+    from transformers import pipeline
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.eval()
+
+    if backend == 'torch_int8':
+        import torch
+        # Lượng tử hoá trọng số Linear sang int8, activation tính động lúc chạy
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+
+
+def configure_torch_threads(threads=None, interop_threads=None):
+    """
+    Giới hạn số thread của torch trong process hiện tại
+    Mặc định torch dùng mọi core -> nhiều worker trên 1 máy tranh CPU của nhau
+    """
+    import torch
+
+    if threads:
+        torch.set_num_threads(int(threads))
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(int(interop_threads))
+        except RuntimeError as e:
+            # Chỉ đặt được 1 lần, trước khi torch chạy phép tính song song đầu tiên
+            logger.warning(f"Could not set torch interop threads: {e}")
+
+
+def inference_context(backend, enabled=True):
+    """torch.inference_mode() cho backend torch (tắt autograd + version counter), backend khác không cần"""
+    if enabled and backend != 'onnx':
+        import torch
+        return torch.inference_mode()
+    return contextlib.nullcontext()
+
+
+class OnnxSentimentPipeline:
+    """Chạy graph ONNX bằng onnxruntime (CPU), output giống pipeline của transformers"""
+
+    def __init__(self, onnx_dir, max_length=512, threads=None, interop_threads=None):
+        import numpy as np
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        if not onnx_dir or not os.path.exists(os.path.join(onnx_dir, ONNX_FILE_NAME)):
+            raise FileNotFoundError(
+                f"ONNX model not found in {onnx_dir}, run: python manage.py export_sentiment_onnx"
+            )
+
+        self._np = np
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(onnx_dir)
+        with open(os.path.join(onnx_dir, 'config.json'), encoding='utf-8') as f:
+            config = json.load(f)
+        self.id2label = {int(k): v for k, v in config.get('id2label', {}).items()}
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = int(threads)
+        if interop_threads:
+            options.inter_op_num_threads = int(interop_threads)
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(onnx_dir, ONNX_FILE_NAME), options, providers=['CPUExecutionProvider'],
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def __call__(self, inputs, batch_size=None, top_k='', max_length=None, **kwargs):
+        """top_k=None: trả về điểm của mọi nhãn (giống pipeline của transformers)"""
+        texts = [inputs] if isinstance(inputs, str) else list(inputs)
+        batch_size = batch_size or 1
+        max_length = min(max_length or self.max_length, self.max_length)
+        results = []
+        for start in range(0, len(texts), batch_size):
+            results.extend(self._predict(texts[start:start + batch_size], max_length, all_scores=top_k is None))
+        return results
+
+    def _predict(self, texts, max_length, all_scores=False):
+        np = self._np
+        encoded = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=max_length, return_tensors='np',
+        )
+        feed = {k: v.astype(np.int64) for k, v in encoded.items() if k in self.input_names}
+        logits = self.session.run(None, feed)[0]
+
+        # Softmax ổn định số học
+        logits = logits - logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+
+        if all_scores:
+            return [
+                sorted(
+                    ({'label': self.id2label.get(i, f"LABEL_{i}"), 'score': float(p[i])} for i in range(len(p))),
+                    key=lambda item: item['score'], reverse=True,
+                )
+                for p in probs
+            ]
+
+        best = probs.argmax(axis=1)
+        return [
+            {'label': self.id2label.get(int(i), f"LABEL_{int(i)}"), 'score': float(p[i])}
+            for i, p in zip(best, probs)
+        ]
+
+
+def parity_report(reference, candidate, texts, batch_size=8):
+    """
+    So sánh 2 pipeline trên cùng bộ text
+    Return: dict tỉ lệ trùng nhãn + độ lệch score (0-1)
+    """
+    ref = reference(texts, batch_size=batch_size, truncation=True)
+    cand = candidate(texts, batch_size=batch_size, truncation=True)
+
+    agree = 0
+    drifts = []
+    for r, c in zip(ref, cand):
+        if r['label'] == c['label']:
+            agree += 1
+            drifts.append(abs(r['score'] - c['score']))
+
+    return {
+        'total': len(texts),
+        'label_agreement': agree / len(texts) if texts else 1.0,
+        'max_score_drift': max(drifts) if drifts else 0.0,
+        'mean_score_drift': sum(drifts) / len(drifts) if drifts else 0.0,
+    }
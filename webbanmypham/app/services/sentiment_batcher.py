@@ -0,0 +1,95 @@
+"""
+Micro-batching cho AI: gom các lời gọi đồng thời thành một batch
+để chạy một lần forward pass thay vì nhiều batch 1 phần tử
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Gom các input được gửi tới trong khoảng `max_wait_ms` (hoặc khi đủ
+    `max_batch_size`) rồi gọi `batch_fn(list_input)` đúng một lần.
+    `batch_fn` phải trả về list kết quả cùng thứ tự với input.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=16, max_wait_ms=10, name='micro-batcher'):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms) / 1000.0)
+        self.name = name
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+    def submit(self, item):
+        """Gửi 1 input vào hàng đợi -> trả về Future chứa kết quả"""
+        future = Future()
+        self._ensure_worker().put((item, future))
+        return future
+
+    def _ensure_worker(self):
+        # Sau khi gunicorn/uwsgi fork, thread của process cha không còn
+        # -> mỗi process tự tạo hàng đợi + thread riêng
+        pid = os.getpid()
+        with self._lock:
+            if self._pid != pid:
+                self._queue = queue.Queue()
+                self._thread = None
+                self._pid = pid
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            return self._queue
+
+    def _run(self):
+        q = self._queue
+        while True:
+            batch = [q.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            # Gom thêm cho tới khi đủ batch hoặc hết thời gian chờ
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        batch.append(q.get(timeout=remaining))
+                    else:
+                        batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._process(batch)
+
+    def _process(self, batch):
+        # Bỏ qua các Future đã bị huỷ (caller hết timeout)
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        try:
+            results = self.batch_fn([item for item, _ in batch])
+        except Exception as e:
+            logger.error(f"{self.name}: batch of {len(batch)} failed: {e}", exc_info=True)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        results = list(results)
+        if len(results) != len(batch):
+            # Thiếu / thừa kết quả -> không biết kết quả nào của caller nào, báo lỗi cho cả batch (không để caller chờ mãi)
+            error = RuntimeError(f"{self.name}: batch_fn returned {len(results)} result(s) for {len(batch)} input(s)")
+            logger.error(str(error))
+            for _, future in batch:
+                future.set_exception(error)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
@@ -0,0 +1,120 @@
+"""
+Cache kết quả phân tích cảm xúc theo nội dung bình luận (2 tầng)
+- Tầng 1: LRU trong process (giới hạn SENTIMENT_CACHE_LOCAL_SIZE phần tử)
+- Tầng 2: Django cache (dùng chung giữa các worker nếu cấu hình Redis/Memcached)
+Key = hash(model id + text đã chuẩn hoá) -> đổi model / backend là tự mất hiệu lực
+"""
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+_local = OrderedDict()
+_local_lock = threading.Lock()
+
+# Bộ đếm hit/miss (xem cache_stats())
+_stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+
+
+def normalize_text(text):
+    """Chuẩn hoá Unicode (NFC) + gộp khoảng trắng để text giống nhau có cùng key"""
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def model_id():
+    """Định danh model hiện tại: đổi model / backend / cách cắt text / version -> key mới"""
+    from app.ai_utils import MODEL_NAME
+    backend = getattr(settings, 'SENTIMENT_BACKEND', 'torch')
+    version = getattr(settings, 'SENTIMENT_CACHE_VERSION', 1)
+    # Cách xử lý text dài cũng làm đổi kết quả
+    mode = getattr(settings, 'SENTIMENT_LONG_TEXT_MODE', 'truncate')
+    max_tokens = getattr(settings, 'SENTIMENT_MAX_TOKENS', 512)
+    return f"{MODEL_NAME}|{backend}|{mode}:{max_tokens}|v{version}"
+
+
+def make_key(text):
+    digest = hashlib.sha256(f"{model_id()}\0{normalize_text(text)}".encode('utf-8')).hexdigest()
+    return f"sentiment:{digest}"
+
+
+def _enabled():
+    return getattr(settings, 'SENTIMENT_CACHE_ENABLED', True)
+
+
+def _local_get(key):
+    with _local_lock:
+        value = _local.get(key)
+        if value is not None:
+            _local.move_to_end(key)
+        return value
+
+
+def _local_set(key, value):
+    max_size = getattr(settings, 'SENTIMENT_CACHE_LOCAL_SIZE', 10000)
+    with _local_lock:
+        _local[key] = value
+        _local.move_to_end(key)
+        while len(_local) > max_size:
+            _local.popitem(last=False)
+
+
+def get_many(texts):
+    """
+    Tra cache cho nhiều text
+    Return: dict {text: (label, score)} cho các text đã có kết quả
+    """
+    if not _enabled():
+        return {}
+
+    found = {}
+    missing = {}
+    for text in set(texts):
+        key = make_key(text)
+        value = _local_get(key)
+        if value is not None:
+            found[text] = value
+            _stats['local_hits'] += 1
+        else:
+            missing.setdefault(key, []).append(text)
+
+    if missing:
+        for key, value in cache.get_many(list(missing)).items():
+            value = tuple(value)
+            _local_set(key, value)
+            for text in missing.pop(key):
+                found[text] = value
+                _stats['shared_hits'] += 1
+        _stats['misses'] += sum(len(group) for group in missing.values())
+
+    return found
+
+
+def set_many(results):
+    """Lưu kết quả {text: (label, score)} vào cả 2 tầng cache"""
+    if not _enabled() or not results:
+        return
+
+    shared = {}
+    for text, value in results.items():
+        key = make_key(text)
+        _local_set(key, value)
+        shared[key] = value
+    cache.set_many(shared, getattr(settings, 'SENTIMENT_CACHE_TIMEOUT', 7 * 24 * 3600))
+
+
+def cache_stats():
+    """Số lần hit / miss của process hiện tại"""
+    hits = _stats['local_hits'] + _stats['shared_hits']
+    total = hits + _stats['misses']
+    return dict(_stats, local_size=len(_local), hit_ratio=hits / total if total else 0.0)
+
+
+def clear_local():
+    with _local_lock:
+        _local.clear()
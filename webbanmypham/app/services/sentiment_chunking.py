@@ -0,0 +1,61 @@
+"""
+Xử lý độ dài theo token cho model cảm xúc
+- Cắt / chia cửa sổ trượt theo số token thật (không theo số ký tự)
+- Gộp điểm các đoạn của 1 review dài
+- Sắp xếp theo độ dài token để batch ít padding
+"""
+
+
+def max_input_tokens(tokenizer, limit):
+    """Số token tối đa model nhận (kể cả token đặc biệt <s> </s>)"""
+    return min(int(limit), int(tokenizer.model_max_length))
+
+
+def token_lengths(tokenizer, texts):
+    """Số token (không tính token đặc biệt) của từng text"""
+    if not texts:
+        return []
+    encoded = tokenizer(list(texts), add_special_tokens=False)['input_ids']
+    return [len(ids) for ids in encoded]
+
+
+def split_windows(tokenizer, text, max_tokens, stride=128, max_chunks=8):
+    """
+    Chia text dài thành các cửa sổ token chồng lấn nhau `stride` token
+    Return: list (chunk_text, số token) - text ngắn trả về nguyên 1 phần tử
+    """
+    ids = tokenizer(text, add_special_tokens=False)['input_ids']
+    window = max(1, max_tokens - tokenizer.num_special_tokens_to_add())
+    if len(ids) <= window:
+        return [(text, len(ids))]
+
+    step = max(1, window - stride)
+    chunks = []
+    for start in range(0, len(ids), step):
+        piece = ids[start:start + window]
+        chunks.append((tokenizer.decode(piece), len(piece)))
+        if start + window >= len(ids) or len(chunks) >= max_chunks:
+            break
+    return chunks
+
+
+def combine_chunk_scores(chunk_scores, weights):
+    """
+    Gộp phân phối xác suất của các đoạn (trung bình có trọng số theo số token)
+    chunk_scores: list dict {label: prob}
+    Return: {'label': ..., 'score': ...} giống output pipeline
+    """
+    weights = [max(1, w) for w in weights]
+    total_weight = sum(weights)
+    combined = {}
+    for scores, weight in zip(chunk_scores, weights):
+        for label, prob in scores.items():
+            combined[label] = combined.get(label, 0.0) + prob * weight / total_weight
+
+    label = max(combined, key=combined.get)
+    return {'label': label, 'score': combined[label]}
+
+
+def length_sorted_order(lengths):
+    """Thứ tự index sắp theo độ dài -> các text dài gần nhau rơi vào cùng batch"""
+    return sorted(range(len(lengths)), key=lengths.__getitem__)
@@ -0,0 +1,69 @@
+"""
+Bộ bình luận tiếng Việt cố định dùng để so sánh / benchmark model cảm xúc
+(không thay đổi nội dung để kết quả các lần đo so sánh được với nhau)
+"""
+
+SAMPLE_REVIEWS = [
+    # Tích cực
+    "Sản phẩm tốt, dùng rất thích",
+    "Giao hàng nhanh, đóng gói cẩn thận",
+    "Son lên màu đẹp, lâu trôi, sẽ ủng hộ shop tiếp",
+    "Kem dưỡng thấm nhanh, không bết dính, da mềm hơn hẳn sau một tuần",
+    "Tuyệt vời, hàng chính hãng, có tem chống giả đầy đủ",
+    "Mùi hương dễ chịu, giữ mùi cả ngày",
+    "Shop tư vấn nhiệt tình, giao đúng màu mình đặt",
+    "Dùng được hai tuần thấy mụn giảm rõ, rất hài lòng",
+    "Sữa rửa mặt dịu nhẹ, da nhạy cảm dùng không bị kích ứng",
+    "Giá hợp lý so với chất lượng, đáng tiền",
+    "Phấn mịn, che khuyết điểm tốt, không bị mốc",
+    "Mình mua lần thứ ba rồi, vẫn chất lượng như cũ",
+    # Tiêu cực
+    "Hàng kém chất lượng, không giống mô tả",
+    "Giao hàng chậm, hộp bị móp",
+    "Dùng xong bị nổi mẩn đỏ, rất thất vọng",
+    "Son khô môi, màu không giống hình",
+    "Rất tệ, chai bị rò rỉ hết một nửa",
+    "Mùi hắc quá, dùng không nổi",
+    "Shop trả lời tin nhắn chậm, giao sai sản phẩm",
+    "Kem bị vón cục, nghi hàng không chính hãng",
+    "Không có tác dụng gì sau một tháng sử dụng",
+    "Đóng gói cẩu thả, sản phẩm bị vỡ",
+    "Giá cao mà chất lượng bình thường, không đáng",
+    "Lần đầu mua đã gặp hàng cận date, chán",
+    # Trung tính / lẫn lộn
+    "Bình thường, không có gì đặc biệt",
+    "Chưa dùng nên chưa biết thế nào",
+    "Hàng đúng mô tả, chất lượng tạm được",
+    "Giao hàng ổn, sản phẩm dùng thử xem sao",
+    "Màu hơi khác ảnh một chút nhưng vẫn dùng được",
+    "Đã nhận hàng",
+    "Mùi thơm nhưng hơi nhanh bay",
+    "Kem dưỡng ổn, nhưng hơi đắt so với dung tích",
+    "Shop giao nhanh, còn chất lượng thì phải dùng lâu mới biết",
+    "Sản phẩm tạm ổn, bao bì đẹp",
+    # Dài, nhiều câu
+    "Mình có làn da hỗn hợp thiên dầu, vùng chữ T hay đổ dầu vào buổi trưa. "
+    "Sau khi dùng serum này khoảng ba tuần thì lỗ chân lông nhìn se khít hơn, "
+    "da ít dầu hơn hẳn, lớp nền buổi sáng cũng bám tốt hơn. Điểm trừ duy nhất "
+    "là vòi bơm hơi khó dùng và giá hơi cao, nhưng nhìn chung vẫn rất đáng mua.",
+    "Đặt hàng từ thứ hai mà tới chủ nhật mới nhận được, nhắn tin hỏi shop thì "
+    "không ai trả lời. Khi mở hộp thì thấy nắp bị nứt, kem bị chảy ra ngoài, "
+    "mùi cũng khác so với lần mua trước ở cửa hàng. Mình rất thất vọng và sẽ "
+    "không quay lại mua nữa.",
+]
+
+
+def mixed_length_corpus(size=200, seed=42, max_sentences=40):
+    """
+    Bộ review độ dài hỗn hợp (từ vài từ tới vài nghìn ký tự) để benchmark
+    Ghép ngẫu nhiên (có seed) các câu trong SAMPLE_REVIEWS
+    """
+    import random
+
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        # Phần lớn review ngắn, một số ít rất dài (giống dữ liệu thật)
+        n = 1 if rng.random() < 0.6 else rng.randint(2, max_sentences)
+        corpus.append(' '.join(rng.choice(SAMPLE_REVIEWS) for _ in range(n)))
+    return corpus
@@ -0,0 +1,189 @@
+"""
+Phân loại cảm xúc nhanh bằng từ điển (chạy trước model transformer)
+- Từ điển cụm từ tiếng Việt (có trọng số) + emoji + phủ định / từ nhấn mạnh
+- Số sao của review làm tăng / giảm độ tin cậy
+- Chỉ dành cho review ngắn, rõ ràng ("tuyệt vời", "rất tệ", "👍👍"); review dài / lẫn lộn trả về
+  độ tin cậy thấp -> ai_utils chuyển sang model (xem SENTIMENT_FAST_PATH_THRESHOLD)
+"""
+import re
+import unicodedata
+
+# Cụm từ -> trọng số (cụm dài được ưu tiên khớp trước)
+POSITIVE = {
+    'tuyệt vời': 2.0, 'tuyệt': 1.5, 'xuất sắc': 2.0, 'hoàn hảo': 2.0, 'đỉnh': 1.5, 'đỉnh cao': 2.0,
+    'yêu thích': 1.5, 'thích': 1.5, 'mê': 1.2, 'ưng': 1.2, 'ưng ý': 1.5, 'hài lòng': 1.5,
+    'tốt': 1.0, 'đẹp': 1.0, 'xịn': 1.2, 'chuẩn': 0.8, 'thơm': 0.8, 'mịn': 0.8, 'ổn': 0.7,
+    'ok': 0.8, 'oke': 0.8, 'okela': 1.0, 'đáng tiền': 1.5, 'đáng mua': 1.5, 'chính hãng': 0.8,
+    'ủng hộ': 1.0, 'sẽ mua lại': 1.5, 'mua lại': 1.0, 'nhiệt tình': 1.0, 'cẩn thận': 0.8,
+    'nhanh': 0.5, 'đúng mô tả': 0.8, 'giống mô tả': 0.8, 'đúng hình': 0.8, 'recommend': 1.5,
+    'good': 1.0, 'great': 1.5, 'perfect': 2.0, 'love': 1.5, 'best': 1.5, 'nice': 1.0,
+}
+
+NEGATIVE = {
+    'tệ': 2.0, 'tồi': 1.5, 'tồi tệ': 2.0, 'kém': 1.5, 'dở': 1.5, 'chán': 1.5, 'thất vọng': 2.0,
+    'lừa đảo': 2.0, 'hàng giả': 2.0, 'hàng nhái': 2.0, 'fake': 1.5, 'phí tiền': 2.0, 'rác': 1.5,
+    'xấu': 1.2, 'kích ứng': 1.5, 'nổi mẩn': 1.5, 'dị ứng': 1.5, 'nổi mụn': 1.2, 'hỏng': 1.5,
+    'vỡ': 1.2, 'móp': 1.0, 'rò rỉ': 1.2, 'cận date': 1.2, 'hết hạn': 1.5, 'hắc': 1.0,
+    'chậm': 0.8, 'đắt': 0.7, 'bực': 1.2, 'không giống mô tả': 1.5, 'không giống hình': 1.5,
+    'không như hình': 1.5, 'không nên mua': 2.0, 'giao sai': 1.5, 'bad': 1.2, 'terrible': 2.0,
+}
+
+NEUTRAL = {
+    'bình thường': 1.0, 'tạm được': 1.0, 'tạm ổn': 1.0, 'tạm': 0.7, 'không có gì đặc biệt': 1.5,
+    'chưa dùng': 1.0, 'chưa biết': 1.0, 'đã nhận': 1.0, 'đã nhận hàng': 1.0, 'dùng thử': 0.7,
+}
+
+NEGATORS = {'không', 'chẳng', 'chả', 'chưa', 'đừng', 'ko', 'k', 'hông', 'hok', 'not'}
+
+# Từ nhấn mạnh đứng trước ("rất tốt") hoặc sau ("tốt lắm", "tốt quá")
+INTENSIFIERS = {'rất', 'quá', 'cực', 'siêu', 'lắm', 'cực kỳ', 'vô cùng', 'thật sự', 'very', 'so'}
+INTENSITY = 1.5
+
+# Từ chuyển ý -> review lẫn lộn khen / chê
+CONTRASTS = {'nhưng', 'mà', 'tuy nhiên', 'tuy', 'song', 'but'}
+
+POSITIVE_EMOJI = {
+    '😍', '🥰', '😊', '😁', '😄', '😃', '🙂', '👍', '❤', '💯', '🔥', '✨', '👌', '🤩', '😘',
+    '💕', '💖', '💗', '😻', '🥳', '👏', ':)', ':d', '<3', '=)',
+}
+NEGATIVE_EMOJI = {
+    '😡', '😠', '🤬', '😞', '😢', '😭', '👎', '💔', '😤', '🙁', '☹', '😒', '🤮', '😔', '😩',
+    '😫', ':(', ":'(", '=(',
+}
+EMOJI_WEIGHT = 1.5
+
+# Cụm dài nhất trong từ điển (số từ)
+_MAX_PHRASE = max(len(p.split()) for p in list(POSITIVE) + list(NEGATIVE) + list(NEUTRAL)
+                  + list(INTENSIFIERS) + list(CONTRASTS))
+
+_EMOTICON_RE = '|'.join(re.escape(e) for e in sorted(
+    (e for e in POSITIVE_EMOJI | NEGATIVE_EMOJI if e.isascii()), key=len, reverse=True,
+))
+_TOKEN_RE = re.compile(rf"{_EMOTICON_RE}|\w+|[^\w\s]", re.UNICODE)
+
+
+def tokenize(text):
+    """Chuẩn hoá (NFC, chữ thường, bỏ biến thể emoji) -> list từ / emoji"""
+    text = unicodedata.normalize('NFC', text).lower().replace('️', '')
+    return [t for t in _TOKEN_RE.findall(text) if t.strip() and (t[0].isalnum() or _is_emoji(t))]
+
+
+def _is_emoji(token):
+    return token in POSITIVE_EMOJI or token in NEGATIVE_EMOJI or unicodedata.category(token[0]) == 'So'
+
+
+def _match_phrase(tokens, i):
+    """Cụm dài nhất bắt đầu tại vị trí i -> (cụm, số từ) hoặc (None, 0)"""
+    for n in range(min(_MAX_PHRASE, len(tokens) - i), 0, -1):
+        phrase = ' '.join(tokens[i:i + n])
+        if (phrase in POSITIVE or phrase in NEGATIVE or phrase in NEUTRAL
+                or phrase in INTENSIFIERS or phrase in CONTRASTS):
+            return phrase, n
+    return None, 0
+
+
+def classify(text, rating=None, max_words=20):
+    """
+    Phân loại nhanh bằng từ điển
+    Return: (Label, độ tin cậy 0-100) hoặc None nếu không có tín hiệu / review quá dài
+    """
+    if not text or not isinstance(text, str):
+        return None
+    tokens = tokenize(text)
+    if not tokens or len(tokens) > max_words:
+        return None
+
+    pos = neg = neu = 0.0
+    matched = 0
+    mixed = False
+    negate = 0         # Số từ tiếp theo còn bị phủ định
+    boost = 1.0        # Từ nhấn mạnh đứng trước
+    last = None        # (dấu, trọng số) của cụm cảm xúc gần nhất, cho nhấn mạnh đứng sau
+
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+
+        if token in POSITIVE_EMOJI or token in NEGATIVE_EMOJI:
+            if token in POSITIVE_EMOJI:
+                pos += EMOJI_WEIGHT
+            else:
+                neg += EMOJI_WEIGHT
+            matched += 1
+            i += 1
+            continue
+
+        phrase, n = _match_phrase(tokens, i)
+        if phrase is None:
+            if token in NEGATORS:
+                negate = 3
+                matched += 1
+            elif negate:
+                negate -= 1
+            i += 1
+            continue
+
+        matched += n
+        i += n
+        if phrase in CONTRASTS:
+            mixed = True
+            negate, boost, last = 0, 1.0, None
+        elif phrase in INTENSIFIERS:
+            if last is not None and boost == 1.0:
+                # "tốt lắm", "tệ quá": nhấn mạnh cụm vừa gặp
+                sign, weight = last
+                if sign > 0:
+                    pos += weight * (INTENSITY - 1)
+                else:
+                    neg += weight * (INTENSITY - 1)
+                last = None
+            else:
+                boost = INTENSITY
+        elif phrase in NEUTRAL:
+            neu += NEUTRAL[phrase]
+            negate, boost, last = 0, 1.0, None
+        else:
+            sign = 1 if phrase in POSITIVE else -1
+            weight = (POSITIVE.get(phrase) or NEGATIVE.get(phrase)) * boost
+            if negate:
+                # "không tốt" -> chê; "không tệ" -> khen nhẹ
+                weight = weight if sign > 0 else weight * 0.5
+                sign = -sign
+            if sign > 0:
+                pos += weight
+            else:
+                neg += weight
+            negate, boost, last = 0, 1.0, (sign, weight)
+
+    if pos == neg == neu == 0:
+        return None
+
+    net = pos - neg
+    if net > 0:
+        label = 'POS'
+    elif net < 0:
+        label = 'NEG'
+    elif neu > 0:
+        label, net = 'NEU', neu
+    else:
+        return None
+
+    strength = min(1.0, abs(net) / 2.0)
+    coverage = matched / len(tokens)
+    confidence = 100 * (0.5 + 0.5 * strength) * (0.5 + 0.5 * coverage)
+
+    # Vừa khen vừa chê -> để model quyết định
+    if mixed or (pos > 0 and neg > 0):
+        confidence *= 0.6
+    if label == 'NEU' and (pos > 0 or neg > 0):
+        confidence *= 0.6
+
+    if rating is not None:
+        rating_label = 'POS' if rating >= 4 else 'NEG' if rating <= 2 else 'NEU'
+        if rating_label == label:
+            confidence += 10
+        else:
+            # 5 sao mà chê (hoặc 1 sao mà khen) -> có thể là mỉa mai
+            confidence *= 0.5
+
+    return label, round(min(confidence, 99.0), 2)
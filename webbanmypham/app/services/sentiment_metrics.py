@@ -0,0 +1,110 @@
+"""
+Số liệu vận hành của model cảm xúc (thời gian tải model, độ trễ, kích thước batch,
+độ dài token, lỗi / số lần trả 'NEU', 50.0 mặc định)
+- Ghi vào bộ đếm trong process, định kỳ đẩy lên Django cache (app/services/metrics.py) -> trang admin gộp được
+  số liệu của mọi worker (web, process_review_queue, sentiment_server) nếu dùng Redis/Memcached
+- Số liệu của web bán hàng (rate limit, cache trang sản phẩm) ở site_metrics
+"""
+from .metrics import MetricsRegistry, ratio
+
+# Histogram: (tên, mô tả, các mốc bucket)
+HISTOGRAMS = {
+    'sentiment_call_seconds': (
+        'Thời gian 1 lần gọi analyze_sentiment (giây)',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    ),
+    'sentiment_batch_call_seconds': (
+        'Thời gian 1 lần gọi analyze_sentiment_batch (giây)',
+        (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+    ),
+    'sentiment_inference_seconds': (
+        'Thời gian 1 lần chạy model cho cả batch (giây)',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+    ),
+    'sentiment_batch_size': (
+        'Số đoạn text trong 1 lần chạy model',
+        (1, 2, 4, 8, 16, 32, 64, 128, 256),
+    ),
+    'sentiment_input_tokens': (
+        'Số token của mỗi đoạn text đưa vào model',
+        (8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096),
+    ),
+}
+
+# Counter có 1 nhãn: (mô tả, tên nhãn)
+COUNTERS = {
+    'sentiment_errors_total': ('Số lỗi khi tải / chạy model hoặc gọi sentiment server', 'reason'),
+    'sentiment_fallbacks_total': ("Số lần trả về kết quả mặc định ('NEU', 50.0)", 'reason'),
+    'sentiment_model_loads_total': ('Số lần tải model', 'backend'),
+    'sentiment_path_total': ('Số review theo cách phân loại (fast = từ điển, cache, model)', 'path'),
+}
+
+# Gauge: (tên, mô tả)
+GAUGES = {
+    'sentiment_model_load_seconds': 'Thời gian tải model lần gần nhất (giây)',
+}
+
+CACHE_LOOKUPS = {
+    'sentiment_cache_lookups_total': ('Số lần tra cache kết quả cảm xúc', 'result'),
+}
+
+
+def _cache_lookups(data):
+    """Bộ đếm của sentiment_cache -> counter sentiment_cache_lookups_total"""
+    from . import sentiment_cache
+
+    stats = sentiment_cache.cache_stats()
+    data['counters']['sentiment_cache_lookups_total'] = {
+        name: stats[name] for name in ('local_hits', 'shared_hits', 'misses')
+    }
+
+
+registry = MetricsRegistry(
+    'sentiment_metrics', 'SENTIMENT_METRICS',
+    histograms=HISTOGRAMS, counters=COUNTERS, gauges=GAUGES, extra_snapshot=_cache_lookups,
+)
+
+observe = registry.observe
+observe_many = registry.observe_many
+inc = registry.inc
+set_gauge = registry.set_gauge
+snapshot = registry.snapshot
+publish = registry.publish
+collect = registry.collect
+quantile = registry.quantile
+
+
+def summary():
+    """Số liệu tóm tắt cho dashboard admin"""
+    data, processes = collect()
+    hists = data['histograms']
+    counters = data['counters']
+    lookups = counters.get('sentiment_cache_lookups_total', {})
+    call = hists['sentiment_call_seconds']
+    paths = counters.get('sentiment_path_total', {})
+    batch = hists['sentiment_batch_size']
+    inference = hists['sentiment_inference_seconds']
+    return {
+        'processes': processes,
+        'model_load_seconds': data['gauges'].get('sentiment_model_load_seconds'),
+        'calls': call['count'],
+        'call_p50_ms': _ms(quantile(call, 'sentiment_call_seconds', 0.5)),
+        'call_p99_ms': _ms(quantile(call, 'sentiment_call_seconds', 0.99)),
+        'inference_runs': inference['count'],
+        'inference_p50_ms': _ms(quantile(inference, 'sentiment_inference_seconds', 0.5)),
+        'inference_p99_ms': _ms(quantile(inference, 'sentiment_inference_seconds', 0.99)),
+        'avg_batch_size': round(batch['sum'] / batch['count'], 1) if batch['count'] else None,
+        'errors': sum(counters['sentiment_errors_total'].values()),
+        'fallbacks': sum(counters['sentiment_fallbacks_total'].values()),
+        'fast_path_rate': ratio(paths.get('fast', 0), sum(paths.values())),
+        'cache_hit_rate': ratio(lookups.get('local_hits', 0) + lookups.get('shared_hits', 0), sum(lookups.values())),
+    }
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+def render_prometheus():
+    """Số liệu đã gộp theo định dạng text của Prometheus (text/plain; version=0.0.4)"""
+    return registry.render_prometheus(extra_counters=CACHE_LOOKUPS)
@@ -0,0 +1,133 @@
+"""
+Sentiment server dùng chung qua Unix domain socket
+- 1 process (python manage.py sentiment_server) giữ duy nhất 1 bản model,
+  gom request của mọi web worker vào micro-batch
+- Web worker chỉ là client mỏng (không import torch) -> RAM mỗi worker gần như Django thuần
+Giao thức: mỗi dòng 1 JSON
+    request : {"texts": ["...", ...]}
+    response: {"results": [["POS", 98.5], ...]}  hoặc  {"error": "..."}
+    request : {"embed": ["...", ...]}            (vector cho tìm kiếm ngữ nghĩa)
+    response: {"vectors": [[0.01, ...], ...]}
+"""
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Giới hạn 1 request (tránh client gửi dữ liệu quá lớn)
+MAX_REQUEST_BYTES = 4 * 1024 * 1024
+
+
+class SentimentClient:
+    """Client giữ 1 kết nối cho mỗi thread, tự kết nối lại khi lỗi"""
+
+    def __init__(self, socket_path, timeout=5):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        # Kết nối tạo trước khi fork không dùng chung được giữa các process
+        if conn is not None and conn[0] == os.getpid():
+            return conn[1], conn[2]
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        reader = sock.makefile('rb')
+        self._local.conn = (os.getpid(), sock, reader)
+        return sock, reader
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            conn[2].close()
+            conn[1].close()
+
+    def analyze(self, texts):
+        """Gửi list text -> list (Label, Score); lỗi kết nối / timeout -> exception"""
+        response = self._request({'texts': list(texts)})
+        return [tuple(item) for item in response['results']]
+
+    def embed(self, texts):
+        """Gửi list text -> list vector (list float)"""
+        return self._request({'embed': list(texts)})['vectors']
+
+    def _request(self, payload):
+        sock, reader = self._connection()
+        try:
+            sock.sendall(json.dumps(payload, ensure_ascii=False).encode('utf-8') + b'\n')
+            line = reader.readline()
+            if not line:
+                raise ConnectionError("Sentiment server closed the connection")
+        except OSError:
+            # Sau timeout, response cũ có thể tới muộn -> bỏ kết nối này
+            self.close()
+            raise
+
+        response = json.loads(line)
+        if 'error' in response:
+            raise RuntimeError(f"Sentiment server error: {response['error']}")
+        return response
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        from app import ai_utils
+
+        while True:
+            line = self.rfile.readline(MAX_REQUEST_BYTES)
+            if not line:
+                return
+            if not line.endswith(b'\n'):
+                # Dòng dài quá MAX_REQUEST_BYTES (hoặc bị cắt) -> phần còn lại không phải request mới: báo lỗi và đóng kết nối
+                logger.error(f"Sentiment server request larger than {MAX_REQUEST_BYTES} bytes, closing connection")
+                self._reply({'error': f"Request larger than {MAX_REQUEST_BYTES} bytes"})
+                return
+            try:
+                request = json.loads(line)
+                if 'embed' in request:
+                    response = {'vectors': ai_utils.embed_texts(request['embed']).tolist()}
+                else:
+                    # Chỉ chạy model: client đã phân loại nhanh bằng từ điển (có số sao) trước khi gửi
+                    # 1 text: đi qua micro-batcher -> gom chung với request của worker khác
+                    results = ai_utils.analyze_sentiment_batch(request['texts'], raise_errors=True, fast_path=False)
+                    response = {'results': results}
+            except Exception as e:
+                logger.error(f"Sentiment server request failed: {e}")
+                response = {'error': str(e)}
+            self._reply(response)
+
+    def _reply(self, response):
+        self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+        self.wfile.flush()
+
+
+class SentimentServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    # Nhiều worker kết nối cùng lúc khi khởi động (mặc định 5 -> EAGAIN)
+    request_queue_size = 128
+
+    def __init__(self, socket_path):
+        # Xoá socket cũ còn sót lại từ lần chạy trước
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _RequestHandler)
+        os.chmod(socket_path, 0o660)
+        self.socket_path = socket_path
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
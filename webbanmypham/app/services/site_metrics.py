@@ -0,0 +1,31 @@
+"""
+Số liệu vận hành của web bán hàng (rate limit gửi đánh giá, cache HTML trang chi tiết sản phẩm)
+- Cùng cơ chế với sentiment_metrics (app/services/metrics.py), registry và key cache riêng
+"""
+from .metrics import MetricsRegistry, ratio
+
+# Counter có 1 nhãn: (mô tả, tên nhãn)
+COUNTERS = {
+    'review_rate_limited_total': ('Số lần gửi đánh giá bị từ chối do vượt giới hạn tần suất', 'scope'),
+    'product_fragment_cache_total': ('Số lần tra cache HTML trang chi tiết sản phẩm (theo fragment)', 'result'),
+}
+
+registry = MetricsRegistry('site_metrics', 'SITE_METRICS', counters=COUNTERS)
+
+inc = registry.inc
+snapshot = registry.snapshot
+publish = registry.publish
+collect = registry.collect
+render_prometheus = registry.render_prometheus
+
+
+def summary():
+    """Số liệu tóm tắt cho dashboard admin"""
+    data, processes = collect()
+    counters = data['counters']
+    fragments = counters['product_fragment_cache_total']
+    return {
+        'processes': processes,
+        'rate_limited': sum(counters['review_rate_limited_total'].values()),
+        'fragment_hit_rate': ratio(fragments.get('hit', 0), sum(fragments.values())),
+    }
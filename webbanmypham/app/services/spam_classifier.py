@@ -0,0 +1,219 @@
+"""
+Bộ phân loại spam tuyến tính nhỏ (logistic regression trên n-gram băm, thuần NumPy)
+- Học từ dữ liệu đã gán nhãn: Review.is_spam + review bị ẩn (is_approved=False),
+  trừ review chỉ do chính bộ phân loại đánh dấu
+  -> manage.py train_spam_classifier, lưu 1 file .npz (SPAM_CLASSIFIER_PATH)
+- review_service dùng xác suất spam làm tín hiệu cùng severity keyword -> bắt được spam không chứa keyword nào
+- Chấm 1 bình luận: băm n-gram + cộng vài trăm trọng số, không gọi model AI
+"""
+import json
+import logging
+import os
+import threading
+import unicodedata
+import zlib
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+N_FEATURES = 2 ** 18
+MAX_CHARS = 2000     # Chỉ lấy phần đầu bình luận rất dài
+CHAR_GRAM = 4
+
+_model = None        # (path, mtime, SpamClassifier)
+_model_lock = threading.Lock()
+
+
+# FNV-1a 64 bit trên mã Unicode, tính cho mọi n-gram ký tự cùng lúc bằng NumPy
+_FNV_OFFSET = np.uint64(14695981039346656037)
+_FNV_PRIME = np.uint64(1099511628211)
+
+
+def _word_grams(words):
+    grams = ['w:' + w for w in words]
+    grams += ['b:' + a + ' ' + b for a, b in zip(words, words[1:])]
+    # Luôn có ít nhất 1 feature (độ dài) -> mọi bình luận đều có hàng trong ma trận
+    grams.append(f'len:{min(len(words) // 5, 10)}')
+    return grams
+
+
+def _normalize(text):
+    return unicodedata.normalize('NFC', text or '')[:MAX_CHARS].lower().split()
+
+
+def feature_matrix(texts, n_features=N_FEATURES):
+    """
+    Ma trận thưa dạng CSR (indptr, indices) cho list bình luận, mỗi hàng: chỉ số feature không trùng, tăng dần
+    - Từ đơn + cặp từ: crc32
+    - N-gram 4 ký tự (bắt cả spam viết tách "z a l o", "z.a.l.o"): FNV-1a trên mã Unicode,
+      tính cho cả batch cùng lúc bằng NumPy (nối các bình luận, bỏ n-gram vắt qua 2 bình luận)
+    Kết quả mỗi hàng không phụ thuộc các bình luận khác trong batch
+    """
+    mask = np.uint64(n_features - 1)
+    word_ids, word_rows, padded = [], [], []
+    for row, text in enumerate(texts):
+        words = _normalize(text)
+        grams = _word_grams(words)
+        word_ids.extend(zlib.crc32(g.encode('utf-8')) for g in grams)
+        word_rows.extend([row] * len(grams))
+        padded.append(' ' + ' '.join(words) + ' ')
+
+    lengths = np.array([len(p) for p in padded], dtype=np.int64)
+    starts = np.zeros(len(padded), dtype=np.int64)
+    starts[1:] = np.cumsum(lengths[:-1])
+    codes = np.frombuffer(''.join(padded).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    n = len(codes) - CHAR_GRAM + 1
+    char_ids = char_rows = np.zeros(0, dtype=np.int64)
+    if n > 0:
+        h = np.full(n, _FNV_OFFSET, dtype=np.uint64)
+        for k in range(CHAR_GRAM):
+            h = (h ^ codes[k:k + n]) * _FNV_PRIME      # Tràn uint64 = mod 2^64 như FNV gốc
+        rows = np.repeat(np.arange(len(padded)), lengths)[:n]
+        valid = np.arange(n) <= (starts + lengths - CHAR_GRAM)[rows]
+        char_ids = ((h >> np.uint64(32)) & mask)[valid].astype(np.int64)
+        char_rows = rows[valid]
+
+    ids = np.concatenate([(np.array(word_ids, dtype=np.uint64) & mask).astype(np.int64), char_ids])
+    rows = np.concatenate([np.array(word_rows, dtype=np.int64), char_rows])
+    keys = np.sort(rows * n_features + ids)
+    if len(keys):
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+    indptr = np.zeros(len(padded) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(np.bincount(keys // n_features, minlength=len(padded)))
+    return indptr, keys % n_features
+
+
+def features(text, n_features=N_FEATURES):
+    """Chỉ số feature (đã băm, không trùng, tăng dần) của 1 bình luận"""
+    return feature_matrix([text], n_features)[1]
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+class SpamClassifier:
+    """Trọng số + bias + ngưỡng; predict_proba trả xác suất spam 0-1"""
+
+    def __init__(self, weights, bias, threshold=0.5, meta=None):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+        self.threshold = float(threshold)
+        self.meta = meta or {}
+
+    @property
+    def n_features(self):
+        return len(self.weights)
+
+    def decision(self, indptr, indices):
+        # Mọi hàng có >= 1 feature nên reduceat không gặp đoạn rỗng
+        if len(indptr) < 2:
+            return np.zeros(0)
+        return np.add.reduceat(self.weights[indices], indptr[:-1]).astype(np.float64) + self.bias
+
+    def predict_proba(self, texts):
+        return _sigmoid(self.decision(*feature_matrix(texts, self.n_features)))
+
+    def score(self, text):
+        return float(self.predict_proba([text])[0])
+
+    @classmethod
+    def train(cls, texts, labels, epochs=200, learning_rate=0.5, l2=1e-5, n_features=N_FEATURES):
+        """
+        Logistic regression, gradient descent toàn batch (Adam), cân bằng 2 lớp bằng trọng số mẫu
+        labels: 1 = spam, 0 = bình thường
+        """
+        y = np.asarray(labels, dtype=np.float64)
+        indptr, indices = feature_matrix(texts, n_features)
+        counts = np.diff(indptr)
+        positives = max(1.0, y.sum())
+        negatives = max(1.0, len(y) - y.sum())
+        sample_weight = np.where(y == 1, len(y) / (2 * positives), len(y) / (2 * negatives))
+
+        w = np.zeros(n_features, dtype=np.float64)
+        b = 0.0
+        m, v = np.zeros_like(w), np.zeros_like(w)
+        mb = vb = 0.0
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        for step in range(1, epochs + 1):
+            z = np.add.reduceat(w[indices], indptr[:-1]) + b
+            g = (_sigmoid(z) - y) * sample_weight / len(y)
+            grad_w = np.bincount(indices, weights=np.repeat(g, counts), minlength=n_features) + l2 * w
+            grad_b = g.sum()
+
+            m = beta1 * m + (1 - beta1) * grad_w
+            v = beta2 * v + (1 - beta2) * grad_w * grad_w
+            w -= learning_rate * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + eps)
+            mb = beta1 * mb + (1 - beta1) * grad_b
+            vb = beta2 * vb + (1 - beta2) * grad_b * grad_b
+            b -= learning_rate * (mb / (1 - beta1 ** step)) / (np.sqrt(vb / (1 - beta2 ** step)) + eps)
+        return cls(w, b)
+
+    def save(self, path):
+        """Lưu .npz nén (trọng số float16, feature chưa gặp = 0 -> nén rất nhỏ), ghi file tạm rồi đổi tên"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        meta = dict(self.meta, threshold=self.threshold)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            weights=self.weights.astype(np.float16),
+            bias=np.array([self.bias]),
+            meta=np.array(json.dumps(meta, ensure_ascii=False)),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            return cls(data['weights'].astype(np.float32), float(data['bias'][0]), meta.get('threshold', 0.5), meta)
+
+
+def model_path():
+    return str(getattr(settings, 'SPAM_CLASSIFIER_PATH', settings.BASE_DIR / 'ai_models' / 'spam_classifier.npz'))
+
+
+def get_model():
+    """
+    Model đã train của process (None nếu tắt / chưa train)
+    Tự tải lại khi file đổi (train lại không cần restart worker)
+    """
+    global _model
+    if not getattr(settings, 'SPAM_CLASSIFIER_ENABLED', True):
+        return None
+    path = model_path()
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+
+    current = _model
+    if current is not None and current[0] == path and current[1] == mtime:
+        return current[2]
+    with _model_lock:
+        if _model is None or _model[0] != path or _model[1] != mtime:
+            try:
+                _model = (path, mtime, SpamClassifier.load(path))
+                logger.info(f"Loaded spam classifier {path} (threshold {_model[2].threshold:.2f})")
+            except Exception as e:
+                logger.warning(f"Could not load spam classifier {path}: {e}")
+                _model = (path, mtime, None)
+        return _model[2]
+
+
+def model_version():
+    """Thời điểm train của model đang dùng (None nếu tắt / chưa train) -> đổi khi train lại"""
+    model = get_model()
+    if model is None:
+        return None
+    return model.meta.get('trained_at') or f"{model.threshold}:{float(model.bias)}"
+
+
+def spam_probabilities(comments):
+    """Xác suất spam của từng comment, hoặc None nếu chưa có model"""
+    model = get_model()
+    if model is None:
+        return None
+    return [float(p) for p in model.predict_proba(comments)]
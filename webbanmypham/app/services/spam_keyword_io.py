@@ -0,0 +1,159 @@
+"""
+Import / export danh sách spam keyword (CSV, JSON)
+Ghi bằng bulk_create(update_conflicts=True) theo từng chunk trong 1 transaction,
+tăng version bộ keyword 1 lần ở cuối (không gửi signal cho từng keyword)
+"""
+import csv
+import json
+
+from django.db import connection, transaction
+
+FIELDS = ['keyword', 'category', 'severity', 'is_active', 'description']
+UPDATE_FIELDS = ['category', 'severity', 'is_active', 'description']
+
+_TRUE = {'1', 'true', 'yes', 'y', 'on', 'x'}
+_FALSE = {'0', 'false', 'no', 'n', 'off'}
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return 'json' if str(path).lower().endswith('.json') else 'csv'
+
+
+def parse(stream, fmt):
+    """Đọc file CSV (có dòng tiêu đề) hoặc JSON (list object) -> list dict thô"""
+    if fmt == 'json':
+        data = json.load(stream)
+        if isinstance(data, dict):
+            data = data.get('keywords', [])
+        if not isinstance(data, list):
+            raise ValueError('JSON phải là list keyword hoặc {"keywords": [...]}')
+        return [item if isinstance(item, dict) else {'keyword': item} for item in data]
+    return list(csv.DictReader(stream))
+
+
+def _as_bool(value):
+    if isinstance(value, bool) or value is None:
+        return value
+    if value == '':
+        return None
+    text = str(value).strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise ValueError(f"is_active không hợp lệ: {value!r}")
+
+
+def clean_rows(rows):
+    """
+    Chuẩn hoá + kiểm tra từng dòng (không có is_active -> None: keyword mới bật, keyword cũ giữ nguyên)
+    Return: (dict keyword -> dữ liệu (dòng sau ghi đè dòng trước), list lỗi "dòng N: ...")
+    """
+    from app.models import SpamKeyword
+
+    categories = {value for value, _ in SpamKeyword.CATEGORY_CHOICES}
+    max_length = SpamKeyword._meta.get_field('keyword').max_length
+    cleaned, errors = {}, []
+    for line, row in enumerate(rows, start=1):
+        try:
+            keyword = str(row.get('keyword') or '').strip()
+            if not keyword:
+                raise ValueError('thiếu keyword')
+            if len(keyword) > max_length:
+                raise ValueError(f"keyword dài quá {max_length} ký tự")
+            category = str(row.get('category') or 'OTHER').strip().upper()
+            if category not in categories:
+                raise ValueError(f"category không hợp lệ: {category}")
+            severity = int(row.get('severity') if row.get('severity') not in (None, '') else 100)
+            if not 0 <= severity <= 100:
+                raise ValueError(f"severity phải trong 0-100: {severity}")
+            is_active = _as_bool(row.get('is_active'))
+            cleaned[keyword] = {
+                'keyword': keyword,
+                'category': category,
+                'severity': severity,
+                'is_active': is_active,
+                'description': str(row.get('description') or '').strip(),
+            }
+        except (TypeError, ValueError) as e:
+            errors.append(f"dòng {line}: {e}")
+    return cleaned, errors
+
+
+def upsert_keywords(rows, chunk_size=1000, dry_run=False):
+    """
+    Thêm / cập nhật keyword theo từng chunk trong 1 transaction
+    Keyword đã có và không đổi gì -> không ghi; dry_run -> chỉ đếm
+    Return: dict created / updated / unchanged
+    """
+    from app.models import SpamKeyword
+    from app.services.review_service import spam_keywords_changed
+
+    rows = list(rows.values()) if isinstance(rows, dict) else list(rows)
+    counts = {'created': 0, 'updated': 0, 'unchanged': 0}
+    # _base_manager: không tăng version sau mỗi chunk như SpamKeyword.objects
+    manager = SpamKeyword._base_manager
+    # MySQL không hỗ trợ ON CONFLICT(cột) -> để database tự dùng unique index của keyword
+    conflict_target = ['keyword'] if connection.features.supports_update_conflicts_with_target else None
+
+    with transaction.atomic():
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            existing = {
+                item['keyword']: item
+                for item in manager.filter(keyword__in=[r['keyword'] for r in chunk]).values(*FIELDS)
+            }
+            changed = []
+            for row in chunk:
+                current = existing.get(row['keyword'])
+                if row['is_active'] is None:
+                    row = dict(row, is_active=current['is_active'] if current else True)
+                if current is None:
+                    counts['created'] += 1
+                elif any(current[field] != row[field] for field in UPDATE_FIELDS):
+                    counts['updated'] += 1
+                else:
+                    counts['unchanged'] += 1
+                    continue
+                changed.append(SpamKeyword(**row))
+            if changed and not dry_run:
+                manager.bulk_create(
+                    changed, update_conflicts=True, unique_fields=conflict_target,
+                    update_fields=UPDATE_FIELDS + ['updated_at'],
+                )
+
+        if not dry_run and (counts['created'] or counts['updated']):
+            spam_keywords_changed()
+    return counts
+
+
+def export_rows(active_only=False):
+    from app.models import SpamKeyword
+
+    queryset = SpamKeyword.objects.order_by('-severity', 'keyword')
+    if active_only:
+        queryset = queryset.filter(is_active=True)
+    return queryset.values(*FIELDS).iterator(chunk_size=2000)
+
+
+def write(rows, stream, fmt):
+    """Ghi keyword ra CSV / JSON (cùng định dạng với import)"""
+    if fmt == 'json':
+        # Mỗi lần write là 1 dòng trọn vẹn (OutputWrapper của management command tự thêm xuống dòng)
+        stream.write('[\n')
+        previous = None
+        for row in rows:
+            if previous is not None:
+                stream.write('  ' + json.dumps(previous, ensure_ascii=False) + ',\n')
+            previous = row
+        if previous is not None:
+            stream.write('  ' + json.dumps(previous, ensure_ascii=False) + '\n')
+        stream.write(']\n')
+        return
+    writer = csv.DictWriter(stream, fieldnames=FIELDS, lineterminator='\n')
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(dict(row, is_active=int(row['is_active'])))
+
@@ -0,0 +1,121 @@
+"""
+Kiểm tra lại spam cho review cũ khi bộ keyword thay đổi hoặc bộ phân loại được train lại
+Mỗi review lưu version bộ luật đã dùng để kiểm tra (Review.spam_checked_version);
+chỉ review có version cũ được chấm lại, theo từng batch giới hạn (manage.py recheck_spam
+hoặc worker process_review_queue lúc rảnh) -> trang admin không phải chấm gì
+- Mỗi batch đọc tiếp từ id cuối của batch trước (lưu trong tiến độ) -> không quét lại review đã kiểm tra
+- Tiến độ lưu trong database (SpamRecheckProgress): process chạy batch và trang admin là các process khác nhau
+"""
+import logging
+
+from django.conf import settings
+
+from .review_service import is_review_spam_batch, spam_check_version
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_FIELDS = ('version', 'total', 'remaining', 'flagged', 'last_id')
+
+RECHECK_FIELDS = ['is_spam', 'spam_reason', 'sentiment', 'spam_checked_version']
+
+
+def stale_reviews(version):
+    """
+    Review đã phân tích, chưa bị đánh dấu spam, kiểm tra theo bộ keyword khác version hiện tại
+    (review đang chờ phân tích: worker sẽ kiểm tra bằng bộ keyword mới)
+    """
+    from app.models import Review
+
+    return (
+        Review.objects.filter(is_spam=False, analysis_status=Review.ANALYSIS_DONE)
+        .exclude(spam_checked_version=version)
+    )
+
+
+def recheck_batch(limit=None):
+    """
+    Chấm lại tối đa `limit` review có version cũ (id tăng dần)
+    Chỉ đánh dấu thêm spam, không bỏ đánh dấu (review có thể bị admin / luật trùng lặp đánh dấu)
+    Return: (số review đã kiểm tra, số review mới bị đánh dấu spam)
+    """
+    from app.models import Review
+
+    if limit is None:
+        limit = getattr(settings, 'SPAM_RECHECK_BATCH_SIZE', 500)
+    version = spam_check_version()
+    progress = get_progress()
+    if progress is None or progress['version'] != version:
+        # Bộ keyword mới -> đếm lại 1 lần, sau đó chỉ trừ dần
+        remaining = stale_reviews(version).count()
+        progress = {'version': version, 'total': remaining, 'remaining': remaining, 'flagged': 0, 'last_id': 0}
+
+    # id > last_id: đọc theo khoảng khoá chính, không quét lại review đã kiểm tra (điều kiện != không dùng được index)
+    reviews = list(
+        stale_reviews(version).filter(id__gt=progress['last_id'])
+        .only('id', 'comment', 'rating').order_by('id')[:limit]
+    )
+    flagged = 0
+    if reviews:
+        results = is_review_spam_batch([r.comment for r in reviews], [r.rating for r in reviews])
+        for review, result in zip(reviews, results):
+            if result['is_spam']:
+                review.is_spam = True
+                review.spam_reason = result['reason']
+                review.sentiment = 'SPAM'
+                flagged += 1
+            review.spam_checked_version = version
+        spam = [r for r in reviews if r.is_spam]
+        clean = [r for r in reviews if not r.is_spam]
+        if spam:
+            Review.objects.bulk_update(spam, RECHECK_FIELDS)
+        if clean:
+            Review.objects.filter(id__in=[r.id for r in clean]).update(spam_checked_version=version)
+
+    progress['remaining'] = 0 if len(reviews) < limit else max(0, progress['remaining'] - len(reviews))
+    if reviews:
+        progress['last_id'] = reviews[-1].id
+    progress['flagged'] += flagged
+    _save_progress(progress)
+
+    if flagged:
+        logger.info(f"Spam recheck: {flagged}/{len(reviews)} review(s) newly flagged")
+    return len(reviews), flagged
+
+
+def get_progress():
+    """Tiến độ lần kiểm tra lại gần nhất (do recheck_batch ghi vào database) hoặc None"""
+    from app.models import SpamRecheckProgress
+
+    return (
+        SpamRecheckProgress.objects.filter(id=SpamRecheckProgress.SINGLETON_ID)
+        .values(*PROGRESS_FIELDS).first()
+    )
+
+
+def _save_progress(progress):
+    from app.models import SpamRecheckProgress
+
+    SpamRecheckProgress.objects.update_or_create(
+        id=SpamRecheckProgress.SINGLETON_ID, defaults={name: progress[name] for name in PROGRESS_FIELDS},
+    )
+
+
+def progress_summary():
+    """
+    Tiến độ cho trang admin (không query review, không chấm)
+    Return: dict version / total / remaining / percent / pending (bộ keyword đổi nhưng chưa chạy batch nào)
+    """
+    version = spam_check_version()
+    progress = get_progress()
+    if progress is None or progress['version'] != version:
+        return {'version': version, 'total': None, 'remaining': None, 'percent': 0, 'flagged': 0, 'pending': True}
+    total = progress['total']
+    done = total - progress['remaining']
+    return {
+        'version': version,
+        'total': total,
+        'remaining': progress['remaining'],
+        'percent': 100 * done // total if total else 100,
+        'flagged': progress['flagged'],
+        'pending': False,
+    }
@@ -0,0 +1,99 @@
+"""
+- Đồng bộ index tìm kiếm ngữ nghĩa khi sản phẩm được thêm / sửa / xoá
+  (chỉ embed lại đúng sản phẩm đó, sau khi transaction commit; không có sentiment server
+  -> đưa vào hàng đợi cho worker nền, không tải model trong request web)
+- Tăng version bộ spam keyword khi keyword được thêm / sửa / xoá
+- Tạo dòng thống kê đánh giá (toàn 0) cho sản phẩm mới; trừ thống kê khi review bị xoá
+  (thêm / sửa: Review.save, ReviewQuerySet)
+- Tăng version cache trang chi tiết khi sản phẩm / lô hàng thay đổi (review: qua review_stats)
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import ai_utils
+from .models import Product, ProductBatch, ProductReviewStats, Review, SpamKeyword
+from .services import product_fragments, product_search, review_stats
+from .services.review_service import spam_keywords_changed
+
+logger = logging.getLogger(__name__)
+
+# Chỉ các field này ảnh hưởng tới vector của sản phẩm
+SEARCH_FIELDS = {'name', 'description', 'main_ingredients'}
+
+
+def _auto_update():
+    # Chưa tạo index (manage.py update_search_index) -> không tải model chỉ vì lưu sản phẩm
+    return getattr(settings, 'SEARCH_INDEX_AUTO_UPDATE', True) and product_search.get_index().exists()
+
+
+def _reindex_product(product_id):
+    try:
+        if not ai_utils.uses_sentiment_server():
+            # Embed ngay sẽ tải torch + encoder trong worker web -> để process_review_queue / update_search_index làm
+            product_search.mark_dirty([product_id])
+            return
+        product = Product.objects.filter(id=product_id).first()
+        if product is not None:
+            product_search.index_products([product])
+    except Exception as e:
+        # Index lệch sẽ được sửa ở lần chạy update_search_index tiếp theo
+        logger.warning(f"Could not update search index for product {product_id}: {e}")
+
+
+@receiver(post_save, sender=Product)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCH_FIELDS.intersection(update_fields):
+        return
+    if _auto_update():
+        transaction.on_commit(lambda: _reindex_product(instance.id))
+
+
+def _remove_product(product_id):
+    try:
+        product_search.remove_products([product_id])
+    except Exception as e:
+        # Dòng còn sót trong index bị bỏ qua khi hiển thị (sản phẩm không còn), update_search_index dọn lại
+        logger.warning(f"Could not remove product {product_id} from search index: {e}")
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_search_index(sender, instance, **kwargs):
+    if _auto_update():
+        product_id = instance.id
+        transaction.on_commit(lambda: _remove_product(product_id))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def refresh_product_fragments(sender, instance, **kwargs):
+    # Sản phẩm liên quan của sản phẩm khác cũng có thể hiện sản phẩm này -> tăng cả version catalog
+    product_fragments.products_changed([instance.id], catalog=True)
+
+
+@receiver(post_save, sender=ProductBatch)
+@receiver(post_delete, sender=ProductBatch)
+def refresh_batch_product_fragments(sender, instance, **kwargs):
+    product_fragments.products_changed([instance.product_id])
+
+
+@receiver(post_save, sender=SpamKeyword)
+@receiver(post_delete, sender=SpamKeyword)
+def refresh_spam_keywords(sender, **kwargs):
+    spam_keywords_changed()
+
+
+@receiver(post_save, sender=Product)
+def create_review_stats(sender, instance, created, **kwargs):
+    # Trang sản phẩm đọc product.review_stats -> sản phẩm mới luôn có dòng thống kê (chưa có đánh giá)
+    if created:
+        ProductReviewStats.objects.get_or_create(product_id=instance.id)
+
+
+@receiver(post_delete, sender=Review)
+def subtract_review_stats(sender, instance, **kwargs):
+    # Xoá cả sản phẩm (cascade) -> không tạo lại dòng thống kê đang bị xoá cùng
+    review_stats.apply_changes([(review_stats.row_of(instance), None)], create_missing=False)
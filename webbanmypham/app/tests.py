@@ -1,3 +1,636 @@
-from django.test import TestCase
+import os
+import random
+import tempfile
+import threading
+import unittest
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from app import ai_utils, views
+from app.models import Category, Product, ProductReviewStats, Review, SpamKeyword
+from app.services import (
+    product_fragments, product_search, product_views, review_pages, review_service, review_stats, site_metrics,
+    spam_classifier, spam_recheck,
+)
+from app.services.keyword_matcher import SMALL_SET
+from app.services.rate_limit import TokenBucket
+from app.services.sentiment_server import SentimentClient, SentimentServer
+from app.services.sentiment_backends import build_pipeline, parity_report
+from app.services.sentiment_corpus import SAMPLE_REVIEWS
+
+
+class SentimentBackendParityTest(SimpleTestCase):
+    """So sánh backend int8 / ONNX với PyTorch fp32 trên bộ bình luận cố định"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        try:
+            cls.reference = build_pipeline('torch', ai_utils.MODEL_NAME)
+        except (ImportError, OSError) as e:
+            # Chưa cài torch hoặc model chưa có trong cache (chạy offline)
+            raise unittest.SkipTest(f"Reference model unavailable: {e}")
+
+    def _candidate(self, backend):
+        try:
+            return build_pipeline(backend, ai_utils.MODEL_NAME, onnx_dir=str(settings.SENTIMENT_ONNX_DIR))
+        except (ImportError, OSError) as e:
+            self.skipTest(f"Backend '{backend}' unavailable: {e}")
+
+    def test_torch_int8_matches_fp32(self):
+        report = parity_report(self.reference, self._candidate('torch_int8'), SAMPLE_REVIEWS)
+        self.assertGreaterEqual(report['label_agreement'], 0.9, report)
+        self.assertLessEqual(report['mean_score_drift'], 0.05, report)
+
+    def test_onnx_matches_fp32(self):
+        report = parity_report(self.reference, self._candidate('onnx'), SAMPLE_REVIEWS)
+        self.assertGreaterEqual(report['label_agreement'], 0.95, report)
+        self.assertLessEqual(report['mean_score_drift'], 0.02, report)
+
+
+@override_settings(SENTIMENT_CACHE_ENABLED=False)
+class SentimentServerModelOnlyTest(SimpleTestCase):
+    """Server chỉ chạy model: từ điển (cần số sao) đã chạy ở client, kết quả server được cache như kết quả model"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.server = SentimentServer(os.path.join(tmp.name, 'sentiment.sock'))
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.client = SentimentClient(self.server.socket_path)
+        self.addCleanup(self.client.close)
+
+    def test_server_skips_lexicon_fast_path(self):
+        texts = ['tuyệt vời', 'sản phẩm dùng ổn, giao hàng hơi chậm']
+        model = {text: ('NEG', 70.0) for text in texts}
+        with mock.patch.object(ai_utils, '_analyze_local', side_effect=lambda todo, raise_errors=False: {
+            text: model[text] for text in todo
+        }) as analyze_local:
+            self.assertEqual(self.client.analyze(texts[:1]), [('NEG', 70.0)])
+            self.assertEqual(self.client.analyze(texts), [('NEG', 70.0), ('NEG', 70.0)])
+        self.assertEqual(analyze_local.call_count, 2)
+
+
+class SpamBatchDifferentialTest(TestCase):
+    """is_review_spam_batch phải trả về đúng như gọi is_review_spam từng comment"""
+
+    KEYWORDS = [
+        ('vay tiền', 100, 'FINANCE'), ('vay', 60, 'FINANCE'), ('zalo', 90, 'CONTACT'),
+        ('zalo 09', 90, 'CONTACT'), ('inbox', 80, 'CONTACT'), ('http', 85, 'EXTERNAL'),
+        ('hàng fake', 95, 'FAKE'), ('rep 1:1', 75, 'FAKE'), ('sale sốc', 50, 'OTHER'),
+    ]
+    EXTRAS = [
+        'TUYỆT VỜI QUÁ SHOP ƠI', '!!!!!!!!', '$$$ ### @@@', 'tốt tốt tốt', 'ok ok ok ok',
+        'đẹp đẹp đẹp lắm', 'Mua Mua Mua', 'ABCDEF', 'abc', 'ǅǅǅǅǅǅ', 'ΣΣΣΣΣΣ!', '',
+        '   ', 'LH ZALO 0909', 'Inbox   nhé', 'vay\x00tiền', 'HTTP://x.y', 'İİİİİİ',
+    ]
+
+    def _corpus(self, keywords, size=600, seed=0):
+        rng = random.Random(seed)
+        comments = list(SAMPLE_REVIEWS) + self.EXTRAS
+        for _ in range(size):
+            text = rng.choice(SAMPLE_REVIEWS)
+            roll = rng.random()
+            if roll < 0.2:
+                text = f"{text} {rng.choice(keywords or self.KEYWORDS)[0]}"
+            elif roll < 0.3:
+                text = text.upper()
+            elif roll < 0.4:
+                text = text + ''.join(rng.choice('!@#$%^&*()[]{}?.,') for _ in range(rng.randint(1, 40)))
+            elif roll < 0.5:
+                word = rng.choice(text.split() or ['hay'])
+                text = ' '.join([text] + [word] * rng.randint(1, 3))
+            comments.append(text)
+        ratings = [rng.choice([None, 1, 2, 3, 4, 5]) for _ in comments]
+        return comments, ratings
+
+    def _assert_same(self, keywords, corpus_keywords=None):
+        SpamKeyword.objects.all().delete()
+        SpamKeyword.objects.bulk_create([
+            SpamKeyword(keyword=k, severity=severity, category=category) for k, severity, category in keywords
+        ])
+        review_service.invalidate_spam_keywords()
+
+        comments, ratings = self._corpus(corpus_keywords or keywords)
+        expected = [review_service.is_review_spam(c, r) for c, r in zip(comments, ratings)]
+        self.assertEqual(review_service.is_review_spam_batch(comments, ratings), expected)
+        self.assertEqual(
+            review_service.detect_spam_keywords_batch(comments),
+            [review_service.detect_spam_keywords(c) for c in comments],
+        )
+
+    def test_small_keyword_set(self):
+        self._assert_same(self.KEYWORDS)
+
+    def test_automaton_keyword_set(self):
+        rng = random.Random(1)
+        words = ['giá', 'rẻ', 'link', 'shop', 'mã', 'giảm', 'free', 'ship', 'order', 'sỉ']
+        keywords = list(self.KEYWORDS)
+        seen = {k for k, _, _ in keywords}
+        while len(keywords) <= SMALL_SET * 2:
+            keyword = ' '.join(rng.choice(words) for _ in range(rng.randint(1, 3)))
+            if keyword not in seen:
+                seen.add(keyword)
+                keywords.append((keyword, rng.randint(40, 100), 'OTHER'))
+        self._assert_same(keywords)
+
+    def test_no_keywords(self):
+        self._assert_same([])
+
+    def test_with_trained_classifier(self):
+        comments, _ = self._corpus(self.KEYWORDS, seed=2)
+        labels = [int(any(k in c.lower() for k, _, _ in self.KEYWORDS)) for c in comments]
+        model = spam_classifier.SpamClassifier.train(comments, labels, epochs=30)
+        model.threshold = 0.6
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'spam_classifier.npz')
+            model.save(path)
+            with override_settings(SPAM_CLASSIFIER_PATH=path):
+                self.assertIsNotNone(spam_classifier.get_model())
+                # Keyword chưa có trong database -> chỉ bộ phân loại bắt được
+                self._assert_same(self.KEYWORDS[:3], corpus_keywords=self.KEYWORDS)
+
+
+class SpamKeywordInvalidationTest(TestCase):
+    """Sửa SpamKeyword -> sau commit process khác (bản sao cũ / cache riêng) cũng dùng bộ keyword mới"""
+
+    TEXT = 'shop ơi cho mình xin zalo với'
+
+    def setUp(self):
+        cache.clear()
+        review_service._keyword_set = None
+        self.addCleanup(setattr, review_service, '_keyword_set', None)
+
+    def _detect(self):
+        return review_service.detect_spam_keywords(self.TEXT)[:2]
+
+    def _add_keyword(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            SpamKeyword.objects.create(keyword='zalo', severity=90, category='CONTACT')
+
+    def test_save_visible_in_fresh_process(self):
+        self.assertEqual(self._detect(), (False, None))
+        self._add_keyword()
+        self.assertEqual(self._detect(), (True, 'zalo'))
+        # Process mới (chưa có bản sao) đọc cùng cache
+        review_service._keyword_set = None
+        self.assertEqual(self._detect(), (True, 'zalo'))
+
+    def test_process_with_old_copy_reloads(self):
+        self._detect()
+        old = review_service._keyword_set
+        self._add_keyword()
+        review_service._keyword_set = old
+        self.assertEqual(self._detect(), (True, 'zalo'))
+
+    def test_uncommitted_change_not_published(self):
+        version = review_service.spam_keywords_version()
+        with self.captureOnCommitCallbacks(execute=False):
+            SpamKeyword.objects.create(keyword='zalo', severity=90, category='CONTACT')
+        self.assertEqual(cache.get(review_service.SPAM_KEYWORDS_VERSION_KEY), version)
+
+    def test_process_with_own_cache_reloads_when_version_expires(self):
+        self._detect()
+        old = review_service._keyword_set
+        self._add_keyword()
+        # Worker có cache riêng (LocMemCache): vẫn giữ version cũ tới khi key hết hạn
+        review_service._keyword_set = old
+        cache.set(review_service.SPAM_KEYWORDS_VERSION_KEY, old[0])
+        self.assertEqual(self._detect(), (False, None))
+        cache.delete(review_service.SPAM_KEYWORDS_VERSION_KEY)
+        self.assertEqual(self._detect(), (True, 'zalo'))
+        # Bản đọc trước commit không ghi đè version mới đã công bố
+        cache.add(review_service.SPAM_KEYWORDS_VERSION_KEY, old[0])
+        self.assertEqual(cache.get(review_service.SPAM_KEYWORDS_VERSION_KEY), review_service.spam_keywords_version())
+
+
+class TokenBucketTest(SimpleTestCase):
+    """Token bucket trong Django cache: hết token thì từ chối, hồi token theo thời gian, không vượt capacity"""
+
+    def setUp(self):
+        cache.clear()
+        self.bucket = TokenBucket('test', capacity=3, refill_seconds=10)
+
+    def test_allows_up_to_capacity(self):
+        self.assertEqual([self.bucket.consume('u1', now=1000) for _ in range(3)], [True, True, True])
+        self.assertEqual(self.bucket.remaining('u1', now=1000), 0)
+        # Bucket khác key không bị ảnh hưởng
+        self.assertTrue(self.bucket.consume('u2', now=1000))
+
+    def test_denies_when_empty_without_using_tokens(self):
+        for _ in range(3):
+            self.bucket.consume('u1', now=1000)
+        self.assertEqual([self.bucket.consume('u1', now=1001) for _ in range(5)], [False] * 5)
+        # Lần bị từ chối không tính là đã dùng -> hồi 1 token là gửi được ngay
+        self.assertTrue(self.bucket.consume('u1', now=1010))
+        self.assertFalse(self.bucket.consume('u1', now=1010))
+
+    def test_refills_over_time_up_to_capacity(self):
+        for _ in range(3):
+            self.bucket.consume('u1', now=1000)
+        self.assertEqual(self.bucket.remaining('u1', now=1025), 2)
+        self.assertEqual(self.bucket.remaining('u1', now=2000), 3)
+        # Để lâu không dùng: chỉ còn đúng capacity token, không tích luỹ
+        self.assertEqual([self.bucket.consume('u1', now=2000) for _ in range(4)], [True, True, True, False])
+
+    def test_lost_state_leaves_full_bucket(self):
+        bucket = TokenBucket('test', capacity=5, refill_seconds=60)
+        allowed = sum(bucket.consume('u1', now=1000 + 60 * i) for i in range(40))
+        self.assertEqual(allowed, 40)
+        # Cache xoá key (LocMemCache đầy) -> bucket đầy lại, không chặn nhầm người dùng thật
+        cache.delete(bucket._key('u1'))
+        self.assertEqual([bucket.consume('u1', now=3400) for _ in range(6)], [True] * 5 + [False])
+
+    def test_refund(self):
+        for _ in range(3):
+            self.bucket.consume('u1', now=1000)
+        self.bucket.refund('u1')
+        self.assertEqual(self.bucket.remaining('u1', now=1000), 1)
+        self.assertTrue(self.bucket.consume('u1', now=1000))
+
+
+def make_product(name, **fields):
+    return Product.objects.create(name=name, sku=f"SKU-{name}", price=100000, image='products/test.jpg', **fields)
+
+
+class ReviewStatsDeltaTest(TestCase):
+    """Thống kê cập nhật dần (Review.save, ReviewQuerySet) phải bằng thống kê tính lại từ đầu"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('reviewer')
+        self.products = [make_product('a'), make_product('b'), make_product('c')]
+
+    def _review(self, product, rating, sentiment='POS', **fields):
+        fields.setdefault('analysis_status', Review.ANALYSIS_DONE)
+        return Review(user=self.user, product=product, rating=rating, comment='ok', sentiment=sentiment, **fields)
+
+    def _assert_matches_rebuild(self):
+        ids = [p.id for p in self.products]
+        current = {
+            row.pop('product_id'): row
+            for row in ProductReviewStats.objects.filter(product_id__in=ids).values('product_id', *review_stats.COUNTERS)
+        }
+        self.assertEqual(current, review_stats.aggregate(ids))
+        self.assertEqual(review_stats.rebuild(ids, dry_run=True), (len(ids), 0))
+
+    def test_new_product_has_zero_stats(self):
+        stats = make_product('d').review_stats
+        self.assertEqual((stats.review_count, stats.avg_rating, stats.pos_percent), (0, 0.0, 0))
+
+    def test_save(self):
+        a, b, _ = self.products
+        review = self._review(a, 5)
+        review.save()
+        self._review(a, 2, 'NEG').save()
+        self._review(b, 4, 'NEU', is_approved=False).save()
+        self._assert_matches_rebuild()
+
+        review.rating, review.sentiment = 3, 'NEU'
+        review.save()
+        review.product = b
+        review.save(update_fields=['product'])
+        self._assert_matches_rebuild()
+
+        review.is_spam = True
+        review.save()
+        self._assert_matches_rebuild()
+        self.assertEqual(ProductReviewStats.objects.get(product=b).review_count, 0)
+
+    def test_queryset_update_and_bulk_create(self):
+        a, b, c = self.products
+        Review.objects.bulk_create([
+            self._review(product, rating, sentiment)
+            for product in (a, b, c) for rating, sentiment in ((5, 'POS'), (1, 'NEG'), (3, 'NEU'))
+        ])
+        self._assert_matches_rebuild()
+
+        Review.objects.filter(product=a, rating__lt=3).update(is_spam=True)
+        Review.objects.filter(product=b).update(is_approved=False)
+        Review.objects.filter(product=c, sentiment='NEU').update(rating=5, sentiment='POS')
+        Review.objects.filter(product=c, rating=1).update(product=a)
+        self._assert_matches_rebuild()
+
+        reviews = list(Review.objects.filter(product=b))
+        for review in reviews:
+            review.is_approved = True
+        Review.objects.bulk_update(reviews, ['is_approved'])
+        self._assert_matches_rebuild()
+
+    def test_sentiment_counted_only_after_analysis(self):
+        a, _, _ = self.products
+        # Review mới: sentiment mặc định NEU nhưng chưa phân tích -> chỉ tính số review / số sao
+        Review.objects.create(user=self.user, product=a, rating=4, comment='chờ phân tích')
+        review = self._review(a, 2, 'NEU', analysis_status=Review.ANALYSIS_PENDING)
+        review.save()
+        self._assert_matches_rebuild()
+        stats = ProductReviewStats.objects.get(product=a)
+        self.assertEqual((stats.review_count, stats.rating_sum, stats.neu_count, stats.analyzed_count), (2, 6, 0, 0))
+        self.assertEqual(stats.neu_percent, 0)
+
+        Review.objects.filter(id=review.id).update(analysis_status=Review.ANALYSIS_PROCESSING)
+        review.refresh_from_db()
+        review.sentiment, review.analysis_status = 'NEG', Review.ANALYSIS_DONE
+        Review.objects.bulk_update([review], ['sentiment', 'analysis_status'])
+        self._assert_matches_rebuild()
+        stats.refresh_from_db()
+        self.assertEqual((stats.review_count, stats.neg_count, stats.neu_count, stats.neg_percent), (2, 1, 0, 100))
+
+    def test_delete(self):
+        a, b, _ = self.products
+        Review.objects.bulk_create([self._review(a, 5), self._review(a, 4), self._review(b, 1, 'NEG')])
+        Review.objects.filter(product=a, rating=5).delete()
+        Review.objects.filter(product=b).first().delete()
+        self._assert_matches_rebuild()
+
+
+class ReviewKeysetPaginationTest(TestCase):
+    """Phân trang đánh giá theo (created_at, id): không trùng, không sót khi nhiều review cùng created_at"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('reviewer')
+        self.product = make_product('a')
+        Review.objects.bulk_create([
+            Review(user=self.user, product=self.product, rating=5, comment=f"review {i}") for i in range(23)
+        ])
+        # Nhiều nhóm review trùng created_at (đến cả micro giây), kể cả nhóm bị cắt ngang ranh giới trang
+        base = (timezone.now() - timedelta(minutes=1)).replace(microsecond=123456)
+        for i, review_id in enumerate(Review.objects.order_by('id').values_list('id', flat=True)):
+            Review.objects.filter(id=review_id).update(created_at=base - timedelta(seconds=i // 5))
+        Review.objects.filter(id=Review.objects.order_by('id').values_list('id', flat=True)[3]).update(is_spam=True)
+
+    def _walk(self, limit):
+        seen, cursor = [], None
+        while True:
+            reviews, cursor = review_pages.reviews_page(self.product.id, cursor, limit=limit)
+            seen.extend(review.id for review in reviews)
+            if cursor is None:
+                return seen
+
+    def test_pages_cover_every_review_once(self):
+        expected = list(review_pages.visible_reviews(self.product.id).values_list('id', flat=True))
+        self.assertEqual(len(expected), 22)
+        for limit in (1, 3, 4, 5, 7, 22, 50):
+            with self.subTest(limit=limit):
+                self.assertEqual(self._walk(limit), expected)
+
+    def test_new_review_does_not_shift_later_pages(self):
+        expected = list(review_pages.visible_reviews(self.product.id).values_list('id', flat=True))
+        first, cursor = review_pages.reviews_page(self.product.id, limit=4)
+        Review.objects.create(user=self.user, product=self.product, rating=4, comment='mới')
+        rest, _ = review_pages.reviews_page(self.product.id, cursor, limit=50)
+        self.assertEqual([r.id for r in first + rest], expected)
+
+    def test_cursor_round_trip(self):
+        for review in Review.objects.all():
+            self.assertEqual(
+                review_pages.decode_cursor(review_pages.encode_cursor(review)), (review.created_at, review.id)
+            )
+
+    def test_rejects_bad_cursors(self):
+        bad = [
+            '', 'abc', '-5-3', '5--3', '+5-3', ' 5-3', '5-3 ', '5_0-3', '5-3-1', '١٢-3',
+            '99999999999999999999-1', '253402300800000000-1', '1-9999999999999999999',
+        ]
+        url = reverse('product_reviews', args=[self.product.id])
+        for cursor in bad:
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(ValueError):
+                    review_pages.decode_cursor(cursor)
+                if cursor:
+                    self.assertEqual(self.client.get(url, {'after': cursor}).status_code, 400)
+        response = self.client.get(url, {'after': review_pages.encode_cursor(Review.objects.first())})
+        self.assertEqual(response.status_code, 200)
+
+
+class AdminReviewsPaginationTest(TestCase):
+    """Trang quản lý đánh giá: tổng số dòng lấy từ thống kê khi chỉ lọc spam / cảm xúc, COUNT riêng khi lọc khác"""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        user = User.objects.create_user('reviewer')
+        a, b = make_product('a'), make_product('b')
+        Review.objects.bulk_create(
+            [Review(user=user, product=a, rating=5, comment=f"tốt {i}", sentiment='POS') for i in range(25)]
+            + [Review(user=user, product=b, rating=1, comment=f"tệ {i}", sentiment='NEG') for i in range(3)]
+            + [Review(user=user, product=b, rating=2, comment=f"spam {i}", sentiment='NEU', is_spam=True) for i in range(2)]
+        )
+
+    def test_paginator_count_matches_filter(self):
+        cases = [
+            ({}, 30), ({'sentiment': 'POS'}, 25), ({'spam': '1'}, 2), ({'spam': '0', 'sentiment': 'NEG'}, 3),
+            ({'rating': '1'}, 3), ({'product': str(Product.objects.get(name='b').id)}, 5),
+        ]
+        for params, expected in cases:
+            with self.subTest(params=params):
+                response = self.client.get(reverse('admin_reviews'), params)
+                self.assertEqual(response.status_code, 200)
+                page = response.context['reviews']
+                self.assertEqual(page.paginator.count, expected)
+                self.assertEqual(page.paginator.num_pages, (expected + 19) // 20)
+
+    def test_known_count_skips_count_query(self):
+        paginator = views.CountedPaginator(Review.objects.all(), 20, count=7)
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.count, 7)
+        with self.assertNumQueries(1):
+            self.assertEqual(views.CountedPaginator(Review.objects.all(), 20).count, 30)
+
+
+@override_settings(PRODUCT_FRAGMENT_CACHE_ENABLED=True)
+class ProductFragmentInvalidationTest(TestCase):
+    """Lưu / xoá sản phẩm -> tăng version sau commit, trang chi tiết không đọc lại HTML cũ"""
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Serum')
+        self.product = make_product('serum-a', category=category)
+        self.other = make_product('serum-b', category=category)
+
+    def _lookups(self):
+        counts = site_metrics.snapshot()['counters']['product_fragment_cache_total']
+        return counts.get('hit', 0), counts.get('miss', 0)
+
+    def _render(self, product_id):
+        """Return: (fragments, số fragment trúng cache, số fragment phải render)"""
+        hits, misses = self._lookups()
+        fragments = product_fragments.detail_fragments(product_id)
+        after = self._lookups()
+        return fragments, after[0] - hits, after[1] - misses
+
+    def test_cached_until_product_saved(self):
+        fragments, hits, misses = self._render(self.product.id)
+        self.assertEqual((hits, misses), (0, 4))
+        self.assertEqual(self._render(self.product.id), (fragments, 4, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'serum-a mới'
+            self.product.save()
+        fragments, hits, misses = self._render(self.product.id)
+        self.assertEqual((hits, misses), (0, 4))
+        self.assertEqual(fragments['title'], 'serum-a mới')
+
+    def test_other_product_saved_refreshes_related_only(self):
+        self._render(self.product.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.name = 'serum-b mới'
+            self.other.save()
+        fragments, hits, misses = self._render(self.product.id)
+        self.assertEqual((hits, misses), (3, 1))
+        self.assertIn('serum-b mới', fragments['related'])
+
+    def test_product_deleted(self):
+        self._render(self.product.id)
+        self._render(self.other.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.delete()
+        self.assertIsNone(product_fragments.detail_fragments(self.other.id))
+        fragments, hits, misses = self._render(self.product.id)
+        self.assertEqual((hits, misses), (3, 1))
+        self.assertNotIn('serum-b', fragments['related'])
+
+    def test_uncommitted_save_keeps_cache(self):
+        self._render(self.product.id)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.product.save()
+        # Chưa commit -> version chưa tăng
+        self.assertTrue(callbacks)
+        self.assertEqual(self._render(self.product.id)[1:], (4, 0))
+
+    def test_default_needs_shared_cache(self):
+        # Mặc định (None): LocMemCache -> tắt, bump version không tới worker khác
+        with override_settings(PRODUCT_FRAGMENT_CACHE_ENABLED=None):
+            self.assertEqual(self._render(self.product.id)[1:], (0, 0))
+            with tempfile.TemporaryDirectory() as path:
+                shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': path}}
+                with override_settings(CACHES=shared):
+                    self.assertEqual(self._render(self.product.id)[1:], (0, 4))
+                    self.assertEqual(self._render(self.product.id)[1:], (4, 0))
+
+
+class ProductViewBufferTest(TestCase):
+    """Lượt xem đệm trong process, ghi xuống bằng views = views + n (không ghi đè số của worker khác)"""
+
+    def setUp(self):
+        # Bộ đệm + thread flush mới như process vừa fork
+        product_views._pid = None
+        self.products = [make_product('a', views=5), make_product('b'), make_product('c')]
+
+    def _views(self):
+        return [Product.objects.get(id=p.id).views for p in self.products]
+
+    def test_flush_adds_to_current_value(self):
+        a, b, c = self.products
+        for product, count in ((a, 3), (b, 3), (c, 1)):
+            for _ in range(count):
+                product_views.record_view(product.id)
+        self.assertEqual(product_views.pending_views(), {a.id: 3, b.id: 3, c.id: 1})
+        self.assertEqual(self._views(), [5, 0, 0])
+
+        # Worker khác đã ghi lượt xem của nó trước lần flush này
+        Product.objects.filter(id=a.id).update(views=100)
+        self.assertEqual(product_views.flush(), 7)
+        self.assertEqual(self._views(), [103, 3, 1])
+        self.assertEqual(product_views.pending_views(), {})
+        self.assertEqual(product_views.flush(), 0)
+
+    def test_failed_flush_keeps_views(self):
+        a = self.products[0]
+        product_views.record_view(a.id)
+        with mock.patch.object(Product.objects, 'filter', side_effect=RuntimeError('db down')):
+            self.assertEqual(product_views.flush(), 0)
+        self.assertEqual(product_views.pending_views(), {a.id: 1})
+        self.assertEqual(product_views.flush(), 1)
+        self.assertEqual(self._views()[0], 6)
+
+    @override_settings(PRODUCT_VIEWS_FLUSH_THRESHOLD=3)
+    def test_threshold_flushes_in_request(self):
+        a = self.products[0]
+        product_views.record_view(a.id)
+        product_views.record_view(a.id)
+        self.assertEqual(self._views()[0], 5)
+        product_views.record_view(a.id)
+        self.assertEqual(self._views()[0], 8)
+        self.assertEqual(product_views.pending_views(), {})
+
+    @override_settings(PRODUCT_VIEWS_FLUSH_INTERVAL=0.01)
+    def test_background_thread_flushes_without_requests(self):
+        flushed = threading.Event()
+        with mock.patch.object(product_views, 'flush', side_effect=flushed.set):
+            product_views.record_view(self.products[0].id)
+            # Không có request nào tiếp theo -> thread nền vẫn ghi
+            self.assertTrue(flushed.wait(5))
+
+
+class ProductSearchViewTest(TestCase):
+    """Không có sentiment server: trang tìm kiếm không embed trong request, 2 cách tìm cùng lọc sản phẩm đang bán"""
+
+    def setUp(self):
+        self.active = make_product('kem chống nắng')
+        self.hidden = make_product('kem chống nắng cũ', status=False)
+
+    def test_semantic_mode_falls_back_to_keyword_without_server(self):
+        with mock.patch.object(product_search, 'index_is_usable', return_value=True), \
+                mock.patch.object(ai_utils, 'embed_texts', side_effect=AssertionError('embedded in request')):
+            response = self.client.get(reverse('search'), {'searched': 'kem', 'mode': 'semantic'})
+        self.assertEqual(response.context['mode'], 'keyword')
+        self.assertFalse(response.context['semantic_available'])
+        self.assertEqual(list(response.context['products']), [self.active])
+
+    @override_settings(SENTIMENT_SERVER_SOCKET='/nonexistent/sentiment.sock')
+    def test_semantic_mode_shows_only_active_products(self):
+        hits = [(self.hidden.id, 0.9), (self.active.id, 0.8)]
+        with mock.patch.object(product_search, 'index_is_usable', return_value=True), \
+                mock.patch.object(product_search, 'search_products', return_value=hits):
+            response = self.client.get(reverse('search'), {'searched': 'kem', 'mode': 'semantic'})
+        self.assertEqual(response.context['mode'], 'semantic')
+        self.assertEqual(response.context['products'], [self.active])
+
+    def test_index_error_on_delete_does_not_break_save(self):
+        with mock.patch('app.signals._auto_update', return_value=True), \
+                mock.patch.object(product_search, 'remove_products', side_effect=OSError('index locked')):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.hidden.delete()
+        self.assertFalse(Product.objects.filter(id=self.hidden.id).exists())
+
+
+class SpamRecheckProgressTest(TestCase):
+    """Tiến độ kiểm tra lại spam lưu trong database: trang admin (process khác, cache khác) đọc được"""
+
+    def setUp(self):
+        cache.clear()
+        review_service._keyword_set = None
+        self.addCleanup(setattr, review_service, '_keyword_set', None)
+        user = User.objects.create_user('reviewer')
+        product = make_product('a')
+        Review.objects.bulk_create([
+            Review(user=user, product=product, comment=comment, analysis_status=Review.ANALYSIS_DONE)
+            for comment in ['dùng tốt', 'inbox zalo mua sỉ', 'giao nhanh', 'thơm lắm', 'add zalo giá rẻ']
+        ])
+
+    def test_progress_survives_cache_loss(self):
+        self.assertTrue(spam_recheck.progress_summary()['pending'])
+        with self.captureOnCommitCallbacks(execute=True):
+            SpamKeyword.objects.create(keyword='zalo', severity=90, category='CONTACT')
+
+        self.assertEqual(spam_recheck.recheck_batch(limit=2), (2, 1))
+        # Process web có cache riêng: không thấy gì trong cache của worker
+        cache.clear()
+        summary = spam_recheck.progress_summary()
+        self.assertEqual((summary['pending'], summary['total'], summary['remaining']), (False, 5, 3))
+        self.assertEqual(summary['percent'], 40)
+
+        while spam_recheck.recheck_batch(limit=2)[0]:
+            pass
+        summary = spam_recheck.progress_summary()
+        self.assertEqual((summary['remaining'], summary['flagged'], summary['percent']), (0, 2, 100))
+        self.assertEqual(Review.objects.filter(is_spam=True).count(), 2)
@@ -8,6 +8,7 @@ urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('product/<int:id>/', views.product_detail, name='product_detail'),
+    path('product/<int:id>/reviews/', views.product_reviews, name='product_reviews'),
     path('add-to-cart/<int:product_id>/', views.add_to_cart, name='add_to_cart'),
 
     path('cart/', views.cart_detail, name='cart_detail'),
@@ -21,6 +22,7 @@ urlpatterns = [
     path('cart/', views.cart_detail, name='cart_detail'),
 
     path('my-admin/', views.admin_dashboard, name='admin_dashboard'),
+    path('my-admin/metrics/', views.admin_sentiment_metrics, name='admin_sentiment_metrics'),
     path('my-admin/customers/', views.admin_customers, name='admin_customers'),
     path('my-admin/products/', views.admin_products, name='admin_products'),
     path('my-admin/product/add/', views.admin_product_add, name='admin_product_add'),
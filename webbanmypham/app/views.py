@@ -8,22 +8,25 @@ from .models import CustomerProfile, Product, Category, Order, Brand, OrderItem,
 from .cart import Cart 
 from .forms import ProductForm
 from datetime import datetime
-from .ai_utils import analyze_sentiment
 from django.db.models import Avg
 import random
 from django.db.models import Sum
 from datetime import timedelta
 from django.utils import timezone
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse
+from django.template.loader import render_to_string
+from django.utils.functional import cached_property
+import hmac
+from .services import product_fragments, product_search, product_views, rate_limit, review_pages, sentiment_metrics, site_metrics
 
 # --- TRANG CHỦ ---
 def home(request):
     # 1. Lấy sản phẩm "Gợi ý"
-    offer_products = Product.objects.all().order_by('-id')[:8] 
+    offer_products = Product.objects.select_related('category', 'review_stats').order_by('-id')[:8]
     
-    # 2. Lấy sản phẩm "Xu hướng"
-    trending_products = Product.objects.filter(sale_price__gt=0)[:8]
-    if not trending_products:
-        trending_products = Product.objects.all()[:8]
+    # 2. Lấy sản phẩm "Xu hướng": xem nhiều nhất (Product.views, xem product_views)
+    trending_products = Product.objects.select_related('category', 'review_stats').order_by('-views', '-id')[:8]
 
     context = {
         'offer_products': offer_products,
@@ -102,8 +105,15 @@ def logout_view(request):
     return redirect('home')
 
 # ---  SẢN PHẨM ---
+# Cách sắp xếp trang shop: giá trị ?sort= -> (nhãn, order_by)
+SHOP_SORTS = {
+    'newest': ('Mới nhất', ('-id',)),
+    'popular': ('Phổ biến', ('-views', '-id')),
+}
+
 def shop(request):
-    product_list = Product.objects.all().order_by('-id')
+    # Rating đọc từ ProductReviewStats (không aggregate review)
+    product_list = Product.objects.select_related('category', 'review_stats').order_by('-id')
     categories = Category.objects.all()
     
     # Lọc theo danh mục nếu có
@@ -116,6 +126,12 @@ def shop(request):
     if active_brand:
         product_list = product_list.filter(brand_id=active_brand)
     
+    # Sắp xếp (mặc định: mới nhất)
+    sort = request.GET.get('sort')
+    if sort not in SHOP_SORTS:
+        sort = 'newest'
+    product_list = product_list.order_by(*SHOP_SORTS[sort][1])
+    
     # Tạo sidebar_data: danh mục + thương hiệu liên quan
     sidebar_data = []
     for category in categories:
@@ -129,31 +145,55 @@ def shop(request):
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
 
+    # Giữ bộ lọc khi đổi trang / đổi cách sắp xếp
+    filters = request.GET.copy()
+    filters.pop('page', None)
+    page_query = filters.urlencode()
+    filters.pop('sort', None)
+    sort_query = filters.urlencode()
+
     context = {
         'page_obj': page_obj,
         'categories': categories,
         'sidebar_data': sidebar_data,
         'active_category': active_category,
-        'active_brand': active_brand
+        'active_brand': active_brand,
+        'sort': sort,
+        'sort_options': [(value, label) for value, (label, _) in SHOP_SORTS.items()],
+        'page_query': page_query + '&' if page_query else '',
+        'sort_query': sort_query + '&' if sort_query else '',
     }
     return render(request, 'app/shop.html', context)
 
 # --- CHI TIẾT SẢN PHẨM  ---
 def product_detail(request, id):
-    product = get_object_or_404(Product, id=id)
-    #  sản phẩm liên quan
-    related_products = Product.objects.filter(category=product.category).exclude(id=id)[:4]
+    #  thông tin sản phẩm, tóm tắt đánh giá, sản phẩm liên quan: HTML cache theo version sản phẩm
+    fragments = product_fragments.detail_fragments(id)
+    if fragments is None:
+        raise Http404('Không tìm thấy sản phẩm')
+    # Lượt xem: đệm trong process, ghi database theo lô (không UPDATE dòng sản phẩm mỗi request)
+    product_views.record_view(id)
     
-    #  LẤY DANH SÁCH ĐÁNH GIÁ (Chỉ lấy cái đã duyệt: is_approved=True)
-    reviews = Review.objects.filter(product=product, is_approved=True).order_by('-created_at')
+    #  LẤY TRANG ĐÁNH GIÁ ĐẦU TIÊN (đã duyệt, không spam); trang sau tải bằng product_reviews
+    reviews, next_cursor = review_pages.reviews_page(id)
     
     context = {
-        'product': product, 
-        'related_products': related_products,
+        'product_id': id,
+        'fragments': fragments,
         'reviews': reviews, # <-- Truyền biến này sang HTML
+        'next_cursor': next_cursor,
     }
     return render(request, 'app/product_detail.html', context)
 
+# --- TẢI THÊM ĐÁNH GIÁ (nút "Xem thêm" trên trang chi tiết) ---
+def product_reviews(request, id):
+    try:
+        reviews, next_cursor = review_pages.reviews_page(id, request.GET.get('after'))
+    except ValueError:
+        return JsonResponse({'error': 'Cursor không hợp lệ'}, status=400)
+    html = render_to_string('app/includes/review_items.html', {'reviews': reviews}, request=request)
+    return JsonResponse({'html': html, 'next': next_cursor})
+
 # --- THÊM VÀO GIỎ ---
 def add_to_cart(request, product_id):
     return redirect('cart_detail')
@@ -162,11 +202,26 @@ def add_to_cart(request, product_id):
 def search(request):
     if request.method == "GET":
         searched = request.GET.get('searched')
-        if searched:
-            products = Product.objects.filter(name__icontains=searched)
-        else:
-            products = []
-        return render(request, 'app/search.html', {'searched': searched, 'products': products})
+        # mode=semantic: tìm theo nghĩa (tên + mô tả + thành phần), không cần khớp từ khoá
+        mode = request.GET.get('mode', 'keyword')
+        # Không có sentiment server -> chỉ tìm theo từ khoá (embed query sẽ tải model trong request)
+        semantic_available = product_search.semantic_search_available()
+        # Cả 2 cách tìm chỉ hiện sản phẩm đang kinh doanh
+        visible = Product.objects.filter(status=True)
+        products = []
+        if searched and mode == 'semantic' and semantic_available:
+            hits = product_search.search_products(searched)
+            by_id = visible.filter(id__in=[pid for pid, _ in hits]).in_bulk()
+            products = [by_id[pid] for pid, _ in hits if pid in by_id]
+        elif searched:
+            mode = 'keyword'
+            products = visible.filter(name__icontains=searched)
+        return render(request, 'app/search.html', {
+            'searched': searched,
+            'products': products,
+            'mode': mode,
+            'semantic_available': semantic_available,
+        })
 
 # --- GIỎ HÀNG ---
 def add_to_cart(request, product_id):
@@ -320,9 +375,25 @@ def admin_dashboard(request):
         'order_count': order_count,
         'low_stock_count': low_stock_count,       # <--- Biến mới
         'dead_stock_count': dead_stock_count,     # <--- Biến mới
+        'sentiment_metrics': sentiment_metrics.summary(),
+        'site_metrics': site_metrics.summary(),
     }
     return render(request, 'app/my_admin/dashboard.html', context)
 
+#  SỐ LIỆU VẬN HÀNH: MODEL CẢM XÚC + WEB (PROMETHEUS)
+def admin_sentiment_metrics(request):
+    # Prometheus không đăng nhập được -> cho phép thêm Bearer token (SENTIMENT_METRICS_TOKEN)
+    token = getattr(settings, 'SENTIMENT_METRICS_TOKEN', None)
+    auth_header = request.headers.get('Authorization', '')
+    has_token = bool(token) and hmac.compare_digest(auth_header, f"Bearer {token}")
+    if not has_token and not (request.user.is_authenticated and is_admin(request.user)):
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        sentiment_metrics.render_prometheus() + site_metrics.render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
 #  TRANG QUẢN LÝ KHÁCH HÀNG
 @login_required(login_url='login')
 @user_passes_test(is_admin, login_url='home')
@@ -335,7 +406,7 @@ def admin_customers(request):
 @login_required(login_url='login')
 @user_passes_test(is_admin, login_url='home')
 def admin_products(request):
-    products_list = Product.objects.all().order_by('-id')
+    products_list = Product.objects.select_related('brand', 'review_stats').order_by('-id')
     
     # Lấy dữ liệu cho bộ lọc
     categories = Category.objects.all()
@@ -401,55 +472,96 @@ def admin_customer_detail(request, id):
 
 
 #  QUẢN LÝ ĐÁNH GIÁ (REVIEWS)
+class CountedPaginator(Paginator):
+    """Paginator dùng tổng số dòng đã đếm sẵn (count=None -> COUNT như Paginator gốc)"""
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._known_count = count
+
+    @cached_property
+    def count(self):
+        if self._known_count is not None:
+            return self._known_count
+        return super().count
+
+
 @login_required(login_url='login')
 @user_passes_test(is_admin, login_url='home')
 def admin_reviews(request):
-    from .services.review_service import is_review_spam
-    
-    #  Lấy tất cả đánh giá
-    reviews = Review.objects.all().order_by('-created_at')
-    
-    # Tự động phát hiện spam cho reviews chưa được xử lý
-    for review in reviews:
-        # Dùng getattr với default False cho old reviews chưa có field is_spam
-        is_spam_flag = getattr(review, 'is_spam', False)
-        if not is_spam_flag and review.comment:  # Chưa được đánh dấu spam
-            spam_result = is_review_spam(review.comment, review.rating)
-            if spam_result['is_spam']:
-                review.is_spam = True
-                review.spam_reason = spam_result['reason']
-                review.sentiment = 'SPAM'
-                review.save()
-    
-    # Tính toán thống kê (loại bỏ spam)
-    valid_reviews = reviews.exclude(is_spam=True)
-    total_reviews = valid_reviews.count()
-    spam_count = reviews.filter(is_spam=True).count()
-    
+    from django.db.models import Count, Q
+    from .services import spam_recheck
+
+    REVIEWS_PER_PAGE = 20
+    SENTIMENTS = [value for value, _ in Review.SENTIMENT_CHOICES]
+
+    # Spam được chấm ở worker nền (process_review_queue / recheck_spam), trang này chỉ đọc tiến độ
+    spam_recheck_progress = spam_recheck.progress_summary()
+
+    # Thống kê: 1 query đếm có điều kiện (chạy trên index review_stats_idx, không đọc bảng)
+    # Đếm sẵn từng cặp (spam, cảm xúc) -> dùng lại làm tổng số dòng khi lọc, không cần COUNT riêng
+    counts = {
+        f'{spam}_{sentiment}': Count('id', filter=Q(is_spam=(spam == 'spam'), sentiment=sentiment))
+        for spam in ('spam', 'valid') for sentiment in SENTIMENTS
+    }
+    stats = Review.objects.aggregate(avg_rating=Avg('rating', filter=Q(is_spam=False)), **counts)
+    total_reviews = sum(stats[f'valid_{s}'] for s in SENTIMENTS)
+    spam_count = sum(stats[f'spam_{s}'] for s in SENTIMENTS)
+
     pos_percent = 0
     neg_percent = 0
     avg_rating = 0.0
-    
     if total_reviews > 0:
-        # Đếm số lượng theo cảm xúc (chỉ valid reviews)
-        # Dùng getattr để xử lý old reviews không có field sentiment
-        pos_count = sum(1 for r in valid_reviews if getattr(r, 'sentiment', 'NEU') == 'POS')
-        neg_count = sum(1 for r in valid_reviews if getattr(r, 'sentiment', 'NEU') == 'NEG')
-        
-        # Tính phần trăm (Làm tròn)
-        pos_percent = round((pos_count / total_reviews) * 100)
-        neg_percent = round((neg_count / total_reviews) * 100)
-        
-        # Tính rating trung bình (chỉ valid reviews)
-        avg_rating = round(valid_reviews.aggregate(Avg('rating'))['rating__avg'] or 0, 1)
-    
+        # Tính phần trăm (Làm tròn, chỉ valid reviews)
+        pos_percent = round((stats['valid_POS'] / total_reviews) * 100)
+        neg_percent = round((stats['valid_NEG'] / total_reviews) * 100)
+        avg_rating = round(stats['avg_rating'] or 0, 1)
+
+    # Bộ lọc (?sentiment=POS&spam=0&product=12&rating=5)
+    sentiment = request.GET.get('sentiment', '')
+    spam = request.GET.get('spam', '')
+    product_id = request.GET.get('product', '')
+    rating = request.GET.get('rating', '')
+    sentiment = sentiment if sentiment in SENTIMENTS else ''
+    spam = spam if spam in ('0', '1') else ''
+    product_id = product_id if product_id.isdigit() else ''
+    rating = rating if rating in ('1', '2', '3', '4', '5') else ''
+
+    reviews = Review.objects.select_related('product', 'user__profile').order_by('-created_at', '-id')
+    if sentiment:
+        reviews = reviews.filter(sentiment=sentiment)
+    if spam:
+        reviews = reviews.filter(is_spam=(spam == '1'))
+    if product_id:
+        reviews = reviews.filter(product_id=product_id)
+    if rating:
+        reviews = reviews.filter(rating=rating)
+
+    known_count = None
+    if not product_id and not rating:
+        # Chỉ lọc theo spam / cảm xúc -> tổng số dòng lấy từ thống kê ở trên
+        known_count = sum(
+            stats[f'{group}_{s}']
+            for group in (('spam',) if spam == '1' else ('valid',) if spam == '0' else ('spam', 'valid'))
+            for s in ((sentiment,) if sentiment else SENTIMENTS)
+        )
+    paginator = CountedPaginator(reviews, REVIEWS_PER_PAGE, count=known_count)
+    page = paginator.get_page(request.GET.get('page'))
+
+    filters = request.GET.copy()
+    filters.pop('page', None)
+
     context = {
-        'reviews': reviews,
+        'reviews': page,
         'total_reviews': total_reviews,
         'spam_count': spam_count,
         'pos_percent': pos_percent,
         'neg_percent': neg_percent,
-        'avg_rating': avg_rating
+        'avg_rating': avg_rating,
+        'spam_recheck': spam_recheck_progress,
+        'filters': {'sentiment': sentiment, 'spam': spam, 'product': product_id, 'rating': rating},
+        'filter_product': Product.objects.filter(id=product_id).first() if product_id else None,
+        'filter_query': filters.urlencode(),
     }
     return render(request, 'app/my_admin/reviews.html', context)
 
@@ -460,6 +572,11 @@ def admin_reviews(request):
 @login_required(login_url='login')
 def submit_review(request, product_id):
     if request.method == 'POST':
+        # Giới hạn tần suất trước mọi việc khác (tạo review -> AI + spam chạy nền)
+        if rate_limit.check_review_submission(request.user.id, rate_limit.client_ip(request)):
+            messages.error(request, "Bạn gửi đánh giá quá nhanh, vui lòng thử lại sau ít phút.")
+            return redirect('product_detail', id=product_id)
+
         product = get_object_or_404(Product, id=product_id)
         
         #  Lấy dữ liệu từ HTML (name="comment")
@@ -479,41 +596,17 @@ def submit_review(request, product_id):
             logger.warning(f"Empty comment from user {request.user.username}")
             return redirect('product_detail', id=product_id)
 
-        #  Gọi AI phân tích
-        logger.info(f"Calling analyze_sentiment...")
-        try:
-            ai_label, ai_score = analyze_sentiment(text_comment)
-            logger.info(f"✓ AI Result - Label: {ai_label}, Score: {ai_score}")
-        except Exception as e:
-            logger.error(f"✗ AI Error: {e}", exc_info=True)
-            ai_label, ai_score = 'NEU', 50.0
-        
-        # Kiểm tra spam
-        from .services.review_service import is_review_spam
-        spam_result = is_review_spam(text_comment, int(rating) if rating else 5)
-        logger.info(f"Spam check: {spam_result}")
-
-        #  Lưu vào Database
-        logger.info(f"Creating review with sentiment={ai_label}, score={ai_score}")
+        #  Lưu vào Database -> AI + spam được phân tích nền (manage.py process_review_queue)
         review = Review.objects.create(
             user=request.user,
             product=product,
             comment=text_comment, 
             rating=rating,
-            sentiment=ai_label,
-            confidence_score=ai_score,
             is_approved=True, # Tạm thời cho hiện luôn
-            is_spam=spam_result['is_spam'],
-            spam_reason=spam_result['reason'] if spam_result['is_spam'] else ''
+            analysis_status=Review.ANALYSIS_PENDING,
         )
         
-        logger.info(f"✓ Review created - ID: {review.id}, Sentiment: {review.sentiment}, Score: {review.confidence_score}")
-        
-        # Nếu spam thì đổi sentiment thành SPAM
-        if spam_result['is_spam']:
-            review.sentiment = 'SPAM'
-            review.save()
-            logger.info(f"✓ Updated to SPAM - ID: {review.id}")
+        logger.info(f"✓ Review created - ID: {review.id}, queued for analysis")
         
         logger.info(f"========== END SUBMIT REVIEW ==========")
         return redirect('product_detail', id=product_id)
@@ -791,10 +884,6 @@ def admin_spam_keywords_create(request):
                     is_active=is_active
                 )
                 messages.success(request, f'✓ Đã thêm keyword "{keyword}"')
-                
-                # Clear cache
-                from django.core.cache import cache
-                cache.delete('spam_keywords_active')
             except Exception as e:
                 messages.error(request, f'✗ Lỗi: {str(e)}')
         else:
@@ -821,10 +910,6 @@ def admin_spam_keywords_edit(request, keyword_id):
         try:
             keyword.save()
             messages.success(request, f'✓ Đã cập nhật keyword "{keyword.keyword}"')
-            
-            # Clear cache
-            from django.core.cache import cache
-            cache.delete('spam_keywords_active')
         except Exception as e:
             messages.error(request, f'✗ Lỗi: {str(e)}')
         
@@ -847,10 +932,6 @@ def admin_spam_keywords_toggle(request, keyword_id):
         
         status = "bật" if keyword.is_active else "tắt"
         messages.success(request, f'✓ Đã {status} keyword "{keyword.keyword}"')
-        
-        # Clear cache
-        from django.core.cache import cache
-        cache.delete('spam_keywords_active')
     
     return redirect('admin_spam_keywords')
 
@@ -868,10 +949,6 @@ def admin_spam_keywords_delete(request, keyword_id):
         try:
             keyword.delete()
             messages.success(request, f'✓ Đã xóa keyword "{name}"')
-            
-            # Clear cache
-            from django.core.cache import cache
-            cache.delete('spam_keywords_active')
         except Exception as e:
             messages.error(request, f'✗ Không thể xóa: {str(e)}')
     
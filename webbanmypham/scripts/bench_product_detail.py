@@ -0,0 +1,85 @@
+"""
+Benchmark trang chi tiết sản phẩm: request / giây cho 1 sản phẩm được xem liên tục, có và không có cache fragment
+- Gọi view qua Django test Client (đủ middleware, session, render template; không tính mạng / web server)
+- Không cache: PRODUCT_FRAGMENT_CACHE_ENABLED=False (query + render lại mọi phần mỗi request)
+- Có cache: request đầu render + ghi cache, các request sau đọc HTML từ cache
+Chạy: python scripts/bench_product_detail.py [--product ID] [--requests 500]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import django
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'webbanmypham.settings')
+django.setup()
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.urls import reverse
+
+from app.models import Product
+from app.services import site_metrics
+
+
+def run(client, url, requests):
+    """Return: (request / giây, số query của 1 request sau khi đã chạy hết)"""
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(url)
+        if response.status_code != 200:
+            sys.exit(f"✗ {url} trả về {response.status_code}")
+    elapsed = time.perf_counter() - started
+    with CaptureQueriesContext(connection) as queries:
+        client.get(url)
+    return requests / elapsed, len(queries)
+
+
+def fragment_counts():
+    return dict(site_metrics.snapshot()['counters'].get('product_fragment_cache_total', {}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--product', type=int, default=None, help='ID sản phẩm (mặc định: sản phẩm có nhiều đánh giá nhất)')
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    product = (
+        Product.objects.filter(id=args.product).first() if args.product
+        else Product.objects.order_by('-review_stats__review_count', 'id').first()
+    )
+    if product is None:
+        sys.exit('✗ Không có sản phẩm')
+    # Cho phép host 'testserver' của test Client
+    setup_test_environment()
+    url = reverse('product_detail', args=[product.id])
+    client = Client()
+    print(f"cache: {settings.CACHES['default']['BACKEND']}")
+    print(f"🚀 {url} ({product.name}), {args.requests} request mỗi lần đo")
+
+    results = []
+    for name, enabled in (('không cache', False), ('có cache', True)):
+        with override_settings(PRODUCT_FRAGMENT_CACHE_ENABLED=enabled):
+            client.get(url)  # làm nóng: template, session, cache fragment
+            before = fragment_counts()
+            rps, queries = run(client, url, args.requests)
+            after = fragment_counts()
+        lookups = {result: after.get(result, 0) - before.get(result, 0) for result in ('hit', 'miss')}
+        total = sum(lookups.values())
+        hit_rate = f"{100 * lookups['hit'] / total:.1f}%" if total else '-'
+        results.append(rps)
+        print(f"  {name:>12}: {rps:8.1f} req/s, {queries} query / request, trúng cache fragment {hit_rate}")
+
+    print(f"✓ Nhanh hơn {results[1] / results[0]:.2f}x khi có cache fragment")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Load test giới hạn tần suất gửi đánh giá khi bị bot gửi liên tục
+- Nhiều thread (bot) gọi rate_limit.check_review_submission liên tục trong --seconds giây
+  (đúng bước đầu tiên của view submit_review, trước khi tạo review)
+- Review được nhận mới chạy phân tích cảm xúc -> đo CPU của model, so với khi không giới hạn
+- Kiểm tra số review được nhận không vượt quá giới hạn lý thuyết của token bucket
+Chạy: python scripts/bench_review_flood.py [--bots 8] [--ips 2] [--seconds 10]
+      python scripts/bench_review_flood.py --model   (chạy model thật thay vì giả lập --cost-ms)
+LocMemCache chỉ dùng chung trong 1 process -> test nhiều worker web cần cache Redis/Memcached
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import django
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'webbanmypham.settings')
+django.setup()
+
+from django.conf import settings
+from django.test import override_settings
+
+from app import ai_utils
+from app.services import rate_limit, site_metrics
+from app.services.sentiment_corpus import mixed_length_corpus
+
+
+def flood(bots, ips, seconds):
+    """Mỗi bot (1 user) gửi liên tục; bot i dùng IP i % ips. Return: (số lần gửi, list (bot, lần thứ) được nhận)"""
+    attempts = [0] * bots
+    accepted = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def run(bot):
+        user_id, ip = 10 ** 6 + bot, f"10.0.0.{bot % ips}"
+        while time.monotonic() < deadline:
+            attempts[bot] += 1
+            if rate_limit.check_review_submission(user_id, ip) is None:
+                with lock:
+                    accepted.append((bot, attempts[bot]))
+
+    threads = [threading.Thread(target=run, args=(bot,)) for bot in range(bots)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(attempts), accepted
+
+
+def bound(bots, ips, seconds):
+    """Số review tối đa token bucket cho qua: min(giới hạn theo user, giới hạn theo IP)"""
+    def total(setting, buckets):
+        capacity, refill_seconds = getattr(settings, setting)
+        return buckets * (capacity + int(seconds / refill_seconds))
+    return min(total('REVIEW_RATE_LIMIT_USER', bots), total('REVIEW_RATE_LIMIT_IP', min(bots, ips)))
+
+
+def model_cpu(comments, use_model, cost_ms):
+    """CPU (giây) để phân tích các review được nhận: model thật hoặc giả lập cost_ms / review"""
+    started = time.process_time()
+    if use_model:
+        for i in range(0, len(comments), 32):
+            ai_utils.analyze_sentiment_batch(comments[i:i + 32], fast_path=False)
+    else:
+        for _ in comments:
+            end = time.process_time() + cost_ms / 1000
+            while time.process_time() < end:
+                pass
+    return time.process_time() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bots', type=int, default=8, help='Số tài khoản bot gửi song song')
+    parser.add_argument('--ips', type=int, default=2, help='Số IP các bot dùng chung')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--user-limit', default=None, help='Ghi đè REVIEW_RATE_LIMIT_USER, VD: 5/2 (5 token, 1 token / 2 giây)')
+    parser.add_argument('--ip-limit', default=None, help='Ghi đè REVIEW_RATE_LIMIT_IP, VD: 20/1')
+    parser.add_argument('--model', action='store_true', help='Chạy model cảm xúc thật cho review được nhận')
+    parser.add_argument('--cost-ms', type=float, default=50, help='CPU giả lập cho 1 review khi không dùng --model')
+    args = parser.parse_args()
+
+    overrides = {'REVIEW_RATE_LIMIT_ENABLED': True}
+    for name, value in (('REVIEW_RATE_LIMIT_USER', args.user_limit), ('REVIEW_RATE_LIMIT_IP', args.ip_limit)):
+        if value:
+            capacity, refill_seconds = value.split('/')
+            overrides[name] = (int(capacity), float(refill_seconds))
+
+    with override_settings(**overrides):
+        print(f"cache: {settings.CACHES['default']['BACKEND']}")
+        print(f"user: {settings.REVIEW_RATE_LIMIT_USER}, ip: {settings.REVIEW_RATE_LIMIT_IP} (capacity, giây / token)")
+        for bot in range(args.bots):
+            rate_limit._bucket('user').reset(10 ** 6 + bot)
+            rate_limit._bucket('ip').reset(f"10.0.0.{bot % args.ips}")
+        rejected_before = dict(site_metrics.snapshot()['counters'].get('review_rate_limited_total', {}))
+
+        attempts, accepted = flood(args.bots, args.ips, args.seconds)
+        limit = bound(args.bots, args.ips, args.seconds)
+
+    rejected = {
+        scope: count - rejected_before.get(scope, 0)
+        for scope, count in site_metrics.snapshot()['counters'].get('review_rate_limited_total', {}).items()
+    }
+    print(f"🚀 {args.bots} bot / {args.ips} IP trong {args.seconds:g}s: {attempts} lần gửi ({attempts / args.seconds:.0f}/s)")
+    print(f"  nhận {len(accepted)} (giới hạn lý thuyết {limit}), từ chối {attempts - len(accepted)} {rejected}")
+    if len(accepted) > limit:
+        sys.exit(f"✗ Nhận nhiều hơn giới hạn token bucket ({len(accepted)} > {limit})")
+
+    if args.model and not ai_utils._ensure_model():
+        sys.exit('✗ Không tải được model cảm xúc')
+    corpus = mixed_length_corpus(len(accepted) or 1, seed=0)
+    # Mỗi review khác nhau (không trúng cache kết quả cảm xúc)
+    comments = [f"{corpus[i]} #{bot}-{n}" for i, (bot, n) in enumerate(accepted)]
+    cpu = model_cpu(comments, args.model, args.cost_ms)
+    per_review = cpu / len(comments) if comments else args.cost_ms / 1000
+    unlimited = per_review * attempts
+    print(f"{'':>14} {'review':>9} {'CPU model (s)':>14} {'CPU / giây flood':>17}")
+    for name, count, seconds in (('có giới hạn', len(accepted), cpu), ('không giới hạn', attempts, unlimited)):
+        print(f"{name:>14} {count:>9} {seconds:>14.1f} {seconds / args.seconds:>17.2f}")
+    print(f"✓ CPU model bị chặn trên bởi token bucket, giảm {unlimited / max(cpu, 1e-9):.0f}x "
+          f"({'model thật' if args.model else f'giả lập {args.cost_ms:g} ms/review'})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+Benchmark số thread torch khi nhiều worker cùng chạy model trên 1 máy
+Quét: số worker x số thread intra-op x batch size -> reviews/giây, độ trễ p50 / p99 mỗi batch
+Mặc định dùng model nhỏ khởi tạo ngẫu nhiên, cùng kiến trúc (XLM-RoBERTa) với model thật
+-> chạy offline, không cần GPU, không cần tải model
+Chạy: python scripts/bench_sentiment_threads.py --workers 1,2,4 --threads 1,2,4 --batch-sizes 1,8,32
+      python scripts/bench_sentiment_threads.py --model 5CD-AI/Vietnamese-Sentiment-visobert  (model thật)
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import django
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'webbanmypham.settings')
+django.setup()
+
+from django.conf import settings
+
+from app import ai_utils
+from app.services.sentiment_corpus import SAMPLE_REVIEWS, mixed_length_corpus
+
+
+def build_tiny_model(path, hidden_size=256, layers=4, heads=4, vocab_size=2000, seed=0):
+    """
+    Tạo model phân loại cảm xúc XLM-RoBERTa khởi tạo ngẫu nhiên + tokenizer WordPiece
+    huấn luyện trên SAMPLE_REVIEWS (không cần mạng). Kết quả dự đoán vô nghĩa,
+    chỉ dùng để đo tốc độ
+    """
+    import torch
+    from tokenizers import Tokenizer, models, normalizers, pre_tokenizers, processors, trainers
+    from transformers import PreTrainedTokenizerFast, XLMRobertaConfig, XLMRobertaForSequenceClassification
+
+    specials = ['<s>', '<pad>', '</s>', '<unk>', '<mask>']
+    tok = Tokenizer(models.WordPiece(unk_token='<unk>'))
+    tok.normalizer = normalizers.NFC()
+    tok.pre_tokenizer = pre_tokenizers.Whitespace()
+    tok.train_from_iterator(SAMPLE_REVIEWS, trainers.WordPieceTrainer(vocab_size=vocab_size, special_tokens=specials))
+    tok.post_processor = processors.TemplateProcessing(
+        single='<s> $A </s>', pair='<s> $A </s> </s> $B </s>',
+        special_tokens=[('<s>', 0), ('</s>', 2)],
+    )
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=tok, bos_token='<s>', eos_token='</s>', pad_token='<pad>', unk_token='<unk>',
+        mask_token='<mask>', cls_token='<s>', sep_token='</s>', model_max_length=512,
+    )
+
+    config = XLMRobertaConfig(
+        vocab_size=tokenizer.vocab_size, hidden_size=hidden_size, num_hidden_layers=layers,
+        num_attention_heads=heads, intermediate_size=hidden_size * 4, max_position_embeddings=514,
+        pad_token_id=1, num_labels=3,
+        id2label={0: 'NEG', 1: 'POS', 2: 'NEU'}, label2id={'NEG': 0, 'POS': 1, 'NEU': 2},
+    )
+    torch.manual_seed(seed)
+    XLMRobertaForSequenceClassification(config).save_pretrained(path)
+    tokenizer.save_pretrained(path)
+    return path
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def worker(model_name, threads, interop_threads, batch_size, texts, ready, start, results):
+    """1 process = 1 web worker: tải model với số thread cho trước, chạy phần corpus của mình"""
+    settings.SENTIMENT_TORCH_THREADS = threads
+    settings.SENTIMENT_TORCH_INTEROP_THREADS = interop_threads
+    settings.SENTIMENT_BATCH_SIZE = batch_size
+    settings.SENTIMENT_METRICS_ENABLED = False
+    ai_utils.MODEL_NAME = model_name
+    if ai_utils.load_model() is None:
+        ready.put(False)
+        return
+    # Chạy thử để không tính thời gian khởi tạo lần đầu
+    ai_utils._score_texts(texts[:batch_size])
+    ready.put(True)
+    start.wait()
+
+    latencies = []
+    for i in range(0, len(texts), batch_size):
+        started = time.perf_counter()
+        ai_utils._score_texts(texts[i:i + batch_size])
+        latencies.append(time.perf_counter() - started)
+    results.put(latencies)
+
+
+def run_config(ctx, model_name, workers, threads, interop_threads, batch_size, corpus):
+    ready, results = ctx.Queue(), ctx.Queue()
+    start = ctx.Event()
+    procs = [
+        ctx.Process(
+            target=worker,
+            args=(model_name, threads, interop_threads, batch_size, corpus[w::workers], ready, start, results),
+        )
+        for w in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    if not all(ready.get() for _ in procs):
+        start.set()
+        for p in procs:
+            p.join()
+        sys.exit("✗ Không tải được model")
+
+    started = time.perf_counter()
+    start.set()
+    latencies = []
+    for _ in procs:
+        latencies.extend(results.get())
+    elapsed = time.perf_counter() - started
+    for p in procs:
+        p.join()
+
+    return {
+        'workers': workers,
+        'threads': threads,
+        'batch_size': batch_size,
+        'reviews_per_sec': len(corpus) / elapsed,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def int_list(value):
+    return [int(v) for v in value.split(',') if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int_list, default=[1, 2, 4])
+    parser.add_argument('--threads', type=int_list, default=[1, 2, 4])
+    parser.add_argument('--batch-sizes', type=int_list, default=[1, 8, 32])
+    parser.add_argument('--interop-threads', type=int, default=1)
+    parser.add_argument('--size', type=int, default=256, help='Số review trong corpus mỗi cấu hình')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--model', default='tiny', help="'tiny' (model ngẫu nhiên, offline) hoặc tên / đường dẫn model")
+    parser.add_argument('--json', help='Ghi kết quả ra file JSON')
+    args = parser.parse_args()
+
+    # Review ngắn là chủ yếu, vài review dài (giống dữ liệu thật)
+    corpus = mixed_length_corpus(args.size, seed=args.seed, max_sentences=8)
+
+    tmp_dir = None
+    model_name = args.model
+    if model_name == 'tiny':
+        tmp_dir = tempfile.mkdtemp(prefix='sentiment-tiny-')
+        model_name = build_tiny_model(tmp_dir)
+
+    # spawn: mỗi worker có trạng thái thread torch sạch (giống process riêng của web server)
+    ctx = multiprocessing.get_context('spawn')
+    print(f"CPU cores: {os.cpu_count()} | model: {args.model} | {len(corpus)} reviews / cấu hình")
+    print(f"{'workers':>7} {'threads':>7} {'batch':>5} {'reviews/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+
+    rows = []
+    try:
+        for workers in args.workers:
+            for threads in args.threads:
+                for batch_size in args.batch_sizes:
+                    row = run_config(ctx, model_name, workers, threads, args.interop_threads, batch_size, corpus)
+                    rows.append(row)
+                    print(f"{workers:>7} {threads:>7} {batch_size:>5} {row['reviews_per_sec']:>10.1f} "
+                          f"{row['p50_ms']:>8.1f} {row['p99_ms']:>8.1f}", flush=True)
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    best = max(rows, key=lambda r: r['reviews_per_sec'])
+    print(f"\n✓ Nhanh nhất: {best['workers']} worker x {best['threads']} thread, batch {best['batch_size']} "
+          f"-> {best['reviews_per_sec']:.1f} reviews/s")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'cpu_count': os.cpu_count(), 'model': args.model, 'results': rows}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
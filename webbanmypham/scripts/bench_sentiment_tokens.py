@@ -0,0 +1,84 @@
+"""
+Benchmark số token xử lý mỗi giây trên bộ review độ dài hỗn hợp
+So sánh: batch theo thứ tự gốc vs batch đã nhóm theo độ dài token
+Chạy: python scripts/bench_sentiment_tokens.py [--size 200] [--batch-size 16] [--mode truncate|chunk]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import django
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'webbanmypham.settings')
+django.setup()
+
+from django.conf import settings
+
+from app import ai_utils
+from app.services import sentiment_chunking as chunking
+from app.services.sentiment_corpus import mixed_length_corpus
+
+
+def run_unsorted(texts, batch_size, max_tokens):
+    """Cách cũ: batch theo thứ tự đến, padding theo text dài nhất mỗi batch"""
+    ai_utils.sentiment_pipeline(texts, batch_size=batch_size, truncation=True, max_length=max_tokens)
+
+
+def run_bucketed(texts, batch_size, max_tokens):
+    """Cách mới: _score_texts (nhóm theo độ dài token, cắt / chia theo token)"""
+    ai_utils._score_texts(texts)
+
+
+def padded_tokens(lengths, batch_size):
+    """Tổng số token model thật sự tính (kể cả padding)"""
+    return sum(
+        max(lengths[i:i + batch_size]) * len(lengths[i:i + batch_size])
+        for i in range(0, len(lengths), batch_size)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--mode', choices=['truncate', 'chunk'], default='truncate')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    settings.SENTIMENT_BATCH_SIZE = args.batch_size
+    settings.SENTIMENT_LONG_TEXT_MODE = args.mode
+
+    if ai_utils.load_model() is None:
+        sys.exit("✗ Không tải được model")
+
+    tokenizer = ai_utils.sentiment_pipeline.tokenizer
+    max_tokens = chunking.max_input_tokens(tokenizer, settings.SENTIMENT_MAX_TOKENS)
+    texts = mixed_length_corpus(args.size)
+    lengths = [min(n + 2, max_tokens) for n in chunking.token_lengths(tokenizer, texts)]
+    real_tokens = sum(lengths)
+
+    print(f"🚀 {len(texts)} reviews, {real_tokens} tokens (sau khi cắt), batch={args.batch_size}, mode={args.mode}")
+    print(f"   padded tokens - thứ tự gốc: {padded_tokens(lengths, args.batch_size)}, "
+          f"nhóm theo độ dài: {padded_tokens(sorted(lengths), args.batch_size)}")
+
+    ai_utils._score_texts(texts[:4])  # warm-up
+    for name, fn in [('Thứ tự gốc', run_unsorted), ('Nhóm theo độ dài', run_bucketed)]:
+        best = min(
+            _timed(fn, texts, args.batch_size, max_tokens) for _ in range(args.repeat)
+        )
+        print(f"   {name:<18} {best:7.2f}s   {real_tokens / best:10.0f} tokens/s   {len(texts) / best:7.1f} reviews/s")
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark chấm spam: is_review_spam từng comment vs is_review_spam_batch (bộ keyword trong database)
+Kiểm tra 2 cách trả về kết quả giống hệt nhau
+Chạy: python scripts/bench_spam_batch.py [--comments 20000] [--batch-size 2000]
+(chưa có keyword: python scripts/seed_spam_keywords.py)
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import django
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'webbanmypham.settings')
+django.setup()
+
+from app.services.review_service import get_spam_keywords, is_review_spam, is_review_spam_batch
+from app.services.sentiment_corpus import mixed_length_corpus
+
+
+def make_comments(keywords, count, seed=0):
+    """Review thật (ghép câu mẫu) + ~10% chèn keyword, ~5% viết hoa, ~5% nhiều ký tự đặc biệt"""
+    rng = random.Random(seed)
+    comments = mixed_length_corpus(count, seed=seed, max_sentences=6)
+    for i, text in enumerate(comments):
+        roll = rng.random()
+        if roll < 0.1 and keywords:
+            comments[i] = f"{text} {rng.choice(keywords)['keyword']}"
+        elif roll < 0.15:
+            comments[i] = text.upper()
+        elif roll < 0.2:
+            comments[i] = text + '!' * len(text)
+    return comments
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--comments', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=2000)
+    args = parser.parse_args()
+
+    keywords = get_spam_keywords()
+    comments = make_comments(keywords, args.comments)
+    ratings = [random.Random(i).randint(1, 5) for i in range(len(comments))]
+    print(f"{len(keywords)} keyword, {len(comments)} comment, batch {args.batch_size}")
+
+    started = time.perf_counter()
+    expected = [is_review_spam(c, r) for c, r in zip(comments, ratings)]
+    single = time.perf_counter() - started
+
+    started = time.perf_counter()
+    actual = []
+    for i in range(0, len(comments), args.batch_size):
+        actual.extend(is_review_spam_batch(comments[i:i + args.batch_size], ratings[i:i + args.batch_size]))
+    batch = time.perf_counter() - started
+
+    if actual != expected:
+        mismatches = sum(1 for a, e in zip(actual, expected) if a != e)
+        sys.exit(f"✗ {mismatches} kết quả khác nhau")
+
+    spam = sum(1 for r in actual if r['is_spam'])
+    print(f"{'':>10} {'comment/s':>11} {'µs/comment':>11}")
+    for name, seconds in (('từng cái', single), ('batch', batch)):
+        print(f"{name:>10} {len(comments) / seconds:>11.0f} {seconds / len(comments) * 1e6:>11.1f}")
+    print(f"✓ Kết quả giống hệt is_review_spam ({spam} spam), nhanh hơn {single / batch:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
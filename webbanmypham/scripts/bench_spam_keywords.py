@@ -0,0 +1,103 @@
+"""
+Benchmark phát hiện spam keyword: vòng lặp `keyword in comment` (cách cũ) vs Aho–Corasick
+Đo ở 30 (bộ seed), 1.000 và 10.000 keyword; kiểm tra 2 cách trả về cùng keyword
+Chạy: python scripts/bench_spam_keywords.py [--sizes 30,1000,10000] [--comments 2000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import django
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'webbanmypham.settings')
+django.setup()
+
+from app.services.keyword_matcher import AhoCorasick
+from app.services.sentiment_corpus import mixed_length_corpus
+from seed_spam_keywords import SPAM_DATA
+
+SYLLABLES = [
+    'vay', 'tiền', 'nhanh', 'lãi', 'suất', 'thấp', 'liên', 'hệ', 'zalo', 'inbox', 'shop', 'sale',
+    'giá', 'rẻ', 'hàng', 'auth', 'order', 'link', 'web', 'mã', 'giảm', 'free', 'ship', 'kiếm',
+    'online', 'đầu', 'tư', 'bán', 'mua', 'sỉ', 'lẻ', 'khuyến', 'mãi', 'tặng', 'quà', 'click',
+]
+
+
+def make_keywords(size, seed=0):
+    """Bộ seed thật + keyword tổng hợp (2-4 âm tiết, kèm số), sắp theo severity giảm dần"""
+    rng = random.Random(seed)
+    keywords = [{'keyword': d['keyword'], 'severity': d['severity']} for d in SPAM_DATA][:size]
+    seen = {k['keyword'] for k in keywords}
+    while len(keywords) < size:
+        words = [rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))]
+        if rng.random() < 0.5:
+            words.append(str(rng.randint(0, 999)))
+        keyword = ' '.join(words)
+        if keyword not in seen:
+            seen.add(keyword)
+            keywords.append({'keyword': keyword, 'severity': rng.randint(50, 100)})
+    keywords.sort(key=lambda k: -k['severity'])
+    return keywords
+
+
+def make_comments(keywords, count, seed=0, spam_ratio=0.1):
+    """Review thật (ghép câu mẫu) + khoảng 10% có chèn keyword spam"""
+    rng = random.Random(seed)
+    comments = mixed_length_corpus(count, seed=seed, max_sentences=6)
+    for i in range(len(comments)):
+        if rng.random() < spam_ratio:
+            comments[i] += ' ' + rng.choice(keywords)['keyword']
+    return [c.lower().strip() for c in comments]
+
+
+def naive_first_match(patterns, text):
+    for index, pattern in enumerate(patterns):
+        if pattern in text:
+            return index
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='30,1000,10000')
+    parser.add_argument('--comments', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'keywords':>9} {'build ms':>9} {'naive µs':>9} {'aho µs':>8} {'speedup':>8}")
+    for size in [int(s) for s in args.sizes.split(',')]:
+        keywords = make_keywords(size)
+        patterns = [k['keyword'].lower() for k in keywords]
+        comments = make_comments(keywords, args.comments)
+
+        started = time.perf_counter()
+        automaton = AhoCorasick(patterns)
+        build = time.perf_counter() - started
+
+        started = time.perf_counter()
+        expected = [naive_first_match(patterns, c) for c in comments]
+        naive = time.perf_counter() - started
+
+        # scan: luôn dùng automaton (first_match tự dùng vòng lặp khi bộ keyword nhỏ)
+        started = time.perf_counter()
+        actual = [automaton.scan(c) for c in comments]
+        aho = time.perf_counter() - started
+
+        if actual != expected:
+            mismatches = sum(1 for a, e in zip(actual, expected) if a != e)
+            sys.exit(f"✗ {mismatches} kết quả khác nhau ở {size} keyword")
+
+        per_naive = naive / len(comments) * 1e6
+        per_aho = aho / len(comments) * 1e6
+        print(f"{size:>9} {build * 1000:>9.1f} {per_naive:>9.1f} {per_aho:>8.1f} {per_naive / per_aho:>7.1f}x")
+
+    print("✓ Kết quả giống hệt cách cũ (keyword severity cao nhất)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark thời gian khởi động: import AI eager (trước) vs lazy (sau)
+Mỗi phép đo chạy trong 1 process Python mới để đo đúng cold import
+Chạy: python scripts/bench_startup.py [--runs 3] [--skip-model]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SETUP = """
+import json, os, sys, time
+sys.path.insert(0, {base!r})
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'webbanmypham.settings')
+t0 = time.perf_counter()
+import django
+django.setup()
+"""
+
+# Trước: views -> ai_utils -> import torch + transformers ngay khi import module
+EAGER = SETUP + """
+import torch, transformers
+import app.views
+print(json.dumps({{'boot': time.perf_counter() - t0}}))
+"""
+
+# Sau: import views / ai_utils không kéo theo torch
+LAZY = SETUP + """
+import app.views, app.ai_utils
+assert 'torch' not in sys.modules, 'torch was imported eagerly'
+print(json.dumps({{'boot': time.perf_counter() - t0}}))
+"""
+
+# Lần gọi AI đầu tiên: import torch + tải model + inference
+FIRST_CALL = SETUP + """
+from app import ai_utils
+boot = time.perf_counter() - t0
+timings = ai_utils.warmup()
+timings['boot'] = boot
+print(json.dumps(timings))
+"""
+
+
+def run(code):
+    out = subprocess.run(
+        [sys.executable, '-c', code.format(base=BASE_DIR)],
+        capture_output=True, text=True, cwd=BASE_DIR,
+    )
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1])
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def bench(name, code, runs):
+    results = [run(code) for _ in range(runs)]
+    print(f"\n▶ {name}")
+    for key in results[0]:
+        values = [r[key] * 1000 for r in results]
+        print(f"   {key:<16} median {statistics.median(values):8.0f} ms   (min {min(values):.0f}, max {max(values):.0f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--skip-model', action='store_true', help='Không đo tải model + inference')
+    args = parser.parse_args()
+
+    print(f"🚀 Startup benchmark ({args.runs} runs each)")
+    bench('Eager import (trước): django.setup + views + torch/transformers', EAGER, args.runs)
+    bench('Lazy import (sau): django.setup + views, không torch', LAZY, args.runs)
+
+    if not args.skip_model:
+        try:
+            bench('Lần gọi AI đầu tiên (warm-up)', FIRST_CALL, args.runs)
+        except RuntimeError as e:
+            print(f"\n✗ Không đo được model: {e}")
+
+
+if __name__ == '__main__':
+    main()
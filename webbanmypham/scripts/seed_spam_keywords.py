@@ -14,6 +14,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'webbanmypham.settings')
 django.setup()
 
 from app.models import SpamKeyword
+from app.services.spam_keyword_io import clean_rows, upsert_keywords
 
 # Danh sách spam keywords mẫu
 SPAM_DATA = [
@@ -63,38 +64,18 @@ SPAM_DATA = [
 ]
 
 def seed_spam_keywords():
-    """Import spam keywords vào database"""
+    """Import spam keywords vào database (1 transaction, bulk upsert)"""
     print("🚀 Starting spam keywords seeding...")
     
-    created_count = 0
-    updated_count = 0
-    
-    for data in SPAM_DATA:
-        keyword, created = SpamKeyword.objects.get_or_create(
-            keyword=data['keyword'],
-            defaults={
-                'category': data['category'],
-                'severity': data['severity'],
-                'description': data['description'],
-                'is_active': True
-            }
-        )
-        
-        if created:
-            created_count += 1
-            print(f"  ✓ Created: {keyword.keyword} ({keyword.category})")
-        else:
-            # Update existing
-            keyword.category = data['category']
-            keyword.severity = data['severity']
-            keyword.description = data['description']
-            keyword.save()
-            updated_count += 1
-            print(f"  ↻ Updated: {keyword.keyword}")
+    rows, errors = clean_rows(SPAM_DATA)
+    for error in errors:
+        print(f"  ✗ {error}")
+    counts = upsert_keywords(rows)
     
     print(f"\n✅ Seeding complete!")
-    print(f"   - Created: {created_count} keywords")
-    print(f"   - Updated: {updated_count} keywords")
+    print(f"   - Created: {counts['created']} keywords")
+    print(f"   - Updated: {counts['updated']} keywords")
+    print(f"   - Unchanged: {counts['unchanged']} keywords")
     print(f"   - Total: {SpamKeyword.objects.count()} keywords in database")
 
 if __name__ == '__main__':
@@ -87,6 +87,19 @@ DATABASES = {
 }
 
 
+# Cache
+# LocMemCache: mỗi process 1 cache riêng -> chỉ đúng khi chạy 1 process (runserver / 1 worker, không tách worker nền)
+# Nhiều process (gunicorn nhiều worker + process_review_queue / sentiment_server): dùng cache chung, VD Redis:
+#   'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379/1'  (pip install redis)
+# Phần nào cần cache chung thì ghi rõ ở từng setting bên dưới (version bộ spam keyword, cache trang sản phẩm, rate limit)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -171,4 +184,81 @@ LOGGING = {
             'propagate': False,
         },
     },
-}
\ No newline at end of file
+}
+
+# Cấu hình AI phân tích cảm xúc (app/ai_utils.py)
+SENTIMENT_BATCHING = True           # Gom các request đồng thời thành 1 batch
+SENTIMENT_BATCH_SIZE = 16           # Số bình luận tối đa trong 1 batch
+SENTIMENT_BATCH_MAX_WAIT_MS = 10    # Thời gian chờ gom batch (ms)
+SENTIMENT_BATCH_TIMEOUT = 30        # Thời gian chờ kết quả tối đa (giây)
+SENTIMENT_WARMUP_ON_STARTUP = False # True: wsgi.py tải + chạy thử model trước khi nhận request
+SENTIMENT_BACKEND = 'torch'         # 'torch' (fp32) | 'torch_int8' | 'onnx' (cần pip install -r requirements-onnx.txt)
+SENTIMENT_ONNX_DIR = BASE_DIR / 'ai_models' / 'visobert-onnx'  # python manage.py export_sentiment_onnx
+SENTIMENT_TORCH_THREADS = None      # Thread intra-op mỗi process (None = mọi core). Nhiều worker: ~ số core / số worker
+SENTIMENT_TORCH_INTEROP_THREADS = None  # Thread inter-op (None = mặc định). Xem scripts/bench_sentiment_threads.py
+SENTIMENT_INFERENCE_MODE = True     # Chạy model trong torch.inference_mode()
+SENTIMENT_FAST_PATH_ENABLED = True  # Review ngắn, rõ ràng -> phân loại bằng từ điển + emoji + số sao, không chạy model
+SENTIMENT_FAST_PATH_THRESHOLD = 90  # Độ tin cậy tối thiểu (0-100) của từ điển, thấp hơn -> chạy model
+SENTIMENT_FAST_PATH_MAX_WORDS = 20  # Review dài hơn luôn chạy model (xem manage.py sentiment_fastpath_report)
+
+# Tìm kiếm ngữ nghĩa (vector từ encoder của model cảm xúc, tạo bằng manage.py update_search_index)
+SEARCH_INDEX_DIR = BASE_DIR / 'var' / 'search_index'  # Ma trận float32 memmap dùng chung cho mọi worker
+SEARCH_INDEX_AUTO_UPDATE = True     # Thêm / sửa sản phẩm -> embed lại đúng sản phẩm đó (khi index đã tạo; không có sentiment server -> process_review_queue embed)
+SEARCH_SEMANTIC_TOP_K = 24          # Số sản phẩm trả về
+SEARCH_IVF_MIN_ROWS = 20000         # Catalog từ bao nhiêu sản phẩm thì dùng cụm IVF (nếu đã tạo --ivf-lists)
+SEARCH_IVF_NPROBE = 8               # Số cụm gần nhất được quét mỗi truy vấn
+SENTIMENT_MAX_TOKENS = 512          # Giới hạn token của model (cắt theo token, không theo ký tự)
+SENTIMENT_LONG_TEXT_MODE = 'truncate'  # 'truncate' | 'chunk' (chia cửa sổ trượt rồi gộp điểm)
+SENTIMENT_CHUNK_STRIDE = 128        # Số token chồng lấn giữa 2 cửa sổ liên tiếp
+SENTIMENT_MAX_CHUNKS = 8            # Số cửa sổ tối đa cho 1 review
+SENTIMENT_CACHE_ENABLED = True      # Cache kết quả theo nội dung bình luận (LRU + Django cache)
+SENTIMENT_CACHE_LOCAL_SIZE = 10000  # Số kết quả tối đa trong LRU của mỗi process
+SENTIMENT_CACHE_TIMEOUT = 7 * 24 * 3600  # Thời gian giữ trong Django cache (giây)
+SENTIMENT_CACHE_VERSION = 1         # Tăng lên để bỏ toàn bộ kết quả cũ
+SENTIMENT_SERVER_SOCKET = None      # VD: '/run/webbanmypham/sentiment.sock' -> dùng sentiment server (manage.py sentiment_server)
+SENTIMENT_SERVER_TIMEOUT = 5        # Thời gian chờ server tối đa (giây)
+SENTIMENT_SERVER_FALLBACK = 'neutral'  # Server lỗi: 'neutral' (trả NEU, 50.0) | 'local' (tải model ngay trong worker)
+SENTIMENT_METRICS_ENABLED = True    # Đếm độ trễ / batch / lỗi của model (xem /my-admin/metrics/)
+SENTIMENT_METRICS_PUBLISH_INTERVAL = 15  # Chu kỳ mỗi process đẩy số liệu lên Django cache (giây)
+SENTIMENT_METRICS_TOKEN = None      # Bearer token cho Prometheus scrape /my-admin/metrics/ (None = chỉ admin đăng nhập)
+SITE_METRICS_ENABLED = True         # Đếm rate limit gửi đánh giá / cache trang sản phẩm (cùng trang /my-admin/metrics/)
+SITE_METRICS_PUBLISH_INTERVAL = 15  # Chu kỳ mỗi process đẩy số liệu web lên Django cache (giây)
+
+# Phát hiện spam (app/services/review_service.py)
+SPAM_KEYWORDS_VERSION_CHECK_INTERVAL = 0  # 0 = đọc version bộ keyword từ cache mỗi lần kiểm tra (cache chung: mọi worker thấy ngay); > 0: giây, bớt đọc cache nhưng worker khác trễ tối đa chừng này
+SPAM_KEYWORDS_VERSION_TIMEOUT = 300 # Giây; key version hết hạn -> đọc lại database. LocMemCache: worker khác (process_review_queue) thấy keyword mới trễ tối đa chừng này
+SPAM_RECHECK_BATCH_SIZE = 500       # Số review kiểm tra lại mỗi batch khi bộ keyword đổi (manage.py recheck_spam)
+SPAM_CLASSIFIER_ENABLED = True      # Dùng bộ phân loại đã train (manage.py train_spam_classifier) cùng với keyword
+SPAM_CLASSIFIER_PATH = BASE_DIR / 'ai_models' / 'spam_classifier.npz'  # Tự tải lại khi file thay đổi
+SPAM_CLASSIFIER_TARGET_PRECISION = 0.95  # Ngưỡng được chọn khi train để đạt precision này trên tập holdout
+SPAM_DUPLICATE_ENABLED = True       # Đánh dấu spam review gần trùng nội dung (MinHash/LSH, xem manage.py cluster_duplicate_reviews)
+SPAM_DUPLICATE_THRESHOLD = 0.8      # Độ tương đồng Jaccard ước lượng để coi là trùng (0-1)
+SPAM_DUPLICATE_MIN_COPIES = 2       # Trùng với từ chừng này review khác trở lên -> spam
+SPAM_DUPLICATE_MIN_CHARS = 40       # Bình luận ngắn hơn không tính chữ ký ("ok", "sản phẩm tốt" trùng là bình thường)
+SPAM_DUPLICATE_MAX_CANDIDATES = 500 # Số review ứng viên tối đa đọc từ bảng LSH mỗi lần tìm
+
+# Giới hạn tần suất gửi đánh giá (token bucket trong Django cache, app/services/rate_limit.py)
+# Nhiều worker web -> cần cache dùng chung (Redis/Memcached), LocMemCache chỉ giới hạn trong từng process
+REVIEW_RATE_LIMIT_ENABLED = True
+REVIEW_RATE_LIMIT_USER = (5, 60)    # Mỗi tài khoản: gửi liền tối đa 5 đánh giá, sau đó 1 đánh giá / 60 giây
+REVIEW_RATE_LIMIT_IP = (20, 15)     # Mỗi IP (nhiều người chung mạng): tối đa 20, sau đó 1 / 15 giây
+
+# Trang chi tiết sản phẩm
+PRODUCT_REVIEWS_PAGE_SIZE = 10      # Số đánh giá mỗi lần tải (trang đầu + mỗi lần bấm "Xem thêm")
+# Cache HTML thông tin / tóm tắt đánh giá / sản phẩm liên quan (app/services/product_fragments.py)
+# None: chỉ bật khi CACHES['default'] là cache dùng chung (Redis/Memcached...); với LocMemCache, version tăng ở
+# process này (admin sửa sản phẩm, worker phân tích review) không tới các worker web khác -> HTML cũ tới khi hết hạn
+PRODUCT_FRAGMENT_CACHE_ENABLED = None
+PRODUCT_FRAGMENT_CACHE_TIMEOUT = 3600  # Giây; sản phẩm / lô hàng / review đổi -> tăng version, không cần chờ hết hạn
+PRODUCT_RELATED_CACHE_TIMEOUT = 300    # Giây; sản phẩm liên quan cũ tối đa chừng này khi review của chúng đổi
+PRODUCT_VIEWS_ENABLED = True        # Đếm lượt xem (Product.views), đệm trong process rồi ghi theo lô (app/services/product_views.py)
+PRODUCT_VIEWS_FLUSH_INTERVAL = 10   # Giây giữa 2 lần thread nền ghi lượt xem xuống database (process chết đột ngột mất tối đa chừng này)
+PRODUCT_VIEWS_FLUSH_THRESHOLD = 1000  # Đệm đủ chừng này lượt xem -> ghi ngay, không chờ hết chu kỳ
+
+# Hàng đợi phân tích review chạy nền (python manage.py process_review_queue)
+REVIEW_ANALYSIS_BATCH_SIZE = 32             # Số review tối đa mỗi batch
+REVIEW_ANALYSIS_MAX_ATTEMPTS = 3            # Quá số lần này -> FAILED
+REVIEW_ANALYSIS_LEASE_SECONDS = 300         # Review PROCESSING quá lâu sẽ được nhận lại
+REVIEW_ANALYSIS_POLL_INTERVAL = 2           # Giây chờ khi hàng đợi trống
+REVIEW_ANALYSIS_TARGET_BATCH_SECONDS = 5    # Batch lâu hơn -> giảm batch size
+REVIEW_ANALYSIS_MAX_BACKOFF = 60            # Thời gian chờ tối đa khi lỗi liên tiếp
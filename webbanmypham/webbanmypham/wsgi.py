@@ -14,3 +14,16 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'webbanmypham.settings')
 
 application = get_wsgi_application()
+
+
+# Tải sẵn model AI trước khi worker nhận request (xem SENTIMENT_WARMUP_ON_STARTUP)
+from django.conf import settings
+
+if getattr(settings, 'SENTIMENT_WARMUP_ON_STARTUP', False):
+    import logging
+    from app.ai_utils import warmup
+
+    try:
+        warmup()
+    except Exception as e:
+        logging.getLogger(__name__).error(f"Model warm-up failed: {e}")